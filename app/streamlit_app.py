@@ -25,11 +25,15 @@ st.set_page_config(
 # Load model
 @st.cache_resource
 def load_model():
-    """Load the trained model and metadata"""
+    """Load the trained model and metadata (the NumPy-only flat forest when it is current)"""
     try:
-        model_path = Path(__file__).parent.parent / 'models' / 'trained' / 'best_covid_warning_model.pkl'
-        artifact = joblib.load(model_path)
-        return artifact
+        import sys
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        from src.models.flat_forest import load_inference_artifact
+        
+        model_dir = Path(__file__).parent.parent / 'models' / 'trained'
+        model_path = model_dir / 'best_covid_warning_model.pkl'
+        return load_inference_artifact(model_path, model_dir / 'flat_forest.npz', model_dir / 'model_metadata.pkl')
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
@@ -422,6 +426,8 @@ def page_batch(model, feature_columns):
     
     st.info("Upload a CSV file with the same features used in training. The system will predict warning levels for all rows.")
     
+    score_feature_matrix(model, feature_columns)
+    
     uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
     
     if uploaded_file is not None:
@@ -491,6 +497,31 @@ def page_batch(model, feature_columns):
 
 
 
+def score_feature_matrix(model, feature_columns):
+    """Score the memory-mapped feature matrix exported by data preparation"""
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from src.data.feature_matrix import matrix_row_index, open_feature_matrix
+    from src.models.predict_model import score_matrix
+    
+    # Opening maps the files; every app worker shares the same pages
+    matrix = open_feature_matrix()
+    if matrix is None or not set(feature_columns) <= set(matrix.schema['feature_columns']):
+        return
+    
+    st.markdown(f"### Prepared feature matrix ({matrix.schema['rows']:,} rows)")
+    if st.button("🔮 Score Prepared Data"):
+        predictions, confidences = score_matrix(model, feature_columns, matrix)
+        results = matrix_row_index(matrix)
+        results['Predicted_Warning_Level'] = predictions
+        if confidences is not None:
+            results['Confidence'] = confidences
+        st.success(f"✅ Scored {len(results):,} rows")
+        st.dataframe(results.tail(100))
+        st.bar_chart(results['Predicted_Warning_Level'].value_counts())
+    st.markdown("---")
+
+
 def page_about():
     """About page"""
     st.header("ℹ️ About This System")
@@ -0,0 +1,110 @@
+"""
+Grouped Kernel Benchmark
+========================
+Times the per-group lambda transforms used before STEP 2.6/2.7/3.2 were
+rebuilt against the native grouped kernels in src/data/prepare_data.py.
+
+Usage:
+    python benchmarks/bench_grouped_kernels.py            # best of 3 runs
+    python benchmarks/bench_grouped_kernels.py --repeat 5
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import (
+    cap_group_outliers,
+    safe_growth_rate,
+    cap_grouped_outliers,
+    grouped_rolling_mean,
+    grouped_safe_growth_rate,
+)
+
+GROUP_KEYS = ['Country/Region', 'Province/State']
+
+
+def build_daily_frame():
+    """Long frame with Daily_Cases/Daily_Deaths from the bundled raw CSVs."""
+    raw_data_dir = Path(__file__).parent.parent / 'data' / 'raw'
+    frames = []
+    for metric, name in [('confirmed', 'Daily_Cases'), ('deaths', 'Daily_Deaths')]:
+        wide = pd.read_csv(raw_data_dir / f'time_series_covid19_{metric}_global.csv')
+        wide['Province/State'] = wide['Province/State'].fillna('All')
+        long = wide.drop(columns=['Lat', 'Long']).melt(
+            id_vars=GROUP_KEYS, var_name='Date', value_name=name
+        )
+        frames.append(long.set_index(GROUP_KEYS + ['Date']))
+    df = pd.concat(frames, axis=1).reset_index()
+    df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y')
+    df = df.sort_values(GROUP_KEYS + ['Date']).reset_index(drop=True)
+    for col in ['Daily_Cases', 'Daily_Deaths']:
+        df[col] = df.groupby(GROUP_KEYS)[col].diff().fillna(0).clip(lower=0)
+    return df
+
+
+def legacy_kernels(df):
+    """STEP 2.6, 2.7 and 3.2 as per-group lambda transforms."""
+    out = {}
+    for col in ['Daily_Cases', 'Daily_Deaths']:
+        out[col] = df.groupby(GROUP_KEYS)[col].transform(lambda s: cap_group_outliers(s, q=0.99))
+        out[f'{col}_MA'] = df.groupby(GROUP_KEYS)[col].transform(
+            lambda s: s.rolling(window=7, min_periods=1).mean()
+        )
+    out['Growth_Rate'] = df.groupby(GROUP_KEYS)['Daily_Cases'].transform(
+        lambda s: safe_growth_rate(s, threshold=50)
+    )
+    out['Death_Growth'] = df.groupby(GROUP_KEYS)['Daily_Deaths'].transform(
+        lambda s: safe_growth_rate(s, threshold=10)
+    )
+    return out
+
+
+def grouped_kernels(df):
+    """STEP 2.6, 2.7 and 3.2 as native grouped kernels."""
+    out = {}
+    for col in ['Daily_Cases', 'Daily_Deaths']:
+        out[col] = cap_grouped_outliers(df, GROUP_KEYS, col, q=0.99)
+        out[f'{col}_MA'] = grouped_rolling_mean(df, GROUP_KEYS, col, window=7)
+    out['Growth_Rate'] = grouped_safe_growth_rate(df, GROUP_KEYS, 'Daily_Cases', threshold=50)
+    out['Death_Growth'] = grouped_safe_growth_rate(df, GROUP_KEYS, 'Daily_Deaths', threshold=10)
+    return out
+
+
+def best_time(func, df, repeat):
+    """Best wall time over `repeat` runs, plus the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 3
+    
+    df = build_daily_frame()
+    print(f"Rows: {len(df):,}  |  Groups: {df.groupby(GROUP_KEYS).ngroups}")
+    
+    legacy_time, legacy = best_time(legacy_kernels, df, repeat)
+    grouped_time, grouped = best_time(grouped_kernels, df, repeat)
+    
+    for name in legacy:
+        np.testing.assert_allclose(grouped[name].to_numpy(float), legacy[name].to_numpy(float),
+                                   rtol=1e-9, equal_nan=True, err_msg=name)
+    
+    print(f"\n| Kernels | Best of {repeat} (s) |")
+    print("|---|---|")
+    print(f"| Per-group lambda transforms | {legacy_time:.3f} |")
+    print(f"| Native grouped kernels | {grouped_time:.3f} |")
+    print(f"\nSpeed-up: {legacy_time / grouped_time:.1f}x (outputs match to rtol=1e-9)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Raw Ingestion Benchmark
+=======================
+Times plain sequential pd.read_csv of the three raw JHU files against the
+typed, concurrent reader in src/data/ingest.py, over all dates and over a
+90-day window.
+
+Usage:
+    python benchmarks/bench_ingest.py            # best of 5 runs
+    python benchmarks/bench_ingest.py --repeat 10
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import RAW_DATA_FILES
+from src.data.ingest import read_wide_tables
+
+RAW_FILES = [Path(__file__).parent.parent / 'data' / 'raw' / name for name in RAW_DATA_FILES]
+WINDOW = ('2021-01-01', '2021-03-31')
+
+
+def best_time(func, repeat):
+    """Best wall time over `repeat` runs, plus the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 5
+
+    plain_time, plain = best_time(lambda: [pd.read_csv(f) for f in RAW_FILES], repeat)
+    typed_time, typed = best_time(lambda: read_wide_tables(RAW_FILES), repeat)
+    window_time, _ = best_time(lambda: read_wide_tables(RAW_FILES, *WINDOW), repeat)
+
+    for expected, result in zip(plain, typed):
+        np.testing.assert_array_equal(result.iloc[:, 4:], expected.iloc[:, 4:])
+
+    print(f"\n| Reader | Best of {repeat} (s) |")
+    print("|---|---|")
+    print(f"| Sequential pd.read_csv, all dates | {plain_time:.3f} |")
+    print(f"| Typed concurrent reader, all dates | {typed_time:.3f} |")
+    print(f"| Typed concurrent reader, {WINDOW[0]} to {WINDOW[1]} | {window_time:.3f} |")
+    print(f"\nSpeed-up: {plain_time / typed_time:.1f}x (all dates), "
+          f"{plain_time / window_time:.1f}x (window)")
+
+
+if __name__ == '__main__':
+    main()
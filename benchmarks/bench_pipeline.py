@@ -0,0 +1,170 @@
+"""
+Preparation Pipeline Benchmark Suite
+====================================
+Times ingestion, every STEP 1-5 step and sub-step, saving and the whole
+run at several dataset sizes. Sizes are multiples of the 289 bundled
+locations, with synthetic JHU-shaped data (src/data/synthetic.py). Each
+stage's best wall time over the repeats and its peak RSS are compared with
+benchmarks/baselines.json. The suite exits non-zero when a stage slows down
+by more than --tolerance percent (and more than MIN_SLOWDOWN_S seconds) or
+its peak RSS grows by more than --memory-tolerance percent.
+
+Runs offline; peak RSS per stage needs Linux (see profiling.py).
+
+Usage:
+    python benchmarks/bench_pipeline.py                     # check against baselines
+    python benchmarks/bench_pipeline.py --update-baselines  # record new baselines
+    python benchmarks/bench_pipeline.py --scales 1,10 --repeat 5 --tolerance 15
+"""
+
+import sys
+import json
+import time
+import platform
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import prepare_long_format, read_raw_tables, save_prepared_data
+from src.data.profiling import StageProfiler
+from src.data.synthetic import write_jhu_csvs
+
+BASELINE_FILE = Path(__file__).parent / 'baselines.json'
+BASE_LOCATIONS = 289  # locations in the bundled JHU files
+SCALES = [1, 10, 50]
+# 180 days keeps the 50x run (2.6M rows) within a few GB of RAM
+DAYS = 180
+REPEAT = 3
+TOLERANCE = 25.0  # percent slower than baseline that counts as a regression
+MIN_SLOWDOWN_S = 0.05  # absolute slack, so millisecond stages do not fail on noise
+MEMORY_TOLERANCE = 25.0
+
+
+def option(name, default, parse=str):
+    """Value following --name on the command line, or default."""
+    if f'--{name}' in sys.argv:
+        return parse(sys.argv[sys.argv.index(f'--{name}') + 1])
+    return default
+
+
+def machine():
+    """Environment the timings were taken on."""
+    import os
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_once(raw_dir, out_dir):
+    """One full run; returns {stage: {'wall_s', 'peak_rss_mb'}}."""
+    profiler = StageProfiler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with profiler.stage('Total'):
+            with profiler.stage('Ingestion'):
+                tables = read_raw_tables(raw_dir)
+            df = prepare_long_format(*tables, profiler=profiler)
+            with profiler.stage('STEP 6 Save Prepared Data'):
+                save_prepared_data(df, out_dir)
+    del df, tables
+    return {record['name']: {'wall_s': record['wall_s'], 'peak_rss_mb': record['peak_rss_mb']}
+            for record in profiler.stages}
+
+
+def benchmark_scale(scale, days, repeat):
+    """Best-of-repeat wall time and lowest peak RSS per stage at one scale."""
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir, out_dir = Path(tmp) / 'raw', Path(tmp) / 'out'
+        out_dir.mkdir()
+        write_jhu_csvs(raw_dir, n_locations=BASE_LOCATIONS * scale, n_days=days, seed=scale)
+        runs = [run_once(raw_dir, out_dir) for _ in range(repeat)]
+    return {
+        name: {
+            'wall_s': min(run[name]['wall_s'] for run in runs),
+            'peak_rss_mb': min((run[name]['peak_rss_mb'] or 0) for run in runs),
+        }
+        for name in runs[0]
+    }
+
+
+def compare(scale, results, baseline, tolerance, memory_tolerance):
+    """Print a table for one scale; return the list of regression messages."""
+    regressions = []
+    print(f"\n### {scale}x locations ({BASE_LOCATIONS * scale:,})\n")
+    print("| Stage | Wall (s) | Baseline (s) | Change | Peak RSS (MB) | Baseline (MB) |")
+    print("|---|---|---|---|---|---|")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"| {name} | {current['wall_s']:.3f} | - | new | {current['peak_rss_mb']:.0f} | - |")
+            continue
+        change = 100 * (current['wall_s'] / base['wall_s'] - 1) if base['wall_s'] else 0.0
+        flag = ''
+        if change > tolerance and current['wall_s'] - base['wall_s'] > MIN_SLOWDOWN_S:
+            flag = ' ❌'
+            regressions.append(f"{scale}x {name}: {current['wall_s']:.3f}s vs "
+                               f"{base['wall_s']:.3f}s (+{change:.0f}%)")
+        memory_change = 100 * (current['peak_rss_mb'] / base['peak_rss_mb'] - 1) if base['peak_rss_mb'] else 0.0
+        if memory_change > memory_tolerance:
+            flag = ' ❌'
+            regressions.append(f"{scale}x {name}: peak RSS {current['peak_rss_mb']:.0f} MB vs "
+                               f"{base['peak_rss_mb']:.0f} MB (+{memory_change:.0f}%)")
+        print(f"| {name} | {current['wall_s']:.3f} | {base['wall_s']:.3f} | {change:+.0f}%{flag} "
+              f"| {current['peak_rss_mb']:.0f} | {base['peak_rss_mb']:.0f} |")
+    return regressions
+
+
+def main():
+    scales = option('scales', SCALES, lambda value: [int(s) for s in value.split(',')])
+    days = option('days', DAYS, int)
+    repeat = option('repeat', REPEAT, int)
+    tolerance = option('tolerance', TOLERANCE, float)
+    memory_tolerance = option('memory-tolerance', MEMORY_TOLERANCE, float)
+    update = '--update-baselines' in sys.argv
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if baselines and baselines.get('days') != days:
+        print(f"⚠ Baselines were recorded with {baselines.get('days')} days, not {days}")
+    if baselines and baselines.get('machine') != machine():
+        print(f"⚠ Baselines were recorded on a different machine: {baselines.get('machine')}")
+
+    results, regressions = {}, []
+    for scale in scales:
+        start = time.perf_counter()
+        results[str(scale)] = benchmark_scale(scale, days, repeat)
+        regressions += compare(scale, results[str(scale)],
+                               baselines.get('scales', {}).get(str(scale), {}),
+                               tolerance, memory_tolerance)
+        print(f"\n({time.perf_counter() - start:.0f}s for {repeat} run(s))")
+
+    if update:
+        baselines = {
+            'recorded_at': time.strftime('%Y-%m-%d'),
+            'machine': machine(),
+            'days': days,
+            'repeat': repeat,
+            'scales': {**baselines.get('scales', {}), **results},
+        }
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + '\n')
+        print(f"\n✓ Baselines written: {BASELINE_FILE}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {tolerance:.0f}% "
+              f"(memory {memory_tolerance:.0f}%):")
+        for message in regressions:
+            print(f"   {message}")
+        return 1
+    print(f"\n✓ No stage regressed beyond {tolerance:.0f}% (memory {memory_tolerance:.0f}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
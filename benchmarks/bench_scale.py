@@ -0,0 +1,62 @@
+"""
+Pipeline Scale Benchmark
+========================
+Times raw ingestion and STEP 1-5 (pandas and cube engines) on synthetic
+JHU-shaped data (src/data/synthetic.py) at several location counts, to see
+how preparation behaves beyond the 289 bundled locations.
+
+Usage:
+    python benchmarks/bench_scale.py                      # 289, 1000, 3000 locations
+    python benchmarks/bench_scale.py --locations 5000 --days 1143
+"""
+
+import sys
+import time
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import prepare_long_format, read_raw_tables
+from src.data.cube_engine import prepare_from_cube
+from src.data.profiling import StageProfiler, current_rss_mb
+from src.data.synthetic import write_jhu_csvs
+
+LOCATIONS = [289, 1000, 3000]
+DAYS = 1143  # as many dates as the bundled files
+
+
+def timed(profiler, name, func):
+    """Run func inside a profiler stage; return (result, stage record)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        with profiler.stage(name) as record:
+            result = func()
+    return result, record
+
+
+def main():
+    locations = LOCATIONS
+    if '--locations' in sys.argv:
+        locations = [int(n) for n in sys.argv[sys.argv.index('--locations') + 1].split(',')]
+    days = int(sys.argv[sys.argv.index('--days') + 1]) if '--days' in sys.argv else DAYS
+
+    print(f"\n| Locations | Rows | Read (s) | Pandas STEP 1-5 (s) | Cube STEP 1-5 (s) | Peak RSS (MB) |")
+    print("|---|---|---|---|---|---|")
+    for n_locations in locations:
+        with tempfile.TemporaryDirectory() as raw_dir:
+            write_jhu_csvs(raw_dir, n_locations=n_locations, n_days=days, seed=n_locations)
+            profiler = StageProfiler()
+            tables, read = timed(profiler, 'read', lambda: read_raw_tables(raw_dir))
+            df, pandas_run = timed(profiler, 'pandas', lambda: prepare_long_format(*tables))
+            rows = len(df)
+            del df
+            _, cube_run = timed(profiler, 'cube', lambda: prepare_from_cube(*tables))
+            peak = max(record['peak_rss_mb'] or 0 for record in profiler.stages) or current_rss_mb()
+            print(f"| {n_locations:,} | {rows:,} | {read['wall_s']:.2f} | {pandas_run['wall_s']:.2f} "
+                  f"| {cube_run['wall_s']:.2f} | {peak:.0f} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -87,6 +87,17 @@ def main():
             print("\n⚠️  Model training failed.")
             return False
     
+    # ========================================================================
+    # STEP 3: Batch Predictions (memory-mapped feature matrix)
+    # ========================================================================
+    if predict_only:
+        success = run_script(
+            'models/predict_model.py',
+            '[STEP 3] BATCH PREDICTIONS - Scoring the Feature Matrix'
+        )
+        if not success:
+            return False
+    
     # ========================================================================
     # FINAL SUMMARY
     # ========================================================================
@@ -99,7 +110,7 @@ def main():
         print("\nGenerated files:")
         
         output_files = [
-            ('data/processed/covid19_prepared_data.csv', 'Cleaned dataset with 40+ features'),
+            ('data/processed/covid19_prepared_data.parquet', 'Cleaned dataset with 40+ features'),
             ('models/trained/best_covid_warning_model.pkl', 'Production-ready model'),
             ('models/trained/model_metadata.pkl', 'Model documentation & metrics'),
             ('models/trained/per_class_performance.csv', 'Per-class metrics'),
@@ -0,0 +1,106 @@
+"""
+Content-Addressed Cache for Prepared Data
+=========================================
+The prepared frame is stored under a fingerprint of everything it depends
+on:
+- SHA-256 of each raw JHU file (absent files hash as None)
+- HORIZON_DAYS, NPI_PERIODS, VACCINE_START and POPULATION_DATA
+- PIPELINE_VERSION and the source of the preparation modules
+- run options that change the output (engine, NPI calendars)
+
+Unchanged inputs give the same fingerprint and the cached Parquet file is
+read instead of recomputing STEP 1-5. Any change gives a new fingerprint;
+entries beyond MAX_ENTRIES are evicted, least recently used first.
+
+Cache: data/processed/cache/<fingerprint>.parquet
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+from pathlib import Path
+
+from src.data.prepare_data import (
+    HORIZON_DAYS,
+    NPI_PERIODS,
+    PIPELINE_VERSION,
+    POPULATION_DATA,
+    VACCINE_START,
+)
+
+MAX_ENTRIES = 3
+# Modules whose code determines the prepared output (integrity.py decides
+# which locations a quarantine run keeps, stages.py composes checkpointed runs)
+SOURCE_FILES = ('prepare_data.py', 'cube_engine.py', 'sharded.py', 'ingest.py', 'integrity.py', 'stages.py')
+
+
+def default_cache_dir():
+    """Default location of the prepared-data cache."""
+    return Path(__file__).parent.parent.parent / 'data' / 'processed' / 'cache'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prepared_data_fingerprint(raw_files, **options):
+    """
+    Fingerprint of the prepared data for the given raw files.
+
+    Args:
+        raw_files: Paths of the raw input files
+        **options: Run options that change the output (e.g. engine)
+
+    Returns:
+        SHA-256 hex string
+    """
+    source_dir = Path(__file__).parent
+    payload = {
+        'pipeline_version': PIPELINE_VERSION,
+        'horizon_days': HORIZON_DAYS,
+        'npi_periods': NPI_PERIODS,
+        'vaccine_start': VACCINE_START,
+        'population_data': POPULATION_DATA,
+        'source': {name: file_digest(source_dir / name) for name in SOURCE_FILES},
+        'raw': {Path(f).name: file_digest(f) if Path(f).exists() else None for f in raw_files},
+        'options': options,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_cached(fingerprint, cache_dir=None):
+    """Return the cached frame for fingerprint, or None on a miss."""
+    cache_file = Path(cache_dir or default_cache_dir()) / f'{fingerprint}.parquet'
+    if not cache_file.exists():
+        return None
+    os.utime(cache_file)  # mark as recently used
+    return pd.read_parquet(cache_file)
+
+
+def store_cached(df, fingerprint, cache_dir=None, max_entries=MAX_ENTRIES):
+    """Write df under fingerprint and evict the least recently used extras."""
+    cache_dir = Path(cache_dir or default_cache_dir())
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_file = cache_dir / f'{fingerprint}.parquet'
+    # Write then rename, so an interrupted run never leaves a partial entry
+    tmp_file = cache_file.with_suffix('.tmp')
+    df.to_parquet(tmp_file, index=False)
+    tmp_file.replace(cache_file)
+    evict_stale(cache_dir, max_entries)
+    return cache_file
+
+
+def evict_stale(cache_dir=None, max_entries=MAX_ENTRIES):
+    """Keep the max_entries most recently used entries; return removed paths."""
+    cache_dir = Path(cache_dir or default_cache_dir())
+    entries = sorted(cache_dir.glob('*.parquet'), key=lambda f: f.stat().st_mtime, reverse=True)
+    for stale in entries[max_entries:]:
+        stale.unlink()
+    return entries[max_entries:]
@@ -0,0 +1,345 @@
+"""
+Dense Location x Date x Metric Preparation Engine
+=================================================
+Alternative to the long-format STEP 1-5 in prepare_data.py.
+
+The confirmed, deaths and recovered wide tables are aligned by location
+(Country/Region, Province/State) into one (location, date, metric) NumPy
+array. Cleaning and feature steps run on (location, date) arrays and the
+long DataFrame is built once at the end, skipping the melts and the two
+outer merges on float Lat/Long keys.
+
+Locations are aligned on their names, not their coordinates. Where the
+recovered file reports slightly different coordinates for a location, the
+long-format engine yields two interleaved groups for it; this engine keeps
+one, with coordinates from the confirmed file.
+"""
+
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.data.prepare_data import (
+    POPULATION_DATA,
+    FORECAST_METRICS,
+    TARGET_HORIZONS,
+    DAYS_SINCE_THRESHOLDS,
+    PCT_CHANGE_PADS,
+    _stage_context,
+    apply_dtype_plan,
+    assign_npi_phases,
+    assign_vaccine_periods,
+    assign_warning_levels,
+    column_filter,
+    future_column,
+    required_columns,
+    target_column,
+)
+
+LOCATION_KEYS = ['Country/Region', 'Province/State']
+METRICS = ['Confirmed', 'Deaths', 'Recovered']
+
+
+def build_location_cube(df_confirmed, df_deaths, df_recovered=None):
+    """
+    Align the wide JHU tables into a dense cube.
+
+    Returns:
+        cube: float64 array of shape (location, date, metric), metrics in
+            METRICS order; locations missing from a table are 0
+        locations: DataFrame of Country/Region, Province/State, Lat, Long,
+            sorted by location keys (row i describes cube[i])
+        dates: sorted DatetimeIndex (union of all tables' date columns)
+    """
+    # Location keys with Province/State filled before alignment
+    keyed = {}
+    for m, table in enumerate([df_confirmed, df_deaths, df_recovered]):
+        if table is None:
+            continue
+        table = table.copy()
+        # Raw keys may be categoricals (see ingest.py), which reject new values
+        table['Province/State'] = table['Province/State'].astype(object).fillna('All')
+        keyed[m] = table.drop_duplicates(LOCATION_KEYS, keep='first')
+
+    # Coordinates come from the first table that lists the location
+    locations = (
+        pd.concat([table[LOCATION_KEYS + ['Lat', 'Long']] for table in keyed.values()])
+        .drop_duplicates(LOCATION_KEYS, keep='first')
+        .sort_values(LOCATION_KEYS)
+        .reset_index(drop=True)
+    )
+    location_index = pd.MultiIndex.from_frame(locations[LOCATION_KEYS])
+
+    table_dates = {
+        m: pd.to_datetime(table.columns[4:], format='%m/%d/%y') for m, table in keyed.items()
+    }
+    dates = pd.DatetimeIndex([])
+    for m in table_dates:
+        dates = dates.union(table_dates[m])
+    dates = dates.sort_values()
+
+    cube = np.zeros((len(locations), len(dates), len(METRICS)), dtype=np.float64)
+    for m, table in keyed.items():
+        values = np.nan_to_num(table.iloc[:, 4:].to_numpy(dtype=np.float64), nan=0.0)
+        rows = location_index.get_indexer(pd.MultiIndex.from_frame(table[LOCATION_KEYS]))
+        cols = dates.get_indexer(table_dates[m])
+        cube[np.ix_(rows, cols, [m])] = values[:, :, None]
+
+    return cube, locations, dates
+
+
+def fill_location_coordinates(locations):
+    """Fill missing Lat/Long with the mean coordinates of the location's country."""
+    locations = locations.copy()
+    for col in ['Lat', 'Long']:
+        centroids = locations.groupby('Country/Region')[col].transform('mean')
+        locations[col] = locations[col].fillna(centroids)
+    return locations
+
+
+def rolling_mean(values, window=7):
+    """Trailing rolling mean along the date axis (min_periods=1)."""
+    padded = np.concatenate(
+        [np.full((values.shape[0], window - 1), np.nan), values], axis=1
+    )
+    windows = sliding_window_view(padded, window, axis=1)
+    return np.nanmean(windows, axis=2)
+
+
+def shifted(values, periods):
+    """Shift along the date axis within each location (NaN fill)."""
+    out = np.full(values.shape, np.nan)
+    if periods > 0:
+        out[:, periods:] = values[:, :-periods]
+    elif periods < 0:
+        out[:, :periods] = values[:, -periods:]
+    else:
+        out[:] = values
+    return out
+
+
+def safe_growth_rate(values, threshold=50):
+    """
+    Growth rate along the date axis with values below threshold masked
+    (padded over like pct_change where PCT_CHANGE_PADS).
+    """
+    clean = np.where(values >= threshold, values, np.nan)
+    if PCT_CHANGE_PADS:
+        clean = pd.DataFrame(clean).ffill(axis=1).to_numpy()
+    return clean / shifted(clean, 1) - 1
+
+
+def first_threshold_dates(confirmed, countries, dates, threshold=100):
+    """
+    Per-location date on which the location's country first reached
+    `threshold` cumulative cases in any of its locations (NaT if never).
+    """
+    reached = confirmed >= threshold
+    first_idx = np.where(reached.any(axis=1), reached.argmax(axis=1), len(dates))
+    country_first = pd.Series(first_idx).groupby(np.asarray(countries)).transform('min').to_numpy()
+    return pd.DatetimeIndex(dates.append(pd.DatetimeIndex([pd.NaT]))[country_first])
+
+
+def days_since(dates, first_dates):
+    """Days from each location's first date to every date (NaN where first date is NaT)."""
+    first_days = (pd.DatetimeIndex(first_dates) - dates[0]).days.to_numpy(dtype=np.float64)
+    day_numbers = (dates - dates[0]).days.to_numpy()
+    return day_numbers[None, :] - first_days[:, None]
+
+
+def clean_cube(cube, caps=None):
+    """
+    STEP 2.3-2.6 on the cube: cumulative maxima, daily changes, negative
+    daily values set to 0 and per-location 99th percentile outlier capping.
+    
+    Args:
+        caps: Optional (location, 2) caps for daily cases/deaths; computed
+            from the data when None
+    
+    Returns:
+        (cumulative, daily, caps) with cumulative/daily shaped like cube
+    """
+    cumulative = np.maximum.accumulate(cube, axis=1)
+
+    daily = np.zeros_like(cumulative)
+    daily[:, 1:] = np.diff(cumulative, axis=1)
+    daily[daily < 0] = 0
+
+    if caps is None:
+        caps = np.quantile(daily[:, :, :2], 0.99, axis=1)
+    np.minimum(daily[:, :, :2], caps[:, None, :], out=daily[:, :, :2])
+    return cumulative, daily, caps
+
+
+def compute_cube_features(cube, locations, dates, caps=None, start_date=None,
+                          first_100_dates=None, thresholds=DAYS_SINCE_THRESHOLDS,
+                          horizons=TARGET_HORIZONS):
+    """
+    Run the STEP 2-5 cleaning and feature logic on (location, date) arrays.
+    
+    caps, start_date and first_100_dates carry state from earlier dates (see
+    incremental.py); by default everything is derived from this cube.
+    thresholds selects the Days_Since_<N> columns and horizons the
+    *_future<N>d columns.
+    
+    Returns an ordered dict of column name -> array broadcastable to
+    (location, date), following the long-format engine's column order.
+    """
+    features = {}
+
+    # STEP 2: cleaning
+    cumulative, daily, caps = clean_cube(cube, caps=caps)
+    confirmed, deaths, recovered = (cumulative[:, :, m] for m in range(len(METRICS)))
+    daily_cases, daily_deaths, daily_recovered = (daily[:, :, m] for m in range(len(METRICS)))
+
+    features['Confirmed'] = confirmed
+    features['Deaths'] = deaths
+    features['Recovered'] = recovered
+    features['Daily_Cases'] = daily_cases
+    features['Daily_Deaths'] = daily_deaths
+    features['Daily_Recovered'] = daily_recovered
+    features['Cases_7d_MA'] = rolling_mean(daily_cases, window=7)
+    features['Deaths_7d_MA'] = rolling_mean(daily_deaths, window=7)
+
+    # STEP 3.1: temporal features (per date, broadcast over locations)
+    if start_date is None:
+        start_date = dates.min()
+    day_of_week = dates.dayofweek.to_numpy()
+    features['DayOfWeek'] = day_of_week.astype(np.int32)[None, :]
+    features['Month'] = dates.month.to_numpy().astype(np.int32)[None, :]
+    features['Quarter'] = dates.quarter.to_numpy().astype(np.int32)[None, :]
+    features['Year'] = dates.year.to_numpy().astype(np.int32)[None, :]
+    features['IsWeekend'] = np.isin(day_of_week, [5, 6]).astype(np.int64)[None, :]
+    features['Days_Since_Start'] = (dates - start_date).days.to_numpy().astype(np.int64)[None, :]
+    for threshold in thresholds:
+        if threshold == 100 and first_100_dates is not None:
+            first_dates = first_100_dates
+        else:
+            first_dates = first_threshold_dates(
+                confirmed, locations['Country/Region'], dates, threshold=threshold
+            )
+        features[f'Days_Since_{threshold}'] = days_since(dates, first_dates)
+
+    # STEP 3.2: growth metrics
+    growth = safe_growth_rate(daily_cases, threshold=50)
+    features['Growth_Rate'] = growth
+    features['Death_Growth'] = safe_growth_rate(daily_deaths, threshold=10)
+    features['Acceleration'] = growth - shifted(growth, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        doubling = np.where(growth > 0, np.log(2) / np.log(1 + growth), np.nan)
+    doubling[np.isinf(doubling)] = np.nan
+    features['Doubling_Time'] = doubling
+    features['Log_Cases'] = np.log1p(daily_cases)
+    features['Log_Deaths'] = np.log1p(daily_deaths)
+
+    # STEP 3.3: severity metrics
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features['CFR'] = np.where(confirmed > 0, (deaths / confirmed) * 100, 0)
+        features['Active_Cases'] = np.clip(confirmed - deaths - recovered, 0, None)
+        features['Recovery_Rate'] = np.where(confirmed > 0, recovered / confirmed, 0)
+        features['Death_to_Case_Ratio'] = np.where(daily_cases > 0, daily_deaths / daily_cases, 0)
+
+    # STEP 3.4: intervention indicators are added on the long frame (cube_to_frame)
+
+    # STEP 4: population normalization
+    population = locations['Country/Region'].map(POPULATION_DATA).to_numpy(dtype=np.float64)
+    if np.isnan(population).any():
+        population = np.where(np.isnan(population), np.nanmedian(population), population)
+    features['Population'] = population[:, None]
+    features['Cases_per_100k'] = (confirmed / population[:, None]) * 100000
+    features['Deaths_per_100k'] = (deaths / population[:, None]) * 100000
+
+    # STEP 5: N-day ahead metrics
+    for horizon in horizons:
+        for metric in FORECAST_METRICS:
+            features[future_column(metric, horizon)] = shifted(features[metric], -horizon)
+
+    return features
+
+
+def cube_to_frame(features, locations, dates, npi_calendars=None, dtype_report=None,
+                  horizons=TARGET_HORIZONS, columns=None):
+    """
+    Build the long-format DataFrame once from the feature arrays, adding
+    a warning level target per horizon. Each column is cast to
+    COLUMN_DTYPES as it is added, so only one full-precision column
+    exists at a time. columns (see required_columns) limits the columns
+    added.
+    """
+    n_locations, n_dates = len(locations), len(dates)
+    shape = (n_locations, n_dates)
+    wanted = column_filter(columns)
+
+    df = pd.DataFrame(index=pd.RangeIndex(n_locations * n_dates))
+
+    def add(name, values):
+        if wanted(name):
+            df[name] = values
+            apply_dtype_plan(df, [name], dtype_report)
+
+    add('Province/State', np.repeat(locations['Province/State'].astype(str).to_numpy(), n_dates))
+    add('Country/Region', np.repeat(locations['Country/Region'].astype(str).to_numpy(), n_dates))
+    add('Lat', np.repeat(locations['Lat'].to_numpy(dtype=np.float64), n_dates))
+    add('Long', np.repeat(locations['Long'].to_numpy(dtype=np.float64), n_dates))
+    add('Date', np.tile(dates.to_numpy(), n_locations))
+
+    for name, values in features.items():
+        if name == 'Population':
+            # STEP 3.4: intervention indicators (resolved per unique date)
+            if wanted('NPI_Phase') or wanted('Is_Lockdown'):
+                npi_phase = assign_npi_phases(
+                    df['Date'], countries=df['Country/Region'], calendars=npi_calendars
+                )
+                add('NPI_Phase', npi_phase)
+            if wanted('Vaccine_Period') or wanted('Is_Post_Vaccine'):
+                vaccine_period = assign_vaccine_periods(df['Date'])
+                add('Vaccine_Period', vaccine_period)
+            if wanted('Is_Lockdown'):
+                add('Is_Lockdown', (npi_phase == 'Lockdown').astype(np.int64))
+            if wanted('Is_Post_Vaccine'):
+                add('Is_Post_Vaccine', (vaccine_period == 'Post-vaccine').astype(np.int64))
+        if wanted(name):
+            add(name, np.broadcast_to(values, shape).ravel())
+
+    for horizon in horizons:
+        if wanted(target_column(horizon)):
+            add(target_column(horizon), assign_warning_levels(
+                *(df[future_column(metric, horizon)] for metric in FORECAST_METRICS)
+            ))
+    return df
+
+
+def prepare_from_cube(df_confirmed, df_deaths, df_recovered=None, npi_calendars=None,
+                      dtype_report=None, thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS,
+                      profiler=None, columns=None, start_date=None):
+    """
+    Cube-engine counterpart of STEP 1-5 of load_and_prepare_data.
+    Returns the prepared long-format DataFrame. columns lists the output
+    columns wanted, as in prepare_long_format; the dense arrays are cheap,
+    so the saving is in the columns the frame is built with. start_date
+    (for Days_Since_Start) defaults to the first date in the tables.
+    """
+    if columns is not None:
+        columns = required_columns(columns, thresholds, horizons)
+    stage = _stage_context(profiler)
+
+    print("\n✓ Aligning tables into a dense (location, date, metric) cube...")
+    with stage('STEP 1 Build Location Cube'):
+        cube, locations, dates = build_location_cube(df_confirmed, df_deaths, df_recovered)
+    print(f"✓ Cube shape (location, date, metric): {cube.shape}")
+    print(f"✓ Date range: {dates[0].date()} to {dates[-1].date()}")
+
+    print("\n[STEP 2-5] CLEANING, FEATURES AND TARGET ON ARRAYS")
+    print("-" * 80)
+    with stage('STEP 2-5 Cube Features'):
+        locations = fill_location_coordinates(locations)
+        features = compute_cube_features(cube, locations, dates,
+                                         start_date=None if start_date is None else pd.Timestamp(start_date),
+                                         thresholds=thresholds, horizons=horizons)
+    del cube
+
+    with stage('Build Long Frame', lambda: df):
+        df = cube_to_frame(features, locations, dates, npi_calendars=npi_calendars,
+                           dtype_report=dtype_report, horizons=horizons, columns=columns)
+    print(f"✓ Built long frame once: {df.shape}")
+    return df
@@ -0,0 +1,170 @@
+"""
+Memory-Mapped Feature Matrix
+============================
+Exports the prepared data as raw .npy arrays that training, CLI scoring and
+app workers open with np.load(mmap_mode='r'): the OS maps the same pages
+into every process instead of each one parsing Parquet and building its own
+float matrix.
+
+Files (data/processed/feature_matrix/):
+- features.npy        float32 (rows, features), C order; the numeric
+                      training columns (float32 is what the forest uses)
+- targets.npy         int8 (rows, horizons); codes into target_classes,
+                      -1 where the target is missing
+- location_codes.npy  int32 (rows,); index into schema['locations']
+- dates.npy           datetime64[D] (rows,)
+- schema.json         column names, classes, locations and the prepared
+                      file the arrays were built from
+"""
+
+import json
+import shutil
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.prepare_data import WARNING_LEVELS
+
+MATRIX_VERSION = 1
+LOCATION_KEYS = ['Country/Region', 'Province/State']
+# Identifier and categorical columns never used as model features
+NON_FEATURE_COLUMNS = LOCATION_KEYS + ['Date', 'Lat', 'Long', 'NPI_Phase', 'Vaccine_Period']
+MATRIX_FILES = {
+    'features': 'features.npy',
+    'targets': 'targets.npy',
+    'location_codes': 'location_codes.npy',
+    'dates': 'dates.npy',
+}
+
+FeatureMatrix = namedtuple('FeatureMatrix', ['features', 'targets', 'location_codes', 'dates', 'schema'])
+
+
+def default_matrix_dir():
+    """Default location of the exported feature matrix."""
+    return Path(__file__).parent.parent.parent / 'data' / 'processed' / 'feature_matrix'
+
+
+def source_signature(data_file):
+    """Name, size and mtime of a prepared-data file, to detect a stale matrix."""
+    stat = Path(data_file).stat()
+    return {'file': Path(data_file).name, 'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def export_feature_matrix(df, matrix_dir=None, data_file=None):
+    """
+    Write the numeric features, target codes and (location, date) row index
+    of a prepared frame as .npy files plus schema.json.
+
+    Args:
+        df: Prepared DataFrame
+        matrix_dir: Output directory (default: data/processed/feature_matrix)
+        data_file: Prepared-data file written from df; recorded so readers
+            can tell whether the matrix is current
+
+    Returns:
+        Path of the matrix directory
+    """
+    matrix_dir = Path(matrix_dir or default_matrix_dir())
+    feature_cols = [
+        col for col in df.columns
+        if col not in NON_FEATURE_COLUMNS and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    target_cols = [col for col in df.columns if col.startswith('Warning_Level')]
+
+    # Build in a sibling directory and swap it in, so readers never see a
+    # half-written matrix (open memmaps of the old files stay valid)
+    tmp_dir = matrix_dir.with_name(matrix_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    # Fill column by column: no full-frame float copy is ever materialized
+    features = np.lib.format.open_memmap(tmp_dir / MATRIX_FILES['features'], mode='w+',
+                                         dtype=np.float32, shape=(len(df), len(feature_cols)))
+    for j, col in enumerate(feature_cols):
+        features[:, j] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    features.flush()
+    del features
+
+    targets = np.column_stack([
+        pd.Categorical(df[col], categories=WARNING_LEVELS).codes.astype(np.int8)
+        for col in target_cols
+    ]) if target_cols else np.empty((len(df), 0), dtype=np.int8)
+    np.save(tmp_dir / MATRIX_FILES['targets'], targets)
+
+    grouped = df.groupby(LOCATION_KEYS, observed=True, sort=False)
+    np.save(tmp_dir / MATRIX_FILES['location_codes'], grouped.ngroup().to_numpy(dtype=np.int32))
+    locations = df[LOCATION_KEYS].drop_duplicates().astype(str).to_numpy().tolist()
+    np.save(tmp_dir / MATRIX_FILES['dates'], df['Date'].to_numpy().astype('datetime64[D]'))
+
+    schema = {
+        'version': MATRIX_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': len(df),
+        'feature_columns': feature_cols,
+        'feature_dtype': 'float32',
+        'target_columns': target_cols,
+        'target_classes': WARNING_LEVELS,
+        'target_missing_code': -1,
+        'location_keys': LOCATION_KEYS,
+        'locations': locations,
+        'files': MATRIX_FILES,
+        'source': source_signature(data_file) if data_file else None,
+    }
+    (tmp_dir / 'schema.json').write_text(json.dumps(schema, indent=2))
+
+    shutil.rmtree(matrix_dir, ignore_errors=True)
+    tmp_dir.replace(matrix_dir)
+    return matrix_dir
+
+
+def open_feature_matrix(matrix_dir=None, data_file=None, mmap_mode='r'):
+    """
+    Open an exported matrix without reading it into memory.
+
+    Args:
+        matrix_dir: Matrix directory (default: data/processed/feature_matrix)
+        data_file: If given, return None unless the matrix was exported from
+            this prepared-data file as it is now
+        mmap_mode: np.load memory-map mode ('r' shares pages read-only)
+
+    Returns:
+        FeatureMatrix of memory-mapped arrays and the schema, or None if
+        there is no (current) matrix
+    """
+    matrix_dir = Path(matrix_dir or default_matrix_dir())
+    schema_file = matrix_dir / 'schema.json'
+    if not schema_file.exists():
+        return None
+    schema = json.loads(schema_file.read_text())
+    if schema.get('version') != MATRIX_VERSION:
+        return None
+    if data_file is not None and schema['source'] != source_signature(data_file):
+        return None
+    arrays = {name: np.load(matrix_dir / file, mmap_mode=mmap_mode)
+              for name, file in schema['files'].items()}
+    return FeatureMatrix(schema=schema, **arrays)
+
+
+def matrix_columns(matrix, columns, rows=slice(None)):
+    """
+    Feature values of some rows (default: all) for the named columns: a view
+    of the mapped array when they are all its columns in order, otherwise a
+    gathered copy of just those rows. Pass row slices to stay chunk-sized.
+    """
+    feature_cols = matrix.schema['feature_columns']
+    block = matrix.features[rows]
+    if list(columns) == feature_cols:
+        return block
+    return block[:, [feature_cols.index(col) for col in columns]]
+
+
+def matrix_row_index(matrix, rows=slice(None)):
+    """Country/Region, Province/State and Date of matrix rows as a DataFrame."""
+    locations = np.array(matrix.schema['locations'], dtype=object).reshape(-1, len(LOCATION_KEYS))
+    codes = np.asarray(matrix.location_codes[rows])
+    index = pd.DataFrame(locations[codes], columns=matrix.schema['location_keys'])
+    index['Date'] = pd.to_datetime(np.asarray(matrix.dates[rows]))
+    return index
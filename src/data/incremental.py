@@ -0,0 +1,273 @@
+"""
+Incremental Daily Preparation
+=============================
+JHU appends one date column per day. Instead of recomputing every feature
+over the full history, this mode keeps per-location state between runs and
+only processes the newly appended date columns.
+
+State (data/processed/incremental/prepare_state.pkl):
+- context: the last CONTEXT_DAYS of cumulative counts per location. This
+  holds the cumulative maxima, the tails for the 7-day moving averages and
+  the inputs of the last growth rate.
+- caps: per-location 99th percentile caps for daily cases/deaths, frozen at
+  bootstrap. They are refreshed by the next full bootstrap.
+- first_100_dates: first date each location's country reached 100 cases.
+- pending: the last horizon_days prepared rows per location, whose
+  horizon-ahead target is not known yet.
+- horizon_days: the forecast horizon the *_future<N>d and
+  Warning_Level_<N>d_Ahead columns are built for (default HORIZON_DAYS).
+
+Output is append-only: each run writes part-NNNNN.parquet with the rows
+it finalized (new rows plus back-filled pending rows), and rewrites
+pending.parquet. read_incremental_output() reassembles the prepared dataset,
+and prepare_incremental() publishes it as data/processed/
+covid19_prepared_data.parquet, the file training reads.
+
+Features are computed by the cube engine (cube_engine.py), which matches
+load_and_prepare_data() except in two ways:
+- locations are aligned on their names. Where the recovered file reports
+  different coordinates for a location, the default engine yields two
+  interleaved groups for it; this mode keeps one, with the confirmed
+  file's coordinates.
+- the outlier caps are frozen at bootstrap, while a full run recomputes
+  them over all dates.
+
+Usage:
+    python -m src.data.incremental           # bootstrap or refresh
+    python -m src.data.incremental --full    # force a full bootstrap
+    python -m src.data.incremental --horizon 14
+"""
+
+import sys
+import shutil
+import joblib
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from src.data.prepare_data import (
+    CATEGORICAL_COLUMNS,
+    FORECAST_METRICS,
+    HORIZON_DAYS,
+    apply_dtype_plan,
+    assign_warning_levels,
+    future_column,
+    read_raw_tables,
+    save_prepared_data,
+    target_column,
+)
+from src.data.cube_engine import (
+    LOCATION_KEYS,
+    build_location_cube,
+    fill_location_coordinates,
+    clean_cube,
+    first_threshold_dates,
+    compute_cube_features,
+    cube_to_frame,
+    shifted,
+)
+
+# 7-day MA window plus one day for the first daily difference
+CONTEXT_DAYS = 8
+STATE_FILE = 'prepare_state.pkl'
+PENDING_FILE = 'pending.parquet'
+
+
+def default_output_dir():
+    """Default location of the incremental output and state."""
+    return Path(__file__).parent.parent.parent / 'data' / 'processed' / 'incremental'
+
+
+def _split_pending(df, n_pending):
+    """Split a location/date-sorted frame into (final rows, last n_pending rows per location)."""
+    from_end = df.groupby(LOCATION_KEYS, sort=False).cumcount(ascending=False)
+    return df[from_end >= n_pending], df[from_end < n_pending]
+
+
+def _save_state(output_dir, state, final_rows):
+    """Write the finalized rows as the next part file, then pending rows and state."""
+    part_file = output_dir / f"part-{state['n_parts']:05d}.parquet"
+    final_rows.to_parquet(part_file, index=False)
+    state['n_parts'] += 1
+    state['pending'].to_parquet(output_dir / PENDING_FILE, index=False)
+    joblib.dump(state, output_dir / STATE_FILE)
+    return part_file
+
+
+def bootstrap_incremental(df_confirmed, df_deaths, df_recovered=None, output_dir=None, horizon=HORIZON_DAYS):
+    """
+    Full preparation over all dates that also initializes the incremental
+    state for a forecast horizon. Existing incremental output in output_dir
+    is replaced. Returns the prepared DataFrame.
+    """
+    output_dir = Path(output_dir) if output_dir else default_output_dir()
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+
+    cube, locations, dates = build_location_cube(df_confirmed, df_deaths, df_recovered)
+    locations = fill_location_coordinates(locations)
+    cumulative, _, caps = clean_cube(cube)
+    first_100 = first_threshold_dates(cumulative[:, :, 0], locations['Country/Region'], dates)
+
+    features = compute_cube_features(cube, locations, dates, caps=caps, first_100_dates=first_100,
+                                     horizons=(horizon,))
+    df = cube_to_frame(features, locations, dates, horizons=(horizon,))
+    final_rows, pending = _split_pending(df, horizon)
+
+    state = {
+        'horizon_days': horizon,
+        'locations': locations,
+        'start_date': dates.min(),
+        'last_date': dates.max(),
+        'context': cumulative[:, -CONTEXT_DAYS:],
+        'context_dates': dates[-CONTEXT_DAYS:],
+        'caps': caps,
+        'first_100_dates': first_100,
+        'pending': pending.reset_index(drop=True),
+        'n_parts': 0,
+    }
+    part_file = _save_state(output_dir, state, final_rows)
+    print(f"✓ Bootstrapped {len(dates)} days for {len(locations)} locations -> {part_file.name}")
+    return df
+
+
+def update_incremental(df_confirmed, df_deaths, df_recovered=None, output_dir=None, horizon=HORIZON_DAYS):
+    """
+    Process only the date columns appended since the last run.
+
+    Falls back to bootstrap_incremental when there is no state, the
+    horizon changed or the set of locations changed.
+    Returns the rows written by this run (new rows plus back-filled rows).
+    """
+    output_dir = Path(output_dir) if output_dir else default_output_dir()
+    state_file = output_dir / STATE_FILE
+    if not state_file.exists():
+        print("⚠ No incremental state found, running full bootstrap")
+        return bootstrap_incremental(df_confirmed, df_deaths, df_recovered, output_dir, horizon)
+
+    state = joblib.load(state_file)
+    if state['horizon_days'] != horizon:
+        print("⚠ Forecast horizon changed, running full bootstrap")
+        return bootstrap_incremental(df_confirmed, df_deaths, df_recovered, output_dir, horizon)
+
+    # Keep only the identifier columns and dates after the last processed date
+    def new_columns_only(table):
+        if table is None:
+            return None
+        dates = pd.to_datetime(table.columns[4:], format='%m/%d/%y')
+        return table[list(table.columns[:4]) + list(table.columns[4:][dates > state['last_date']])]
+
+    tables = [new_columns_only(t) for t in (df_confirmed, df_deaths, df_recovered)]
+    if tables[0].shape[1] == 4:
+        print(f"✓ No new dates after {state['last_date'].date()}")
+        return state['pending'].iloc[:0]
+
+    new_cube, new_locations, new_dates = build_location_cube(*tables)
+    locations = state['locations']
+    if not new_locations[LOCATION_KEYS].equals(locations[LOCATION_KEYS]):
+        print("⚠ Location set changed, running full bootstrap")
+        return bootstrap_incremental(df_confirmed, df_deaths, df_recovered, output_dir, horizon)
+
+    # Features over context + new days; the context columns are dropped afterwards
+    window_cube = np.concatenate([state['context'], new_cube], axis=1)
+    window_dates = state['context_dates'].append(new_dates)
+    first_100 = state['first_100_dates']
+    if first_100.isna().any():
+        window_first = first_threshold_dates(
+            np.maximum.accumulate(window_cube[:, :, 0], axis=1),
+            locations['Country/Region'], window_dates
+        )
+        first_100 = first_100.where(~first_100.isna(), window_first)
+
+    features = compute_cube_features(
+        window_cube, locations, window_dates, caps=state['caps'],
+        start_date=state['start_date'], first_100_dates=first_100, horizons=(horizon,)
+    )
+    n_locations, n_context = len(locations), len(state['context_dates'])
+    shape = (n_locations, len(window_dates))
+    new_features = {
+        name: np.broadcast_to(values, shape)[:, n_context:] for name, values in features.items()
+    }
+
+    # Back-fill the lookahead target of pending rows from the new days
+    pending = state['pending'].copy()
+    target_col = target_column(horizon)
+    for metric in FORECAST_METRICS:
+        combined = np.concatenate(
+            [pending[metric].to_numpy(dtype=np.float64).reshape(n_locations, horizon),
+             new_features[metric]], axis=1
+        )
+        future = shifted(combined, -horizon)
+        pending[future_column(metric, horizon)] = future[:, :horizon].ravel()
+        new_features[future_column(metric, horizon)] = future[:, horizon:]
+    pending[target_col] = assign_warning_levels(
+        *(pending[future_column(metric, horizon)] for metric in FORECAST_METRICS)
+    )
+    apply_dtype_plan(pending, [target_col])
+
+    new_rows = cube_to_frame(new_features, locations, new_dates, horizons=(horizon,))
+    window_rows = (
+        pd.concat([pending, new_rows], ignore_index=True)
+        .sort_values(LOCATION_KEYS + ['Date'], kind='stable')
+        .reset_index(drop=True)
+    )
+    # Categories differ between chunks, so concat falls back to object
+    apply_dtype_plan(window_rows, CATEGORICAL_COLUMNS)
+    final_rows, pending = _split_pending(window_rows, horizon)
+
+    cumulative = np.maximum.accumulate(window_cube, axis=1)
+    state.update({
+        'last_date': new_dates.max(),
+        'context': cumulative[:, -CONTEXT_DAYS:],
+        'context_dates': window_dates[-CONTEXT_DAYS:],
+        'first_100_dates': first_100,
+        'pending': pending.reset_index(drop=True),
+    })
+    part_file = _save_state(output_dir, state, final_rows)
+    print(f"✓ Processed {len(new_dates)} new day(s) up to {new_dates.max().date()} -> {part_file.name}")
+    return window_rows
+
+
+def read_incremental_output(output_dir=None):
+    """Reassemble the prepared dataset from the part files and pending rows."""
+    output_dir = Path(output_dir) if output_dir else default_output_dir()
+    files = sorted(output_dir.glob('part-*.parquet')) + [output_dir / PENDING_FILE]
+    df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    horizon = joblib.load(output_dir / STATE_FILE)['horizon_days']
+    apply_dtype_plan(df, CATEGORICAL_COLUMNS + [target_column(horizon)])
+    return df.sort_values(LOCATION_KEYS + ['Date'], kind='stable').reset_index(drop=True)
+
+
+def prepare_incremental(raw_data_dir=None, output_dir=None, full=False, horizon=HORIZON_DAYS,
+                        processed_data_dir=None):
+    """
+    Read the raw JHU tables, bootstrap or refresh the incremental output and
+    write the reassembled dataset as the prepared data file in
+    processed_data_dir (default data/processed).
+    """
+    print("\n" + "="*80)
+    print("COVID-19 DATA PREPARATION (INCREMENTAL)")
+    print("="*80)
+
+    raw_data_dir = raw_data_dir or Path(__file__).parent.parent.parent / 'data' / 'raw'
+    raw_tables = read_raw_tables(raw_data_dir)
+    if raw_tables is None:
+        print(f"\n❌ Required data files not found in {raw_data_dir}")
+        return None
+
+    if full:
+        rows = bootstrap_incremental(*raw_tables, output_dir=output_dir, horizon=horizon)
+    else:
+        rows = update_incremental(*raw_tables, output_dir=output_dir, horizon=horizon)
+
+    processed_data_dir = Path(processed_data_dir) if processed_data_dir else default_output_dir().parent
+    processed_data_dir.mkdir(parents=True, exist_ok=True)
+    output_file, = save_prepared_data(read_incremental_output(output_dir), processed_data_dir)
+    print(f"✓ Prepared data written: {output_file}")
+    return rows
+
+
+if __name__ == '__main__':
+    horizon = int(sys.argv[sys.argv.index('--horizon') + 1]) if '--horizon' in sys.argv else HORIZON_DAYS
+    prepare_incremental(full='--full' in sys.argv, horizon=horizon)
@@ -0,0 +1,103 @@
+"""
+Raw JHU Ingestion
+=================
+Reads the wide confirmed/deaths/recovered CSVs with pyarrow's CSV reader:
+- explicit types: int32 counts, float64 coordinates, categorical location
+  keys, so no type inference runs over ~1,100 date columns
+- optional date window: only the date columns inside [start_date, end_date]
+  are converted, the header is read first to select them
+- compressed inputs: <name>.csv.gz or <name>.csv.zst are read directly when
+  the plain CSV is absent
+- the tables are read concurrently, one thread per file (pyarrow releases
+  the GIL while parsing)
+"""
+
+import csv
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+ID_COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long']
+RAW_SUFFIXES = ('', '.gz', '.zst')
+DATE_FORMAT = '%m/%d/%y'
+COLUMN_TYPES = {
+    'Province/State': pa.dictionary(pa.int32(), pa.string()),
+    'Country/Region': pa.dictionary(pa.int32(), pa.string()),
+    'Lat': pa.float64(),
+    'Long': pa.float64(),
+}
+COUNT_TYPE = pa.int32()
+
+
+def find_raw_file(raw_data_dir, name):
+    """Return the plain or compressed raw file for name, or None if absent."""
+    for suffix in RAW_SUFFIXES:
+        path = Path(raw_data_dir) / f'{name}{suffix}'
+        if path.exists():
+            return path
+    return None
+
+
+def read_header(path, block_size=1 << 16):
+    """Column names from the first line of a (possibly compressed) CSV."""
+    head = b''
+    with pa.input_stream(str(path), compression='detect') as stream:
+        while b'\n' not in head:
+            block = stream.read(block_size)
+            if not block:
+                break
+            head += block
+    first_line = head.split(b'\n', 1)[0].decode('utf-8-sig').rstrip('\r')
+    return next(csv.reader([first_line]))
+
+
+def select_date_columns(columns, start_date=None, end_date=None):
+    """Date columns (after the 4 id columns) inside the inclusive window."""
+    date_columns = list(columns[4:])
+    dates = pd.to_datetime(date_columns, format=DATE_FORMAT)
+    keep = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        keep &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        keep &= dates <= pd.Timestamp(end_date)
+    return [col for col, kept in zip(date_columns, keep) if kept]
+
+
+def read_wide_table(path, start_date=None, end_date=None):
+    """
+    Read one wide JHU table with explicit types.
+
+    Args:
+        path: .csv, .csv.gz or .csv.zst file
+        start_date, end_date: Optional inclusive date window
+
+    Returns:
+        DataFrame with the 4 id columns and the selected date columns
+    """
+    columns = read_header(path)
+    date_columns = select_date_columns(columns, start_date, end_date)
+    column_types = dict(COLUMN_TYPES, **{col: COUNT_TYPE for col in date_columns})
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types,
+        include_columns=ID_COLUMNS + date_columns,
+        strings_can_be_null=True,
+    )
+    with pa.input_stream(str(path), compression='detect') as stream:
+        table = pa_csv.read_csv(stream, convert_options=convert_options)
+    return table.to_pandas()
+
+
+def read_wide_tables(paths, start_date=None, end_date=None, max_workers=None):
+    """
+    Read several wide tables concurrently.
+    Entries of paths that are None stay None in the returned list.
+    """
+    existing = [path for path in paths if path is not None]
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(existing))) as pool:
+        tables = iter(list(pool.map(
+            lambda path: read_wide_table(path, start_date, end_date), existing
+        )))
+    return [next(tables) if path is not None else None for path in paths]
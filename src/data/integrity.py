@@ -0,0 +1,202 @@
+"""
+Raw Data Integrity Scanner
+==========================
+Vectorized checks over the wide confirmed/deaths/recovered tables, run
+before preparation so bad inputs surface in well under a second instead
+of after STEP 1-5.
+
+Table-level issues (reported as messages):
+- date columns that differ between the tables, are not consecutive days
+  or repeat
+
+Per-location anomaly counts (one row per (Country/Region, Province/State)):
+- Duplicate_Rows: extra rows with the same key, over all tables
+- Missing_Values / Negative_Values: NaN and negative cumulative counts
+- <Metric>_Decreases: day-over-day drops of a cumulative series (STEP 2
+  repairs them with a running maximum)
+- Missing_Coordinates and the tables a location is absent from
+
+A location is Flagged when its confirmed or deaths series cannot be
+trusted: duplicate rows, missing or negative counts, or decreases on more
+than max_decrease_share of its days. Recovered is reported but never
+flags a location (JHU stopped maintaining it).
+
+Policies for load_and_prepare_data(integrity=...):
+- 'warn': print the summary and continue
+- 'abort': stop before preparation on a table issue or a flagged location
+- 'quarantine': drop flagged locations from every table and continue
+  (table issues still abort)
+
+Report: data/processed/integrity_report.csv
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+METRICS = ('Confirmed', 'Deaths', 'Recovered')
+LOCATION_KEYS = ['Country/Region', 'Province/State']
+INTEGRITY_POLICIES = ('off', 'warn', 'abort', 'quarantine')
+MAX_DECREASE_SHARE = 0.05  # share of a location's days with a cumulative drop
+
+IntegrityReport = namedtuple('IntegrityReport', ['locations', 'table_issues'])
+
+
+def location_keys(table):
+    """(Country/Region, Province/State) of each row, with STEP 1's 'All' fill."""
+    return pd.MultiIndex.from_arrays([table['Country/Region'].astype(object),
+                                      table['Province/State'].astype(object).fillna('All')],
+                                     names=LOCATION_KEYS)
+
+
+def date_column_issues(tables):
+    """Messages for date columns that are misaligned, unparseable, repeated or not daily."""
+    issues = []
+    reference = list(tables[0].columns[4:])
+    for metric, table in zip(METRICS, tables):
+        if table is None:
+            continue
+        columns = list(table.columns[4:])
+        if metric != METRICS[0] and columns != reference:
+            missing = sorted(set(reference) - set(columns))
+            extra = sorted(set(columns) - set(reference))
+            issues.append(f"{metric}: date columns differ from Confirmed "
+                          f"({len(missing)} missing, {len(extra)} extra"
+                          f"{', out of order' if not missing and not extra else ''})")
+        dates = pd.to_datetime(pd.Index(columns), format='%m/%d/%y', errors='coerce')
+        if dates.isna().any():
+            issues.append(f"{metric}: {int(dates.isna().sum())} unparseable date column(s)")
+            continue
+        steps = np.diff(dates.values).astype('timedelta64[D]').astype(np.int64)
+        if (steps == 0).any():
+            issues.append(f"{metric}: {int((steps == 0).sum())} repeated date column(s)")
+        if (steps < 0).any() or (steps > 1).any():
+            issues.append(f"{metric}: dates are not consecutive days "
+                          f"({int((steps > 1).sum())} gap(s), {int((steps < 0).sum())} step(s) back)")
+    return issues
+
+
+def scan_raw_tables(df_confirmed, df_deaths, df_recovered=None, max_decrease_share=MAX_DECREASE_SHARE):
+    """
+    Scan the wide tables for integrity issues.
+
+    Args:
+        df_confirmed, df_deaths, df_recovered: Wide JHU tables (see ingest.py)
+        max_decrease_share: Flag locations whose confirmed or deaths series
+            drops on more than this share of days
+
+    Returns:
+        IntegrityReport(locations, table_issues): locations holds one row
+        of anomaly counts per location, in key order; table_issues is a
+        list of messages
+    """
+    tables = (df_confirmed, df_deaths, df_recovered)
+    keys = [None if t is None else location_keys(t) for t in tables]
+    index = pd.MultiIndex.from_tuples(
+        sorted(set().union(*(k for k in keys if k is not None))), names=LOCATION_KEYS
+    )
+    n_locations = len(index)
+
+    def per_location(codes, values):
+        return np.bincount(codes, weights=values, minlength=n_locations).astype(np.int64)
+
+    counts = {name: np.zeros(n_locations, dtype=np.int64) for name in [
+        'Duplicate_Rows', 'Missing_Values', 'Negative_Values',
+        'Confirmed_Decreases', 'Deaths_Decreases', 'Recovered_Decreases', 'Missing_Coordinates'
+    ]}
+    untrusted = np.zeros(n_locations, dtype=np.int64)
+    days = max(1, len(df_confirmed.columns) - 5)
+    decrease_limit = np.zeros(n_locations, dtype=bool)
+    present = {}
+    for metric, table, table_keys in zip(METRICS, tables, keys):
+        present[f'In_{metric}'] = np.zeros(n_locations, dtype=bool)
+        if table is None:
+            continue
+        codes = index.get_indexer(table_keys)
+        rows = np.bincount(codes, minlength=n_locations)
+        present[f'In_{metric}'] = rows > 0
+        duplicates = np.maximum(rows - 1, 0)
+        values = table.iloc[:, 4:].to_numpy(dtype=np.float64)
+        missing = per_location(codes, np.isnan(values).sum(axis=1))
+        negative = per_location(codes, (values < 0).sum(axis=1))
+        with np.errstate(invalid='ignore'):
+            decreases = per_location(codes, (np.diff(values, axis=1) < 0).sum(axis=1))
+        counts['Duplicate_Rows'] += duplicates
+        counts['Missing_Values'] += missing
+        counts['Negative_Values'] += negative
+        counts[f'{metric}_Decreases'] = decreases
+        if metric != 'Recovered':
+            untrusted += duplicates + missing + negative
+            decrease_limit |= decreases > max_decrease_share * days
+        coordinates = table[['Lat', 'Long']].isna().any(axis=1).to_numpy()
+        counts['Missing_Coordinates'] = np.maximum(counts['Missing_Coordinates'],
+                                                   per_location(codes, coordinates))
+
+    locations = pd.DataFrame({**counts, **present}, index=index)
+    locations['Flagged'] = (untrusted > 0) | decrease_limit
+    return IntegrityReport(locations.reset_index(), date_column_issues(tables))
+
+
+def quarantine_locations(tables, report):
+    """Tables without the rows of flagged locations (None entries stay None)."""
+    flagged = report.locations.loc[report.locations['Flagged'], LOCATION_KEYS]
+    flagged = pd.MultiIndex.from_frame(flagged)
+    return tuple(
+        None if t is None else t[~location_keys(t).isin(flagged)].reset_index(drop=True)
+        for t in tables
+    )
+
+
+def print_integrity_summary(report):
+    """Print table issues and per-check totals."""
+    locations = report.locations
+    for issue in report.table_issues:
+        print(f"❌ {issue}")
+    totals = locations.drop(columns=LOCATION_KEYS + ['Flagged']).sum()
+    print(f"✓ Scanned {len(locations):,} locations")
+    for name, total in totals.items():
+        if name.startswith('In_'):
+            absent = len(locations) - int(total)
+            if absent:
+                print(f"⚠ {absent:,} location(s) missing from {name[3:]}")
+        elif total:
+            affected = int((locations[name] > 0).sum())
+            print(f"⚠ {name}: {int(total):,} across {affected:,} location(s)")
+    flagged = int(locations['Flagged'].sum())
+    if flagged:
+        print(f"⚠ {flagged:,} location(s) flagged as untrustworthy")
+
+
+def apply_integrity_policy(tables, policy='warn', report_file=None,
+                           max_decrease_share=MAX_DECREASE_SHARE):
+    """
+    Scan tables, print the summary, write the per-location report and apply
+    policy (see INTEGRITY_POLICIES).
+
+    Returns:
+        The tables to prepare (without flagged locations when
+        quarantining), or None when the policy aborts
+    """
+    if policy not in INTEGRITY_POLICIES:
+        raise ValueError(f"integrity must be one of {INTEGRITY_POLICIES}, got {policy!r}")
+    if policy == 'off':
+        return tables
+
+    report = scan_raw_tables(*tables, max_decrease_share=max_decrease_share)
+    print_integrity_summary(report)
+    if report_file is not None:
+        report.locations.to_csv(report_file, index=False)
+        print(f"✓ Integrity report: {report_file}")
+
+    flagged = int(report.locations['Flagged'].sum())
+    if policy == 'warn':
+        return tables
+    if report.table_issues or (policy == 'abort' and flagged):
+        print(f"❌ Integrity check failed ({len(report.table_issues)} table issue(s), "
+              f"{flagged} flagged location(s)); preparation aborted")
+        return None
+    if policy == 'quarantine' and flagged:
+        print(f"⚠ Quarantined {flagged:,} flagged location(s)")
+        return quarantine_locations(tables, report)
+    return tables
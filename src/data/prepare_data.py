@@ -12,14 +12,17 @@ Based on full research pipeline with:
 - Population-normalized metrics
 - Warning level classification (7-day ahead prediction)
 
-Generates: data/processed/covid19_prepared_data.csv
+Generates: data/processed/covid19_prepared_data.parquet
+           (or .feather; optional .csv export)
 """
 
+import re
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 import warnings
+from contextlib import nullcontext
 warnings.filterwarnings('ignore')
 
 # Comprehensive population data (2020 estimates)
@@ -66,7 +69,179 @@ NPI_PERIODS = {
 }
 
 VACCINE_START = pd.to_datetime('2021-01-01')
-HORIZON_DAYS = 7  # 7-day ahead prediction
+# Bump when the prepared columns or their meaning change; part of the cache key
+PIPELINE_VERSION = '2.0'
+RAW_DATA_FILES = (
+    'time_series_covid19_confirmed_global.csv',
+    'time_series_covid19_deaths_global.csv',
+    'time_series_covid19_recovered_global.csv',
+)
+PREPARED_DATA_NAME = 'covid19_prepared_data'
+OUTPUT_FORMATS = ('parquet', 'feather')
+CATEGORICAL_COLUMNS = ['Country/Region', 'Province/State', 'NPI_Phase', 'Vaccine_Period']
+WARNING_LEVELS = ['LOW_MONITORING', 'MODERATE_MEASURES', 'HIGH_RESTRICTIONS', 'CRITICAL_LOCKDOWN']
+
+# Declared dtype of every column the pipeline produces. Columns that feed the
+# warning-level thresholds (directly or via Growth_Rate) stay float64 so the
+# target labels are unchanged; other measurements use float32, counts int32,
+# calendar fields and flags small ints and string keys categoricals.
+COLUMN_DTYPES = {
+    'Province/State': 'category',
+    'Country/Region': 'category',
+    'Lat': 'float32',
+    'Long': 'float32',
+    'Date': 'datetime64[ns]',
+    'Confirmed': 'int32',
+    'Deaths': 'int32',
+    'Recovered': 'int32',
+    'Daily_Cases': 'float64',
+    'Daily_Deaths': 'float32',
+    'Daily_Recovered': 'float32',
+    'Cases_7d_MA': 'float32',
+    'Deaths_7d_MA': 'float32',
+    'DayOfWeek': 'int8',
+    'Month': 'int8',
+    'Quarter': 'int8',
+    'Year': 'int16',
+    'IsWeekend': 'int8',
+    'Days_Since_Start': 'int16',
+    'Days_Since_100': 'float32',
+    'Growth_Rate': 'float64',
+    'Death_Growth': 'float32',
+    'Acceleration': 'float32',
+    'Doubling_Time': 'float64',
+    'Log_Cases': 'float32',
+    'Log_Deaths': 'float32',
+    'CFR': 'float64',
+    'Active_Cases': 'int32',
+    'Recovery_Rate': 'float32',
+    'Death_to_Case_Ratio': 'float32',
+    'NPI_Phase': 'category',
+    'Vaccine_Period': 'category',
+    'Is_Lockdown': 'int8',
+    'Is_Post_Vaccine': 'int8',
+    'Population': 'float64',
+    'Cases_per_100k': 'float64',
+    'Deaths_per_100k': 'float32',
+    'Growth_Rate_future7d': 'float64',
+    'Cases_per_100k_future7d': 'float64',
+    'Doubling_Time_future7d': 'float64',
+    'CFR_future7d': 'float64',
+    'Warning_Level_7d_Ahead': pd.CategoricalDtype(WARNING_LEVELS),
+}
+HORIZON_DAYS = 7  # 7-day ahead prediction (the model's default target)
+# Series.pct_change() forward-fills NaNs before pandas 3 (fill_method='pad');
+# the growth-rate kernels follow the installed version, as safe_growth_rate does
+PCT_CHANGE_PADS = int(pd.__version__.split('.')[0]) < 3
+TARGET_HORIZONS = (HORIZON_DAYS,)  # *_future<N>d / Warning_Level_<N>d_Ahead columns
+FORECAST_METRICS = ['Growth_Rate', 'Cases_per_100k', 'Doubling_Time', 'CFR']
+DAYS_SINCE_THRESHOLDS = (100,)  # Days_Since_<N> columns
+
+# Columns every run produces (STEP 1 and the cumulative-count cleaning)
+BASE_COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long', 'Date',
+                'Confirmed', 'Deaths', 'Recovered']
+# Inputs of every derived column, in the order the pipeline creates them.
+# Days_Since_<N>, *_future<N>d and Warning_Level_<N>d_Ahead follow the
+# entries of Days_Since_100 and the HORIZON_DAYS columns (see feature_inputs).
+# Is_Lockdown and Is_Post_Vaccine read the phase calendars directly, so the
+# string columns NPI_Phase and Vaccine_Period are only built when requested.
+FEATURE_INPUTS = {
+    'Daily_Cases': ['Confirmed'],
+    'Daily_Deaths': ['Deaths'],
+    'Daily_Recovered': ['Recovered'],
+    'Cases_7d_MA': ['Daily_Cases'],
+    'Deaths_7d_MA': ['Daily_Deaths'],
+    'DayOfWeek': ['Date'],
+    'Month': ['Date'],
+    'Quarter': ['Date'],
+    'Year': ['Date'],
+    'IsWeekend': ['DayOfWeek'],
+    'Days_Since_Start': ['Date'],
+    'Days_Since_100': ['Country/Region', 'Date', 'Confirmed'],
+    'Growth_Rate': ['Daily_Cases'],
+    'Death_Growth': ['Daily_Deaths'],
+    'Acceleration': ['Growth_Rate'],
+    'Doubling_Time': ['Growth_Rate'],
+    'Log_Cases': ['Daily_Cases'],
+    'Log_Deaths': ['Daily_Deaths'],
+    'CFR': ['Confirmed', 'Deaths'],
+    'Active_Cases': ['Confirmed', 'Deaths', 'Recovered'],
+    'Recovery_Rate': ['Confirmed', 'Recovered'],
+    'Death_to_Case_Ratio': ['Daily_Cases', 'Daily_Deaths'],
+    'NPI_Phase': ['Country/Region', 'Date'],
+    'Vaccine_Period': ['Date'],
+    'Is_Lockdown': ['Country/Region', 'Date'],
+    'Is_Post_Vaccine': ['Date'],
+    'Population': ['Country/Region'],
+    'Cases_per_100k': ['Confirmed', 'Population'],
+    'Deaths_per_100k': ['Deaths', 'Population'],
+    'Growth_Rate_future7d': ['Growth_Rate'],
+    'Cases_per_100k_future7d': ['Cases_per_100k'],
+    'Doubling_Time_future7d': ['Doubling_Time'],
+    'CFR_future7d': ['CFR'],
+    'Warning_Level_7d_Ahead': ['Growth_Rate_future7d', 'Cases_per_100k_future7d',
+                               'Doubling_Time_future7d', 'CFR_future7d'],
+}
+
+def future_column(metric, horizon=HORIZON_DAYS):
+    """Name of a metric's value `horizon` days ahead."""
+    return f'{metric}_future{horizon}d'
+
+def target_column(horizon=HORIZON_DAYS):
+    """Name of the warning level target `horizon` days ahead."""
+    return f'Warning_Level_{horizon}d_Ahead'
+
+def pipeline_columns(thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS):
+    """Every column a full run produces, in output order."""
+    columns = list(BASE_COLUMNS)
+    for col in FEATURE_INPUTS:
+        if col == 'Days_Since_100':
+            columns += [f'Days_Since_{n}' for n in thresholds]
+        elif not re.search(r'_future\d+d$|^Warning_Level_', col):
+            columns.append(col)
+    columns += [future_column(metric, h) for h in horizons for metric in FORECAST_METRICS]
+    columns += [target_column(h) for h in horizons]
+    return columns
+
+def feature_inputs(col):
+    """Declared inputs of a derived column (empty for BASE_COLUMNS)."""
+    if col in BASE_COLUMNS:
+        return []
+    if col in FEATURE_INPUTS:
+        return FEATURE_INPUTS[col]
+    if re.fullmatch(r'Days_Since_\d+', col):
+        return FEATURE_INPUTS['Days_Since_100']
+    match = re.fullmatch(r'(.+)_future\d+d', col)
+    if match:
+        return [match.group(1)]
+    match = re.fullmatch(r'Warning_Level_(\d+)d_Ahead', col)
+    if match:
+        return [future_column(metric, int(match.group(1))) for metric in FORECAST_METRICS]
+    raise KeyError(col)
+
+def required_columns(columns, thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS):
+    """
+    Transitive closure of the requested columns over FEATURE_INPUTS, plus
+    BASE_COLUMNS, in output order. Raises ValueError for a column this
+    configuration does not produce.
+    """
+    available = pipeline_columns(thresholds, horizons)
+    unknown = sorted(set(columns) - set(available))
+    if unknown:
+        raise ValueError(f"Unknown feature column(s) {unknown}")
+    needed, pending = set(BASE_COLUMNS), list(columns)
+    while pending:
+        col = pending.pop()
+        if col not in needed:
+            needed.add(col)
+            pending.extend(feature_inputs(col))
+    return [col for col in available if col in needed]
+
+def column_filter(columns):
+    """Predicate for the columns a step should compute (all when columns is None)."""
+    if columns is None:
+        return lambda col: True
+    return set(columns).__contains__
 
 def assign_npi_phase(date):
     """Assign NPI phase based on date."""
@@ -75,6 +250,81 @@ def assign_npi_phase(date):
             return phase
     return 'Post-reopening'
 
+def build_npi_index(periods=NPI_PERIODS):
+    """
+    Build a sorted IntervalIndex over NPI periods (closed on both ends).
+    Returns (interval_index, phase_names) with phase names in interval order.
+    """
+    ordered = sorted(periods.items(), key=lambda item: item[1][0])
+    starts = pd.to_datetime([start for _, (start, _) in ordered])
+    ends = pd.to_datetime([end for _, (_, end) in ordered])
+    index = pd.IntervalIndex.from_arrays(starts, ends, closed='both')
+    if index.is_overlapping:
+        raise ValueError("NPI periods must not overlap")
+    return index, [phase for phase, _ in ordered]
+
+def load_npi_calendars(path):
+    """
+    Load per-country NPI calendars from a CSV with columns
+    Country/Region, Phase, Start, End.
+    Returns {country: {phase: (start, end)}}.
+    """
+    calendar_df = pd.read_csv(path, parse_dates=['Start', 'End'])
+    calendars = {}
+    rows = zip(calendar_df['Country/Region'], calendar_df['Phase'],
+               calendar_df['Start'], calendar_df['End'])
+    for country, phase, start, end in rows:
+        calendars.setdefault(country, {})[phase] = (start, end)
+    return calendars
+
+def assign_npi_phases(dates, countries=None, calendars=None, default='Post-reopening'):
+    """
+    Vectorized NPI phase assignment.
+    
+    Phases are looked up once per unique date through a sorted interval
+    index and broadcast back as a categorical. Optional per-country
+    calendars ({country: periods}) override NPI_PERIODS for those countries;
+    the cost grows with unique dates x calendars, not rows x periods.
+    """
+    date_codes, unique_dates = pd.factorize(pd.DatetimeIndex(dates))
+    
+    calendar_list = [NPI_PERIODS]
+    row_calendar = None
+    if calendars:
+        calendar_names = list(calendars)
+        calendar_list += [calendars[name] for name in calendar_names]
+        lookup = {name: i + 1 for i, name in enumerate(calendar_names)}
+        row_calendar = pd.Series(countries).map(lookup).fillna(0).to_numpy(dtype=np.intp)
+    
+    categories = []
+    for periods in calendar_list:
+        categories += [phase for phase in periods if phase not in categories]
+    if default not in categories:
+        categories.append(default)
+    
+    # One row of phase codes per calendar, one column per unique date
+    phase_table = np.empty((len(calendar_list), len(unique_dates)), dtype=np.int16)
+    for i, periods in enumerate(calendar_list):
+        index, phase_names = build_npi_index(periods)
+        phase_codes = np.array([categories.index(p) for p in phase_names] +
+                               [categories.index(default)], dtype=np.int16)
+        # -1 (no matching period) selects the trailing default code
+        phase_table[i] = phase_codes[index.get_indexer(unique_dates.as_unit(index.left.unit))]
+    
+    if row_calendar is None:
+        codes = phase_table[0][date_codes]
+    else:
+        codes = phase_table[row_calendar, date_codes]
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def assign_vaccine_periods(dates, vaccine_start=VACCINE_START):
+    """Vectorized vaccine period assignment, evaluated once per unique date."""
+    date_codes, unique_dates = pd.factorize(pd.DatetimeIndex(dates))
+    period_codes = (unique_dates >= vaccine_start).astype(np.int8)
+    return pd.Categorical.from_codes(
+        period_codes[date_codes], categories=['Pre-vaccine', 'Post-vaccine']
+    )
+
 def assign_warning_level(growth, cases_100k, doubling, cfr):
     """
     Assign warning level based on epidemiological thresholds.
@@ -129,6 +379,55 @@ def assign_warning_level(growth, cases_100k, doubling, cfr):
     else:
         return 'LOW_MONITORING'
 
+def compute_risk_scores(growth, cases_100k, doubling, cfr):
+    """
+    Vectorized risk score for whole arrays of indicators.
+    Uses the same thresholds as assign_warning_level; rows with any
+    missing indicator get NaN.
+    """
+    growth = np.asarray(growth, dtype=float)
+    cases_100k = np.asarray(cases_100k, dtype=float)
+    doubling = np.asarray(doubling, dtype=float)
+    cfr = np.asarray(cfr, dtype=float)
+    
+    # Growth Rate (40% weight)
+    risk_score = np.select(
+        [growth > 0.20, growth > 0.10, growth > 0.05, growth > 0],
+        [4, 3, 2, 1], default=0
+    )
+    
+    # Disease Burden (30% weight)
+    risk_score += np.select(
+        [cases_100k > 1000, cases_100k > 500, cases_100k > 200, cases_100k > 50],
+        [4, 3, 2, 1], default=0
+    )
+    
+    # Doubling Time (20% weight)
+    risk_score += np.select(
+        [(doubling > 0) & (doubling < 7), doubling < 14, doubling < 30],
+        [3, 2, 1], default=0
+    )
+    
+    # Case Fatality Rate (10% weight)
+    risk_score += np.select([cfr > 5, cfr > 3], [2, 1], default=0)
+    
+    missing = np.isnan(growth) | np.isnan(doubling) | np.isnan(cfr) | np.isnan(cases_100k)
+    return np.where(missing, np.nan, risk_score)
+
+def assign_warning_levels(growth, cases_100k, doubling, cfr):
+    """
+    Vectorized counterpart of assign_warning_level.
+    Returns an object array of warning levels (NaN where any input is missing).
+    """
+    risk_score = compute_risk_scores(growth, cases_100k, doubling, cfr)
+    levels = np.select(
+        [risk_score >= 10, risk_score >= 6, risk_score >= 3],
+        ['CRITICAL_LOCKDOWN', 'HIGH_RESTRICTIONS', 'MODERATE_MEASURES'],
+        default='LOW_MONITORING'
+    ).astype(object)
+    levels[np.isnan(risk_score)] = np.nan
+    return levels
+
 def safe_growth_rate(series, threshold=50):
     """Calculate growth rate with threshold to avoid noise."""
     clean_series = series.copy()
@@ -140,46 +439,170 @@ def cap_group_outliers(series, q=0.99):
     threshold = series.quantile(q)
     return series.clip(upper=threshold)
 
-def load_and_prepare_data():
+def cap_grouped_outliers(df, group_keys, col, q=0.99):
+    """Cap outliers at the per-group q-quantile using a native grouped quantile."""
+    thresholds = df.groupby(group_keys, observed=True)[col].transform('quantile', q)
+    return df[col].clip(upper=thresholds)
+
+def grouped_rolling_mean(df, group_keys, col, window=7):
+    """Per-group trailing rolling mean (min_periods=1) via native grouped rolling."""
+    rolled = df.groupby(group_keys, observed=True)[col].rolling(window=window, min_periods=1).mean()
+    return rolled.reset_index(level=list(range(len(group_keys))), drop=True)
+
+def grouped_safe_growth_rate(df, group_keys, col, threshold=50):
     """
-    Main data preparation pipeline - Comprehensive version
+    Per-group growth rate with values below threshold masked to NaN.
+    Grouped equivalent of safe_growth_rate: masked values are padded over
+    with the last valid one where pct_change pads (PCT_CHANGE_PADS, pandas
+    2), and left as gaps otherwise.
+    """
+    clean_series = df[col].where(df[col] >= threshold)
+    groups = [df[key] for key in group_keys]
+    if PCT_CHANGE_PADS:
+        clean_series = clean_series.groupby(groups, observed=True).ffill()
+    previous = clean_series.groupby(groups, observed=True).shift(1)
+    return clean_series / previous - 1
+
+def days_since_thresholds(df, thresholds=DAYS_SINCE_THRESHOLDS, group_key='Country/Region',
+                          value_col='Confirmed', first_dates=None):
+    """
+    Days_Since_<N> for every threshold N: days since the group (country)
+    first reached N in value_col (negative before, NaN if it never did).
     
-    Creates 40+ features across all categories
+    One grouped min over the masked dates covers all thresholds; the first
+    dates are broadcast back to the rows through the group codes.
+    first_dates (one Days_Since_<N> column of dates per threshold, indexed
+    by group) replaces the dates found in df, e.g. for a subset of rows.
+    """
+    columns = [f'Days_Since_{n}' for n in thresholds]
+    if first_dates is None:
+        reached = pd.DataFrame(
+            {col: df['Date'].where(df[value_col] >= n) for col, n in zip(columns, thresholds)},
+            index=df.index
+        )
+        grouped = reached.groupby(df[group_key], observed=True)
+        first_dates = grouped.min().iloc[grouped.ngroup().to_numpy()].set_index(df.index)
+    else:
+        first_dates = first_dates[columns].reindex(df[group_key].astype(object)).set_axis(df.index)
+    return pd.DataFrame({col: (df['Date'] - first_dates[col]).dt.days for col in columns})
+
+def grouped_future_values(df, group_keys, columns, horizons):
+    """
+    Values of columns `horizon` rows ahead within each group for every
+    horizon, from a single grouping: rows of a group must be contiguous and
+    in date order (as STEP 1 sorts them). Equivalent to
+    df.groupby(group_keys)[columns].shift(-horizon) per horizon.
+    Returns {horizon: float64 array of shape (rows, columns)}.
+    """
+    if any(int(h) != h or h < 1 for h in horizons):
+        raise ValueError(f"horizons must be positive whole days, got {horizons!r}")
+    codes = df.groupby(group_keys, observed=True, sort=False).ngroup().to_numpy()
+    values = df[columns].to_numpy(dtype=np.float64)
+    n_rows = len(df)
+    ahead = {}
+    for horizon in horizons:
+        shifted = np.full(values.shape, np.nan)
+        if horizon < n_rows:
+            same_group = codes[horizon:] == codes[:-horizon]
+            shifted[:-horizon][same_group] = values[horizon:][same_group]
+        ahead[horizon] = shifted
+    return ahead
+
+def column_dtype(col):
+    """
+    Declared dtype of a prepared column. Days_Since_<N>, *_future<N>d and
+    Warning_Level_<N>d_Ahead use the entry of Days_Since_100 and the
+    HORIZON_DAYS columns.
+    """
+    if col not in COLUMN_DTYPES:
+        col = re.sub(r'^Days_Since_\d+$', 'Days_Since_100', col)
+        col = re.sub(r'_future\d+d$', f'_future{HORIZON_DAYS}d', col)
+        col = re.sub(r'^Warning_Level_\d+d_Ahead$', target_column(HORIZON_DAYS), col)
+    return COLUMN_DTYPES[col]
+
+def apply_dtype_plan(df, columns, report=None):
+    """
+    Cast columns in place to their COLUMN_DTYPES entry.
+    If report is a list, one dict per column with bytes before/after is appended.
+    """
+    for col in columns:
+        before = df[col]
+        df[col] = before.astype(column_dtype(col))
+        if report is not None:
+            report.append({
+                'Column': col,
+                'Dtype_Before': str(before.dtype),
+                'Bytes_Before': int(before.memory_usage(deep=True, index=False)),
+                'Dtype_After': str(df[col].dtype),
+                'Bytes_After': int(df[col].memory_usage(deep=True, index=False)),
+            })
+    return df
+
+def save_prepared_data(df, processed_data_dir, output_format='parquet', export_csv=False):
     """
+    Write the prepared frame in a columnar format that preserves dtypes
+    (categorical location keys and NPI phases, datetime Date).
     
-    print("\n" + "="*80)
-    print("COVID-19 DATA PREPARATION PIPELINE (COMPREHENSIVE)")
-    print("="*80)
+    Args:
+        output_format: 'parquet' or 'feather'
+        export_csv: Also write the legacy CSV export
     
-    # Define paths
-    project_root = Path(__file__).parent.parent.parent
-    raw_data_dir = project_root / 'data' / 'raw'
-    processed_data_dir = project_root / 'data' / 'processed'
-    processed_data_dir.mkdir(parents=True, exist_ok=True)
-    output_file = processed_data_dir / 'covid19_prepared_data.csv'
+    Returns:
+        List of written file paths
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
     
-    # ========================================================================
-    # STEP 1: DATA INTEGRATION
-    # ========================================================================
-    print("\n[STEP 1] DATA INTEGRATION")
-    print("-" * 80)
+    processed_data_dir = Path(processed_data_dir)
+    output_file = processed_data_dir / f'{PREPARED_DATA_NAME}.{output_format}'
+    if output_format == 'parquet':
+        df.to_parquet(output_file, index=False)
+    else:
+        df.to_feather(output_file)
+    written = [output_file]
     
-    confirmed_file = raw_data_dir / 'time_series_covid19_confirmed_global.csv'
-    deaths_file = raw_data_dir / 'time_series_covid19_deaths_global.csv'
-    recovered_file = raw_data_dir / 'time_series_covid19_recovered_global.csv'
+    if export_csv:
+        csv_file = processed_data_dir / f'{PREPARED_DATA_NAME}.csv'
+        df.to_csv(csv_file, index=False)
+        written.append(csv_file)
+    return written
+
+def read_raw_tables(raw_data_dir, start_date=None, end_date=None):
+    """
+    Read the wide JHU confirmed/deaths/recovered tables from raw_data_dir
+    (plain, .gz or .zst; see ingest.py), optionally limited to the date
+    columns inside [start_date, end_date].
+    Returns (confirmed, deaths, recovered-or-None), or None if confirmed or
+    deaths is missing. Raises ValueError if the window holds no date.
+    """
+    from src.data.ingest import find_raw_file, read_wide_tables
     
-    if not (confirmed_file.exists() and deaths_file.exists()):
-        print(f"\n❌ Required data files not found in {raw_data_dir}")
+    raw_files = [find_raw_file(raw_data_dir, name) for name in RAW_DATA_FILES]
+    if raw_files[0] is None or raw_files[1] is None:
         return None
-    
-    df_confirmed = pd.read_csv(confirmed_file)
-    df_deaths = pd.read_csv(deaths_file)
-    df_recovered = pd.read_csv(recovered_file) if recovered_file.exists() else None
-    
-    print(f"✓ Loaded Confirmed: {df_confirmed.shape}")
-    print(f"✓ Loaded Deaths: {df_deaths.shape}")
-    if df_recovered is not None:
-        print(f"✓ Loaded Recovered: {df_recovered.shape}")
+    tables = tuple(read_wide_tables(raw_files, start_date, end_date))
+    _require_date_columns(tables[0], start_date, end_date)
+    return tables
+
+def _require_date_columns(df_confirmed, start_date=None, end_date=None):
+    """Raise ValueError when a wide table holds no date columns (e.g. an empty window)."""
+    if len(df_confirmed.columns) <= 4:
+        raise ValueError(f"No date columns in the window {start_date or 'start'} to {end_date or 'end'}")
+
+def _stage_context(profiler):
+    """
+    The stage() context manager of profiler, or a no-op one without a
+    profiler (a throwaway StageProfiler would reset the peak RSS counter
+    under an enclosing stage).
+    """
+    if profiler is not None:
+        return profiler.stage
+    return lambda name, frame=None: nullcontext()
+
+def integrate_tables(df_confirmed, df_deaths, df_recovered=None, dtype_report=None, profiler=None):
+    """STEP 1: melt the wide tables to long format, merge them, parse dates and sort."""
+    stage = _stage_context(profiler)
+    _require_date_columns(df_confirmed)
     
     # Extract date columns
     date_columns = df_confirmed.columns[4:]
@@ -195,40 +618,56 @@ def load_and_prepare_data():
             value_name=value_name
         )
     
-    print("\n✓ Converting to long format...")
-    df_confirmed_long = wide_to_long(df_confirmed, 'Confirmed')
-    df_deaths_long = wide_to_long(df_deaths, 'Deaths')
+    with stage('STEP 1 Data Integration', lambda: df):
+        with stage('1.1 Long Format and Merge', lambda: df):
+            print("\n✓ Converting to long format...")
+            df_confirmed_long = wide_to_long(df_confirmed, 'Confirmed')
+            df_deaths_long = wide_to_long(df_deaths, 'Deaths')
+        
+            # Merge datasets
+            print("✓ Merging datasets...")
+            df = df_confirmed_long.merge(
+                df_deaths_long,
+                on=['Province/State', 'Country/Region', 'Lat', 'Long', 'Date'],
+                how='outer'
+            )
+        
+            if df_recovered is not None:
+                df_recovered_long = wide_to_long(df_recovered, 'Recovered')
+                df = df.merge(
+                    df_recovered_long,
+                    on=['Province/State', 'Country/Region', 'Lat', 'Long', 'Date'],
+                    how='outer'
+                )
+            else:
+                df['Recovered'] = 0
     
-    # Merge datasets
-    print("✓ Merging datasets...")
-    df = df_confirmed_long.merge(
-        df_deaths_long,
-        on=['Province/State', 'Country/Region', 'Lat', 'Long', 'Date'],
-        how='outer'
-    )
-    
-    if df_recovered is not None:
-        df_recovered_long = wide_to_long(df_recovered, 'Recovered')
-        df = df.merge(
-            df_recovered_long,
-            on=['Province/State', 'Country/Region', 'Lat', 'Long', 'Date'],
-            how='outer'
-        )
-    else:
-        df['Recovered'] = 0
-    
-    df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y')
-    
-    # CRITICAL: Fill Province/State BEFORE groupby operations
-    df['Province/State'] = df['Province/State'].fillna('All')
-    group_keys = ['Country/Region', 'Province/State']
-    
-    # Sort data
-    df = df.sort_values(group_keys + ['Date']).reset_index(drop=True)
+        with stage('1.2 Parse Dates and Sort', lambda: df):
+            df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y')
+        
+            # CRITICAL: Fill Province/State BEFORE groupby operations
+            # Raw keys may be categoricals (see ingest.py), which reject new values
+            df['Province/State'] = df['Province/State'].astype(object).fillna('All')
+            group_keys = ['Country/Region', 'Province/State']
+        
+            # Sort data
+            df = df.sort_values(group_keys + ['Date']).reset_index(drop=True)
+            apply_dtype_plan(df, group_keys + ['Date'], dtype_report)
     
     print(f"\n✓ Integrated dataset shape: {df.shape}")
     print(f"✓ Unique countries: {df['Country/Region'].nunique()}")
     print("\n[STEP 1 COMPLETE]")
+    return df
+
+def clean_data(df, dtype_report=None, profiler=None, columns=None, country_stats=None):
+    """
+    STEP 2: fill gaps, enforce monotonic totals, daily changes, outlier capping, moving averages.
+    columns (see required_columns) limits the derived columns computed;
+    country_stats (see prepare_long_format) supplies the coordinate centroids.
+    """
+    stage = _stage_context(profiler)
+    wanted = column_filter(columns)
+    group_keys = ['Country/Region', 'Province/State']
     
     # ========================================================================
     # STEP 2: DATA CLEANING
@@ -236,54 +675,77 @@ def load_and_prepare_data():
     print("\n[STEP 2] DATA CLEANING")
     print("-" * 80)
     
-    # Fill missing values
-    print("\n2.1 Handling Missing Values")
-    df['Confirmed'] = df['Confirmed'].fillna(0)
-    df['Deaths'] = df['Deaths'].fillna(0)
-    df['Recovered'] = df['Recovered'].fillna(0)
-    
-    # Fill missing coordinates with country centroids
-    print("\n2.2 Filling Missing Coordinates")
-    country_centroids = df.groupby('Country/Region')[['Lat', 'Long']].mean()
-    for country in df.loc[df['Lat'].isna(), 'Country/Region'].unique():
-        if country in country_centroids.index:
-            mask = df['Country/Region'] == country
-            df.loc[mask, 'Lat'] = df.loc[mask, 'Lat'].fillna(country_centroids.loc[country, 'Lat'])
-            df.loc[mask, 'Long'] = df.loc[mask, 'Long'].fillna(country_centroids.loc[country, 'Long'])
-    
-    # Enforce monotonicity for cumulative data
-    print("\n2.3 Enforcing Monotonicity")
-    df[['Confirmed', 'Deaths', 'Recovered']] = (
-        df.groupby(group_keys)[['Confirmed', 'Deaths', 'Recovered']].cummax()
-    )
-    
-    # Calculate daily values
-    print("\n2.4 Computing Daily Changes")
-    df['Daily_Cases'] = df.groupby(group_keys)['Confirmed'].diff().fillna(0)
-    df['Daily_Deaths'] = df.groupby(group_keys)['Deaths'].diff().fillna(0)
-    df['Daily_Recovered'] = df.groupby(group_keys)['Recovered'].diff().fillna(0)
-    
-    # Handle negative values
-    print("\n2.5 Handling Negative Daily Values")
-    df.loc[df['Daily_Cases'] < 0, 'Daily_Cases'] = 0
-    df.loc[df['Daily_Deaths'] < 0, 'Daily_Deaths'] = 0
-    df.loc[df['Daily_Recovered'] < 0, 'Daily_Recovered'] = 0
-    
-    # Outlier detection and capping (per group)
-    print("\n2.6 Outlier Detection (99th percentile capping per group)")
-    for col in ['Daily_Cases', 'Daily_Deaths']:
-        df[col] = df.groupby(group_keys)[col].transform(lambda s: cap_group_outliers(s, q=0.99))
-    
-    # Apply 7-day moving average
-    print("\n2.7 Computing 7-day Moving Averages")
-    df['Cases_7d_MA'] = df.groupby(group_keys)['Daily_Cases'].transform(
-        lambda s: s.rolling(window=7, min_periods=1).mean()
-    )
-    df['Deaths_7d_MA'] = df.groupby(group_keys)['Daily_Deaths'].transform(
-        lambda s: s.rolling(window=7, min_periods=1).mean()
-    )
+    with stage('STEP 2 Data Cleaning', lambda: df):
+        # Fill missing values
+        print("\n2.1 Handling Missing Values")
+        with stage('2.1 Handling Missing Values', lambda: df):
+            df['Confirmed'] = df['Confirmed'].fillna(0)
+            df['Deaths'] = df['Deaths'].fillna(0)
+            df['Recovered'] = df['Recovered'].fillna(0)
+            apply_dtype_plan(df, ['Confirmed', 'Deaths', 'Recovered'], dtype_report)
+        
+        # Fill missing coordinates with country centroids
+        print("\n2.2 Filling Missing Coordinates")
+        with stage('2.2 Filling Missing Coordinates', lambda: df):
+            if country_stats is None:
+                country_centroids = df.groupby('Country/Region', observed=True)[['Lat', 'Long']].transform('mean')
+            else:
+                country_centroids = (country_stats[['Lat', 'Long']]
+                                     .reindex(df['Country/Region'].astype(object)).set_axis(df.index))
+            df[['Lat', 'Long']] = df[['Lat', 'Long']].fillna(country_centroids)
+            apply_dtype_plan(df, ['Lat', 'Long'], dtype_report)
+        
+        # Enforce monotonicity for cumulative data
+        print("\n2.3 Enforcing Monotonicity")
+        with stage('2.3 Enforcing Monotonicity', lambda: df):
+            df[['Confirmed', 'Deaths', 'Recovered']] = (
+                df.groupby(group_keys, observed=True)[['Confirmed', 'Deaths', 'Recovered']].cummax()
+            )
+        
+        # Calculate daily values
+        print("\n2.4 Computing Daily Changes")
+        with stage('2.4 Computing Daily Changes', lambda: df):
+            daily = {'Daily_Cases': 'Confirmed', 'Daily_Deaths': 'Deaths', 'Daily_Recovered': 'Recovered'}
+            daily = {col: total for col, total in daily.items() if wanted(col)}
+            for col, total in daily.items():
+                df[col] = df.groupby(group_keys, observed=True)[total].diff().fillna(0)
+        
+        # Handle negative values
+        print("\n2.5 Handling Negative Daily Values")
+        with stage('2.5 Handling Negative Daily Values', lambda: df):
+            for col in daily:
+                df.loc[df[col] < 0, col] = 0
+        
+        # Outlier detection and capping (per group)
+        print("\n2.6 Outlier Detection (99th percentile capping per group)")
+        with stage('2.6 Outlier Detection', lambda: df):
+            for col in ['Daily_Cases', 'Daily_Deaths']:
+                if wanted(col):
+                    df[col] = cap_grouped_outliers(df, group_keys, col, q=0.99)
+        
+        # Apply 7-day moving average
+        print("\n2.7 Computing 7-day Moving Averages")
+        with stage('2.7 Computing 7-day Moving Averages', lambda: df):
+            if wanted('Cases_7d_MA'):
+                df['Cases_7d_MA'] = grouped_rolling_mean(df, group_keys, 'Daily_Cases', window=7)
+            if wanted('Deaths_7d_MA'):
+                df['Deaths_7d_MA'] = grouped_rolling_mean(df, group_keys, 'Daily_Deaths', window=7)
+            apply_dtype_plan(df, [col for col in ['Daily_Cases', 'Daily_Recovered', 'Cases_7d_MA',
+                                                  'Deaths_7d_MA'] if wanted(col)], dtype_report)
     
     print("\n[STEP 2 COMPLETE]")
+    return df
+
+def engineer_features(df, npi_calendars=None, start_date=None, thresholds=DAYS_SINCE_THRESHOLDS,
+                      dtype_report=None, profiler=None, columns=None, country_stats=None):
+    """
+    STEP 3: temporal, growth, severity and intervention features.
+    columns (see required_columns) limits the derived columns computed;
+    country_stats (see prepare_long_format) supplies the Days_Since_<N> dates.
+    """
+    stage = _stage_context(profiler)
+    wanted = column_filter(columns)
+    group_keys = ['Country/Region', 'Province/State']
     
     # ========================================================================
     # STEP 3: FEATURE ENGINEERING
@@ -291,66 +753,103 @@ def load_and_prepare_data():
     print("\n[STEP 3] FEATURE ENGINEERING")
     print("-" * 80)
     
-    # 3.1 Temporal features
-    print("\n3.1 Creating Temporal Features")
-    df['DayOfWeek'] = df['Date'].dt.dayofweek
-    df['Month'] = df['Date'].dt.month
-    df['Quarter'] = df['Date'].dt.quarter
-    df['Year'] = df['Date'].dt.year
-    df['IsWeekend'] = df['DayOfWeek'].isin([5, 6]).astype(int)
-    
-    pandemic_start = df['Date'].min()
-    df['Days_Since_Start'] = (df['Date'] - pandemic_start).dt.days
-    
-    def compute_days_since_threshold(group, threshold=100):
-        first_date = group.loc[group['Confirmed'] >= threshold, 'Date'].min()
-        if pd.isna(first_date):
-            return pd.Series([np.nan] * len(group), index=group.index)
-        return (group['Date'] - first_date).dt.days
-    
-    df['Days_Since_100'] = df.groupby('Country/Region', group_keys=False).apply(
-        lambda g: compute_days_since_threshold(g, threshold=100)
-    )
-    print("✓ Temporal features created")
-    
-    # 3.2 Growth metrics
-    print("\n3.2 Computing Growth Metrics")
-    df['Growth_Rate'] = df.groupby(group_keys)['Daily_Cases'].transform(
-        lambda s: safe_growth_rate(s, threshold=50)
-    )
-    df['Death_Growth'] = df.groupby(group_keys)['Daily_Deaths'].transform(
-        lambda s: safe_growth_rate(s, threshold=10)
-    )
-    df['Acceleration'] = df.groupby(group_keys)['Growth_Rate'].diff()
-    
-    df['Doubling_Time'] = np.where(
-        df['Growth_Rate'] > 0,
-        np.log(2) / np.log(1 + df['Growth_Rate']),
-        np.nan
-    )
-    df['Doubling_Time'] = df['Doubling_Time'].replace([np.inf, -np.inf], np.nan)
-    
-    df['Log_Cases'] = np.log1p(df['Daily_Cases'])
-    df['Log_Deaths'] = np.log1p(df['Daily_Deaths'])
-    print("✓ Growth metrics created")
-    
-    # 3.3 Severity metrics
-    print("\n3.3 Computing Severity Metrics")
-    df['CFR'] = np.where(df['Confirmed'] > 0, (df['Deaths'] / df['Confirmed']) * 100, 0)
-    df['Active_Cases'] = (df['Confirmed'] - df['Deaths'] - df['Recovered']).clip(lower=0)
-    df['Recovery_Rate'] = np.where(df['Confirmed'] > 0, df['Recovered'] / df['Confirmed'], 0)
-    df['Death_to_Case_Ratio'] = np.where(df['Daily_Cases'] > 0, df['Daily_Deaths'] / df['Daily_Cases'], 0)
-    print("✓ Severity metrics created")
-    
-    # 3.4 Intervention indicators
-    print("\n3.4 Creating Intervention Indicators")
-    df['NPI_Phase'] = df['Date'].apply(assign_npi_phase)
-    df['Vaccine_Period'] = np.where(df['Date'] >= VACCINE_START, 'Post-vaccine', 'Pre-vaccine')
-    df['Is_Lockdown'] = (df['NPI_Phase'] == 'Lockdown').astype(int)
-    df['Is_Post_Vaccine'] = (df['Vaccine_Period'] == 'Post-vaccine').astype(int)
-    print("✓ Intervention indicators created")
+    with stage('STEP 3 Feature Engineering', lambda: df):
+        # 3.1 Temporal features
+        print("\n3.1 Creating Temporal Features")
+        with stage('3.1 Creating Temporal Features', lambda: df):
+            calendar_fields = {'DayOfWeek': 'dayofweek', 'Month': 'month', 'Quarter': 'quarter', 'Year': 'year'}
+            for col, field in calendar_fields.items():
+                if wanted(col):
+                    df[col] = getattr(df['Date'].dt, field)
+            if wanted('IsWeekend'):
+                df['IsWeekend'] = df['DayOfWeek'].isin([5, 6]).astype(int)
+            
+            if wanted('Days_Since_Start'):
+                pandemic_start = df['Date'].min() if start_date is None else pd.Timestamp(start_date)
+                df['Days_Since_Start'] = (df['Date'] - pandemic_start).dt.days
+            
+            thresholds = [n for n in thresholds if wanted(f'Days_Since_{n}')]
+            if thresholds:
+                days_since = days_since_thresholds(df, thresholds, first_dates=country_stats)
+                df[days_since.columns] = days_since
+            apply_dtype_plan(df, [col for col in ['DayOfWeek', 'Month', 'Quarter', 'Year', 'IsWeekend',
+                                                  'Days_Since_Start'] if wanted(col)]
+                             + [f'Days_Since_{n}' for n in thresholds], dtype_report)
+        print("✓ Temporal features created")
+        
+        # 3.2 Growth metrics
+        print("\n3.2 Computing Growth Metrics")
+        with stage('3.2 Computing Growth Metrics', lambda: df):
+            if wanted('Growth_Rate'):
+                df['Growth_Rate'] = grouped_safe_growth_rate(df, group_keys, 'Daily_Cases', threshold=50)
+            if wanted('Death_Growth'):
+                df['Death_Growth'] = grouped_safe_growth_rate(df, group_keys, 'Daily_Deaths', threshold=10)
+            if wanted('Acceleration'):
+                df['Acceleration'] = df.groupby(group_keys, observed=True)['Growth_Rate'].diff()
+            
+            if wanted('Doubling_Time'):
+                df['Doubling_Time'] = np.where(
+                    df['Growth_Rate'] > 0,
+                    np.log(2) / np.log(1 + df['Growth_Rate']),
+                    np.nan
+                )
+                df['Doubling_Time'] = df['Doubling_Time'].replace([np.inf, -np.inf], np.nan)
+            
+            if wanted('Log_Cases'):
+                df['Log_Cases'] = np.log1p(df['Daily_Cases'])
+            if wanted('Log_Deaths'):
+                df['Log_Deaths'] = np.log1p(df['Daily_Deaths'])
+            apply_dtype_plan(df, [col for col in ['Growth_Rate', 'Death_Growth', 'Acceleration', 'Doubling_Time',
+                                                  'Log_Cases', 'Log_Deaths'] if wanted(col)], dtype_report)
+        print("✓ Growth metrics created")
+        
+        # 3.3 Severity metrics
+        print("\n3.3 Computing Severity Metrics")
+        with stage('3.3 Computing Severity Metrics', lambda: df):
+            if wanted('CFR'):
+                df['CFR'] = np.where(df['Confirmed'] > 0, (df['Deaths'] / df['Confirmed']) * 100, 0)
+            if wanted('Active_Cases'):
+                df['Active_Cases'] = (df['Confirmed'] - df['Deaths'] - df['Recovered']).clip(lower=0)
+            if wanted('Recovery_Rate'):
+                df['Recovery_Rate'] = np.where(df['Confirmed'] > 0, df['Recovered'] / df['Confirmed'], 0)
+            if wanted('Death_to_Case_Ratio'):
+                df['Death_to_Case_Ratio'] = np.where(df['Daily_Cases'] > 0, df['Daily_Deaths'] / df['Daily_Cases'], 0)
+            # Daily_Deaths keeps full precision until its last use above
+            apply_dtype_plan(df, [col for col in ['Daily_Deaths', 'CFR', 'Active_Cases', 'Recovery_Rate',
+                                                  'Death_to_Case_Ratio'] if wanted(col)], dtype_report)
+        print("✓ Severity metrics created")
+        
+        # 3.4 Intervention indicators
+        print("\n3.4 Creating Intervention Indicators")
+        with stage('3.4 Creating Intervention Indicators', lambda: df):
+            if wanted('NPI_Phase') or wanted('Is_Lockdown'):
+                phases = assign_npi_phases(
+                    df['Date'], countries=df['Country/Region'], calendars=npi_calendars
+                )
+                if wanted('NPI_Phase'):
+                    df['NPI_Phase'] = phases
+            if wanted('Vaccine_Period') or wanted('Is_Post_Vaccine'):
+                periods = assign_vaccine_periods(df['Date'])
+                if wanted('Vaccine_Period'):
+                    df['Vaccine_Period'] = periods
+            if wanted('Is_Lockdown'):
+                df['Is_Lockdown'] = (phases == 'Lockdown').astype(int)
+            if wanted('Is_Post_Vaccine'):
+                df['Is_Post_Vaccine'] = (periods == 'Post-vaccine').astype(int)
+            apply_dtype_plan(df, [col for col in ['NPI_Phase', 'Vaccine_Period', 'Is_Lockdown',
+                                                  'Is_Post_Vaccine'] if wanted(col)], dtype_report)
+        print("✓ Intervention indicators created")
     
     print("\n[STEP 3 COMPLETE]")
+    return df
+
+def normalize_population(df, median_population=None, dtype_report=None, profiler=None, columns=None):
+    """
+    STEP 4: population and per-100k metrics.
+    columns (see required_columns) limits the derived columns computed.
+    """
+    stage = _stage_context(profiler)
+    wanted = column_filter(columns)
     
     # ========================================================================
     # STEP 4: POPULATION NORMALIZATION
@@ -358,51 +857,350 @@ def load_and_prepare_data():
     print("\n[STEP 4] POPULATION NORMALIZATION")
     print("-" * 80)
     
-    df['Population'] = df['Country/Region'].map(POPULATION_DATA)
-    missing_pop = df['Population'].isna().sum()
-    if missing_pop > 0:
-        median_pop = df['Population'].median()
-        df['Population'] = df['Population'].fillna(median_pop)
-        print(f"⚠ Filled {missing_pop:,} missing population values with median")
-    
-    df['Cases_per_100k'] = (df['Confirmed'] / df['Population']) * 100000
-    df['Deaths_per_100k'] = (df['Deaths'] / df['Population']) * 100000
+    with stage('STEP 4 Population Normalization', lambda: df):
+        if wanted('Population'):
+            # Mapping categorical keys one-to-one would yield a categorical
+            df['Population'] = df['Country/Region'].map(POPULATION_DATA).astype('float64')
+            missing_pop = df['Population'].isna().sum()
+            if missing_pop > 0:
+                median_pop = df['Population'].median() if median_population is None else median_population
+                df['Population'] = df['Population'].fillna(median_pop)
+                print(f"⚠ Filled {missing_pop:,} missing population values with median")
+        
+        if wanted('Cases_per_100k'):
+            df['Cases_per_100k'] = (df['Confirmed'] / df['Population']) * 100000
+        if wanted('Deaths_per_100k'):
+            df['Deaths_per_100k'] = (df['Deaths'] / df['Population']) * 100000
+        apply_dtype_plan(df, [col for col in ['Population', 'Cases_per_100k', 'Deaths_per_100k']
+                              if wanted(col)], dtype_report)
     print("✓ Population-normalized metrics created")
     
     print("\n[STEP 4 COMPLETE]")
+    return df
+
+def create_target(df, horizons=TARGET_HORIZONS, dtype_report=None, profiler=None, columns=None):
+    """
+    STEP 5: N-day ahead metrics and warning level targets for every horizon,
+    from one grouped pass and one labelling pass over all horizons.
+    columns (see required_columns) limits the horizons and metrics computed.
+    """
+    stage = _stage_context(profiler)
+    wanted = column_filter(columns)
+    group_keys = ['Country/Region', 'Province/State']
+    horizons = [h for h in horizons
+                if wanted(target_column(h)) or any(wanted(future_column(m, h)) for m in FORECAST_METRICS)]
+    if not horizons:
+        return df
+    # A target needs every metric; all metrics are then shifted in the same pass
+    metrics = [m for m in FORECAST_METRICS if any(wanted(future_column(m, h)) for h in horizons)]
     
     # ========================================================================
-    # STEP 5: CREATE TARGET VARIABLE (7-DAY AHEAD)
+    # STEP 5: CREATE TARGET VARIABLE (N-DAY AHEAD)
     # ========================================================================
-    print("\n[STEP 5] CREATING TARGET VARIABLE (7-DAY AHEAD)")
+    print(f"\n[STEP 5] CREATING TARGET VARIABLE ({', '.join(map(str, horizons))}-DAY AHEAD)")
     print("-" * 80)
     
-    # Create future versions of key metrics
-    forecast_metrics = ['Growth_Rate', 'Cases_per_100k', 'Doubling_Time', 'CFR']
-    
-    print(f"\n5.1 Creating {HORIZON_DAYS}-day ahead features")
-    for metric in forecast_metrics:
-        if metric in df.columns:
-            df[f'{metric}_future7d'] = df.groupby(group_keys)[metric].shift(-HORIZON_DAYS)
-    
-    # Assign warning levels
-    print("\n5.2 Assigning Warning Levels (7-day ahead)")
-    TARGET_COL = 'Warning_Level_7d_Ahead'
-    df[TARGET_COL] = df.apply(
-        lambda row: assign_warning_level(
-            row['Growth_Rate_future7d'],
-            row['Cases_per_100k_future7d'],
-            row['Doubling_Time_future7d'],
-            row['CFR_future7d']
-        ),
-        axis=1
-    )
+    future_cols = [future_column(metric, h) for h in horizons for metric in metrics
+                   if wanted(future_column(metric, h))]
+    target_cols = [target_column(h) for h in horizons if wanted(target_column(h))]
+    
+    with stage('STEP 5 Target Variable', lambda: df):
+        # Create future versions of key metrics
+        print(f"\n5.1 Creating {', '.join(map(str, horizons))}-day ahead features")
+        with stage('5.1 Creating Ahead Features', lambda: df):
+            ahead = grouped_future_values(df, group_keys, metrics, horizons)
+            for h in horizons:
+                for j, metric in enumerate(metrics):
+                    if wanted(future_column(metric, h)):
+                        df[future_column(metric, h)] = ahead[h][:, j]
+        
+        # Assign warning levels for all horizons at once
+        print("\n5.2 Assigning Warning Levels")
+        with stage('5.2 Assigning Warning Levels', lambda: df):
+            if target_cols:
+                target_horizons = [h for h in horizons if wanted(target_column(h))]
+                stacked = np.concatenate([ahead[h] for h in target_horizons])
+                levels = assign_warning_levels(*stacked.T)
+                for i, target_col in enumerate(target_cols):
+                    df[target_col] = levels[i * len(df):(i + 1) * len(df)]
+            apply_dtype_plan(df, future_cols + target_cols, dtype_report)
     
-    print(f"\n✓ Created target variable: {TARGET_COL}")
-    print("\nWarning level distribution:")
-    print(df[TARGET_COL].value_counts())
+    for target_col in target_cols:
+        print(f"\n✓ Created target variable: {target_col}")
+        print("\nWarning level distribution:")
+        print(df[target_col].value_counts())
     
     print("\n[STEP 5 COMPLETE]")
+    return df
+
+def prepare_long_format(df_confirmed, df_deaths, df_recovered=None, npi_calendars=None,
+                        dtype_report=None, start_date=None, median_population=None,
+                        thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS, profiler=None,
+                        columns=None, country_stats=None):
+    """
+    STEP 1-5 on long-format data: melt and merge the wide tables, clean,
+    engineer features and create the N-day ahead targets.
+    
+    Columns are cast to COLUMN_DTYPES as they are finalized; pass a list as
+    dtype_report to collect bytes per column before/after.
+    
+    start_date (for Days_Since_Start), median_population (fill value for
+    countries missing from POPULATION_DATA) and country_stats (per-country
+    Lat/Long centroids and Days_Since_<N> first dates, see
+    sharded.country_statistics) default to values computed from these
+    tables; pass them when the tables hold only a subset of locations.
+    thresholds selects the Days_Since_<N> columns and horizons the
+    *_future<N>d / Warning_Level_<N>d_Ahead columns.
+    
+    columns lists the output columns wanted (e.g. a model's feature_names
+    plus its target); only their transitive inputs in FEATURE_INPUTS are
+    computed. None computes every column.
+    
+    Pass a StageProfiler (see profiling.py) to record every step and sub-step.
+    Each step is also a stage of the checkpointed DAG in stages.py.
+    """
+    if columns is not None:
+        columns = required_columns(columns, thresholds, horizons)
+    df = integrate_tables(df_confirmed, df_deaths, df_recovered, dtype_report, profiler)
+    df = clean_data(df, dtype_report, profiler, columns, country_stats)
+    df = engineer_features(df, npi_calendars, start_date, thresholds, dtype_report, profiler, columns,
+                           country_stats)
+    df = normalize_population(df, median_population, dtype_report, profiler, columns)
+    return create_target(df, horizons, dtype_report, profiler, columns)
+
+def _check_integrity(raw_tables, integrity, processed_data_dir, profiler):
+    """Integrity scan of load_and_prepare_data; the tables to prepare, or None to abort."""
+    if integrity == 'off':
+        return raw_tables
+    from src.data.integrity import apply_integrity_policy
+    print("\n✓ Scanning raw tables for integrity issues...")
+    with profiler.stage('Integrity Scan'):
+        return apply_integrity_policy(raw_tables, integrity, processed_data_dir / 'integrity_report.csv')
+
+def _prepare_out_of_core(raw_data_dir, processed_data_dir, profiler, npi_calendars=None, start_date=None,
+                         end_date=None, thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS,
+                         columns=None, shard_rows=None, run_report=False, integrity='warn', ignored=None):
+    """Out-of-core branch of load_and_prepare_data; returns the dataset directory."""
+    from src.data.sharded import SHARD_ROWS, prepare_out_of_core
+    
+    if ignored:
+        print(f"⚠ Out-of-core mode writes a Parquet dataset with the pandas engine; "
+              f"ignoring {', '.join(ignored)}")
+    
+    with profiler.stage('Read Raw Tables'):
+        raw_tables = read_raw_tables(raw_data_dir, start_date, end_date)
+    if raw_tables is None:
+        profiler.stop()
+        print(f"\n❌ Required data files not found in {raw_data_dir}")
+        return None
+    raw_tables = _check_integrity(raw_tables, integrity, processed_data_dir, profiler)
+    if raw_tables is None:
+        profiler.stop()
+        return None
+    
+    dtype_report = []
+    with profiler.stage('STEP 1-5 Prepare (out-of-core shards)'):
+        dataset_dir, rows = prepare_out_of_core(
+            *raw_tables, output_dir=processed_data_dir / PREPARED_DATA_NAME,
+            shard_rows=shard_rows or SHARD_ROWS, npi_calendars=npi_calendars, dtype_report=dtype_report,
+            thresholds=thresholds, horizons=horizons, columns=columns, start_date=start_date
+        )
+    pd.DataFrame(dtype_report).to_csv(processed_data_dir / 'dtype_report.csv', index=False)
+    
+    profiler.stop()
+    if run_report:
+        report_file = profiler.write_report(engine='pandas', out_of_core=True, shard_rows=shard_rows or SHARD_ROWS,
+                                            rows=rows, columns=len(dtype_report))
+        print(f"✓ Run report: {report_file}")
+    
+    print("\n" + "="*80)
+    print("DATA PREPARATION COMPLETE (OUT-OF-CORE)!")
+    print("="*80)
+    print(f"✓ Dataset: {dataset_dir} ({rows:,} rows × {len(dtype_report)} columns)")
+    print("✓ Read it with pd.read_parquet(dataset_dir, columns=[...])")
+    return dataset_dir
+
+def load_and_prepare_data(npi_calendars=None, engine='pandas', output_format='parquet',
+                          export_csv=False, workers=1, use_cache=True, start_date=None,
+                          end_date=None, thresholds=DAYS_SINCE_THRESHOLDS, run_report=False,
+                          profile_sampling=False, checkpoints=False, horizons=TARGET_HORIZONS,
+                          export_matrix=False, columns=None, out_of_core=False, shard_rows=None,
+                          integrity='warn'):
+    """
+    Main data preparation pipeline - Comprehensive version
+    
+    Creates 40+ features across all categories
+    
+    Args:
+        npi_calendars: Optional {country: {phase: (start, end)}} overriding
+            NPI_PERIODS for those countries (see load_npi_calendars)
+        engine: 'pandas' (long format, default) or 'cube' (dense
+            location x date x metric arrays, see cube_engine.py)
+        output_format: Columnar output format, 'parquet' (default) or 'feather'
+        export_csv: Also write the legacy covid19_prepared_data.csv export
+        workers: Worker processes for the pandas engine; values other than 1
+            (None = all cores) shard locations by country across a process
+            pool (see sharded.py)
+        use_cache: Reuse the prepared frame cached for unchanged raw files,
+            settings and code (see cache.py)
+        start_date, end_date: Optional inclusive window of raw date columns
+            to read (e.g. for backfills); Days_Since_Start counts from
+            start_date on every engine. History before the window is not
+            read, so Days_Since_<N> counts from the first date N is reached
+            inside the window, the window's first day has no growth rate or
+            daily change, and cumulative-max cleaning starts at the window.
+            A window without any date raises ValueError
+        thresholds: Case counts N for the Days_Since_<N> columns, all
+            computed in one pass (default: 100)
+        run_report: Write per-stage wall/CPU time, RSS and frame shape as
+            JSON to data/processed/run_reports/ (see profiling.py; the
+            newest KEEP_REPORTS runs are kept)
+        profile_sampling: Also attach the sampling profiler to the run report
+        checkpoints: Run the pandas engine as the checkpointed stage DAG,
+            resuming from data/processed/checkpoints/ and re-running only
+            stages whose code, settings or inputs changed (see stages.py)
+        horizons: Days ahead for the *_future<N>d metrics and
+            Warning_Level_<N>d_Ahead targets, all built in one pass
+            (default: 7; train_warning_system selects one of them)
+        export_matrix: Also write the numeric features, target codes and
+            (location, date) index as memory-mapped .npy arrays for
+            training and scoring (see feature_matrix.py)
+        columns: Output columns to compute, e.g. model_input_columns() for
+            a scoring refresh; only their inputs in FEATURE_INPUTS are
+            computed (default: every column)
+        out_of_core: Prepare locations in shards of at most shard_rows long
+            rows (default: sharded.SHARD_ROWS), one shard in memory at a
+            time, and write them as a partitioned Parquet dataset
+            data/processed/covid19_prepared_data/ (see sharded.py). Returns
+            the dataset directory instead of the frame.
+        integrity: Raw-table integrity scan before STEP 1 (see integrity.py):
+            'warn' (default) reports anomalies, 'abort' stops on table issues
+            or flagged locations, 'quarantine' drops flagged locations,
+            'off' skips the scan. The per-location report is written to
+            data/processed/integrity_report.csv
+    """
+    
+    print("\n" + "="*80)
+    print("COVID-19 DATA PREPARATION PIPELINE (COMPREHENSIVE)")
+    print("="*80)
+    
+    # Define paths
+    project_root = Path(__file__).parent.parent.parent
+    raw_data_dir = project_root / 'data' / 'raw'
+    processed_data_dir = project_root / 'data' / 'processed'
+    processed_data_dir.mkdir(parents=True, exist_ok=True)
+    
+    # ========================================================================
+    # STEP 1: DATA INTEGRATION
+    # ========================================================================
+    print("\n[STEP 1] DATA INTEGRATION")
+    print("-" * 80)
+    
+    from src.data.profiling import StageProfiler
+    profiler = StageProfiler(sample=profile_sampling)
+    profiler.start()
+    
+    if checkpoints and integrity == 'quarantine':
+        print("⚠ Quarantine changes the raw tables; running without checkpoints")
+        checkpoints = False
+    
+    if out_of_core:
+        return _prepare_out_of_core(raw_data_dir, processed_data_dir, profiler, npi_calendars=npi_calendars,
+                                    start_date=start_date, end_date=end_date, thresholds=thresholds,
+                                    horizons=horizons, columns=columns, shard_rows=shard_rows,
+                                    run_report=run_report, integrity=integrity,
+                                    ignored=[name for name, used in [
+                                        ('engine', engine != 'pandas'), ('workers', workers != 1),
+                                        ('output_format', output_format != 'parquet'),
+                                        ('export_csv', export_csv), ('checkpoints', checkpoints),
+                                        ('export_matrix', export_matrix)] if used])
+    
+    df = None
+    cache_hit = False
+    dtype_report = []
+    if use_cache:
+        from src.data.cache import prepared_data_fingerprint, load_cached, store_cached
+        from src.data.ingest import find_raw_file
+        with profiler.stage('Cache Lookup'):
+            fingerprint = prepared_data_fingerprint(
+                [find_raw_file(raw_data_dir, name) or raw_data_dir / name for name in RAW_DATA_FILES],
+                engine=engine, npi_calendars=npi_calendars, start_date=start_date, end_date=end_date,
+                thresholds=tuple(thresholds), horizons=tuple(horizons),
+                columns=None if columns is None else sorted(columns), integrity=integrity
+            )
+            df = load_cached(fingerprint)
+        cache_hit = df is not None
+        if cache_hit:
+            print(f"✓ Cache hit ({fingerprint[:12]}): loaded {len(df):,} prepared rows, "
+                  f"skipping STEP 1-5")
+    
+    if df is None and checkpoints and engine == 'pandas' and workers == 1:
+        from src.data.stages import run_stages
+        if integrity != 'off':
+            raw_tables = read_raw_tables(raw_data_dir, start_date, end_date)
+            if raw_tables is not None and _check_integrity(raw_tables, integrity, processed_data_dir,
+                                                           profiler) is None:
+                profiler.stop()
+                return None
+        with profiler.stage('STEP 1-5 Prepare (checkpointed stages)', lambda: df):
+            df = run_stages(raw_data_dir, start_date=start_date, end_date=end_date,
+                            npi_calendars=npi_calendars, thresholds=thresholds,
+                            horizons=horizons, columns=columns, dtype_report=dtype_report,
+                            profiler=profiler)
+        if df is None:
+            profiler.stop()
+            print(f"\n❌ Required data files not found in {raw_data_dir}")
+            return None
+        if use_cache:
+            with profiler.stage('Cache Store'):
+                store_cached(df, fingerprint)
+            print(f"✓ Cached prepared data ({fingerprint[:12]})")
+    elif df is None:
+        if checkpoints:
+            print(f"⚠ Checkpoints apply to the single-process pandas engine; "
+                  f"running the {engine} engine without them")
+        with profiler.stage('Read Raw Tables'):
+            raw_tables = read_raw_tables(raw_data_dir, start_date, end_date)
+        if raw_tables is None:
+            profiler.stop()
+            print(f"\n❌ Required data files not found in {raw_data_dir}")
+            return None
+        raw_tables = _check_integrity(raw_tables, integrity, processed_data_dir, profiler)
+        if raw_tables is None:
+            profiler.stop()
+            return None
+        df_confirmed, df_deaths, df_recovered = raw_tables
+        
+        print(f"✓ Loaded Confirmed: {df_confirmed.shape}")
+        print(f"✓ Loaded Deaths: {df_deaths.shape}")
+        if df_recovered is not None:
+            print(f"✓ Loaded Recovered: {df_recovered.shape}")
+        
+        with profiler.stage(f'STEP 1-5 Prepare ({engine} engine)', lambda: df):
+            if engine == 'cube':
+                from src.data.cube_engine import prepare_from_cube
+                df = prepare_from_cube(df_confirmed, df_deaths, df_recovered, npi_calendars=npi_calendars,
+                                       dtype_report=dtype_report, thresholds=thresholds,
+                                       horizons=horizons, profiler=profiler, columns=columns,
+                                       start_date=start_date)
+            elif workers != 1:
+                from src.data.sharded import prepare_sharded
+                df = prepare_sharded(df_confirmed, df_deaths, df_recovered, npi_calendars=npi_calendars,
+                                     workers=workers, dtype_report=dtype_report, thresholds=thresholds,
+                                     horizons=horizons, columns=columns, start_date=start_date)
+            else:
+                df = prepare_long_format(df_confirmed, df_deaths, df_recovered,
+                                         npi_calendars=npi_calendars, dtype_report=dtype_report,
+                                         start_date=start_date, thresholds=thresholds,
+                                         horizons=horizons, profiler=profiler, columns=columns)
+        
+        if use_cache:
+            with profiler.stage('Cache Store'):
+                store_cached(df, fingerprint)
+            print(f"✓ Cached prepared data ({fingerprint[:12]})")
+    
+    group_keys = ['Country/Region', 'Province/State']
+    target_cols = ', '.join(target_column(h) for h in horizons)
     
     # ========================================================================
     # STEP 6: SAVE PREPARED DATA
@@ -410,11 +1208,36 @@ def load_and_prepare_data():
     print("\n[STEP 6] SAVING PREPARED DATA")
     print("-" * 80)
     
-    df.to_csv(output_file, index=False)
-    print(f"✓ Saved: {output_file}")
+    with profiler.stage('STEP 6 Save Prepared Data', lambda: df):
+        # No report on a cache hit: nothing was cast
+        if dtype_report:
+            # Keep the last cast of each column (a column may be re-cast after a step)
+            report = pd.DataFrame(dtype_report).drop_duplicates('Column', keep='last')
+            report.to_csv(processed_data_dir / 'dtype_report.csv', index=False)
+            print(f"✓ Memory: {report['Bytes_Before'].sum() / 1e6:.1f} MB -> "
+                  f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB "
+                  f"(per-column report: dtype_report.csv)")
+        
+        written = save_prepared_data(df, processed_data_dir, output_format, export_csv)
+        for output_file in written:
+            print(f"✓ Saved: {output_file}")
+    
+    if export_matrix:
+        from src.data.feature_matrix import export_feature_matrix
+        with profiler.stage('Export Feature Matrix'):
+            matrix_dir = export_feature_matrix(df, data_file=written[0])
+        print(f"✓ Feature matrix: {matrix_dir}")
     print(f"✓ Total rows: {len(df):,}")
     print(f"✓ Total columns: {len(df.columns)}")
     
+    profiler.stop()
+    if run_report:
+        report_file = profiler.write_report(
+            engine=engine, workers=workers, cache_hit=cache_hit,
+            rows=len(df), columns=len(df.columns)
+        )
+        print(f"✓ Run report: {report_file}")
+    
     print("\n[STEP 6 COMPLETE]")
     
     # ========================================================================
@@ -429,7 +1252,7 @@ SUMMARY:
 • Dataset: {len(df):,} rows × {len(df.columns)} columns
 • Date Range: {df['Date'].min().date()} to {df['Date'].max().date()}
 • Countries: {df['Country/Region'].nunique()}
-• Province/State Groups: {df.groupby(group_keys).ngroups:,}
+• Province/State Groups: {df.groupby(group_keys, observed=True).ngroups:,}
 
 KEY FEATURE GROUPS:
 • Temporal: DayOfWeek, Month, IsWeekend, Days_Since_Start, Days_Since_100
@@ -437,7 +1260,7 @@ KEY FEATURE GROUPS:
 • Severity: CFR, Active_Cases, Recovery_Rate, Death_to_Case_Ratio
 • Normalized: Cases_per_100k, Deaths_per_100k
 • Intervention: NPI_Phase, Vaccine_Period, Is_Lockdown, Is_Post_Vaccine
-• Target: {TARGET_COL}
+• Target: {target_cols}
 
 STATUS: READY FOR MODELING ✅
 """)
@@ -445,4 +1268,13 @@ STATUS: READY FOR MODELING ✅
     return df
 
 if __name__ == '__main__':
-    load_and_prepare_data()
+    # Allow `python src/data/prepare_data.py` to import sibling engines
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    run_report = '--run-report' in sys.argv
+    if '--model-features' in sys.argv:
+        # Scoring refresh: only the trained model's features and target
+        from src.models.train_model import model_input_columns
+        load_and_prepare_data(columns=model_input_columns(), run_report=run_report)
+    else:
+        load_and_prepare_data(run_report=run_report)
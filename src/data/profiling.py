@@ -0,0 +1,261 @@
+"""
+Stage Profiling for the Preparation Pipeline
+============================================
+StageProfiler wraps pipeline steps and sub-steps (nested `with` blocks)
+and records per stage:
+- wall time and CPU time (process-wide, all threads)
+- RSS at start/end and the peak RSS reached inside the stage
+- rows/columns of the working frame when the stage ends
+
+On Linux the kernel's peak RSS counter is reset at every stage start
+(/proc/self/clear_refs), so peaks are per stage. Elsewhere the peak is the
+process lifetime peak (report field peak_rss_scope = 'process').
+
+Optionally a SamplingProfiler samples the pipeline thread's stack from a
+background thread. Samples are attributed to the innermost running stage
+and summarised as top functions plus a collapsed-stack file (flamegraph.pl
+/ speedscope input). Samples are only taken when the pipeline thread
+releases the GIL, so long-running C calls show up in coarse steps.
+
+Reports are written as JSON to data/processed/run_reports/ (git-ignored);
+only the newest KEEP_REPORTS runs are kept there.
+"""
+
+import sys
+import json
+import time
+import platform
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP_FUNCTIONS = 25
+KEEP_REPORTS = 20  # runs kept in the report directory
+
+
+def default_report_dir():
+    """Default location of the run reports."""
+    return Path(__file__).parent.parent.parent / 'data' / 'processed' / 'run_reports'
+
+
+def _read_status_mb(field):
+    """A memory field of /proc/self/status in MB, or None off Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb():
+    """Current resident set size in MB (None if unavailable)."""
+    rss = _read_status_mb('VmRSS')
+    if rss is None:
+        try:
+            import psutil
+            rss = psutil.Process().memory_info().rss / 2**20
+        except ImportError:
+            pass
+    return rss
+
+
+def peak_rss_mb():
+    """Peak resident set size in MB since the last reset (None if unavailable)."""
+    peak = _read_status_mb('VmHWM')
+    if peak is None and resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes elsewhere
+        peak = max_rss / 2**20 if sys.platform == 'darwin' else max_rss / 1024
+    return peak
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter; returns False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def prune_reports(report_dir, keep=KEEP_REPORTS):
+    """Delete all but the newest keep runs (report and collapsed stacks) in report_dir."""
+    reports = sorted(Path(report_dir).glob('prepare_*.json'))  # timestamped names sort by time
+    for report_file in reports[:max(len(reports) - keep, 0)]:
+        report_file.unlink(missing_ok=True)
+        report_file.with_name(report_file.stem + '.collapsed.txt').unlink(missing_ok=True)
+
+
+def _round(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds from a daemon thread."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, stage_stack=None):
+        self.interval = interval
+        self.stage_stack = stage_stack if stage_stack is not None else []
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target_id = None
+
+    def start(self):
+        """Start sampling the calling thread."""
+        self._target_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stage-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_id)
+            if frame is None:
+                continue
+            calls = []
+            while frame is not None:
+                code = frame.f_code
+                calls.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            stage = self.stage_stack[-1]['name'] if self.stage_stack else '(no stage)'
+            self.stacks[(f"[{stage}]",) + tuple(reversed(calls))] += 1
+
+    def summary(self, top=TOP_FUNCTIONS):
+        """Sample counts and the top functions by self and total samples."""
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack[1:]):
+                inclusive[function] += count
+        return {
+            'interval_s': self.interval,
+            'samples': total,
+            'top_functions': [
+                {
+                    'function': function,
+                    'self_samples': count,
+                    'total_samples': inclusive[function],
+                    'self_pct': _round(100 * count / total, 1),
+                }
+                for function, count in own.most_common(top)
+            ],
+        }
+
+    def write_collapsed(self, path):
+        """Write 'frame;frame;frame count' lines (flamegraph.pl / speedscope)."""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        return Path(path)
+
+
+class StageProfiler:
+    """Records timing, memory and frame shape for nested pipeline stages."""
+
+    def __init__(self, sample=False, interval=SAMPLE_INTERVAL):
+        self.stages = []
+        self._stack = []
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.per_stage_peak = reset_peak_rss()
+        self.sampler = SamplingProfiler(interval, self._stack) if sample else None
+
+    @contextmanager
+    def stage(self, name, frame=None):
+        """
+        Time a stage. frame is an optional callable returning the working
+        DataFrame; its shape is recorded when the stage ends.
+        """
+        if self.per_stage_peak:
+            # Keep the enclosing stage's peak so far before resetting the counter
+            if self._stack:
+                parent = self._stack[-1]
+                parent['_child_peak'] = max(parent.get('_child_peak', 0), peak_rss_mb())
+            reset_peak_rss()
+        record = {'name': name, 'level': len(self._stack)}
+        self.stages.append(record)
+        self._stack.append(record)
+        rss_start = current_rss_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+            if frame is not None:
+                record['rows'], record['columns'] = frame().shape
+        finally:
+            record['wall_s'] = round(time.perf_counter() - wall_start, 4)
+            record['cpu_s'] = round(time.process_time() - cpu_start, 4)
+            self._stack.pop()
+            rss_end = current_rss_mb()
+            # Nested stages reset the counter, so fold in their (and earlier) peaks
+            peak = max(filter(None, [peak_rss_mb(), record.pop('_child_peak', None)]), default=None)
+            if self._stack and peak is not None:
+                parent = self._stack[-1]
+                parent['_child_peak'] = max(parent.get('_child_peak', 0), peak)
+            record.update({
+                'rss_start_mb': _round(rss_start),
+                'rss_end_mb': _round(rss_end),
+                'peak_rss_mb': _round(peak),
+                'peak_rss_delta_mb': _round(peak - rss_start) if None not in (peak, rss_start) else None,
+            })
+
+    def start(self):
+        """Start the sampling profiler, if enabled."""
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def stop(self):
+        """Stop the sampling profiler, if enabled."""
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def report(self, **metadata):
+        """Machine-readable run report."""
+        report = {
+            'started_at': self.started_at,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'peak_rss_scope': 'stage' if self.per_stage_peak else 'process',
+            **metadata,
+            'stages': self.stages,
+        }
+        if self.sampler is not None:
+            report['sampling_profile'] = self.sampler.summary()
+        return report
+
+    def write_report(self, report_dir=None, keep=KEEP_REPORTS, **metadata):
+        """
+        Write the JSON report (and collapsed stacks when sampling) to
+        report_dir as prepare_<timestamp>.json, keeping the newest keep runs
+        there. Returns the report path.
+        """
+        report_dir = Path(report_dir or default_report_dir())
+        report_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        report = self.report(**metadata)
+        if self.sampler is not None:
+            collapsed = self.sampler.write_collapsed(report_dir / f'prepare_{stamp}.collapsed.txt')
+            report['sampling_profile']['collapsed_stacks'] = collapsed.name
+        report_file = report_dir / f'prepare_{stamp}.json'
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        prune_reports(report_dir, keep)
+        return report_file
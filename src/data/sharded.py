@@ -0,0 +1,282 @@
+"""
+Sharded Preparation Across a Process Pool
+=========================================
+Runs the long-format STEP 1-5 of prepare_data.py on shards of locations in
+parallel worker processes and concatenates the results deterministically.
+
+Locations are sharded by Country/Region, not by (Country/Region,
+Province/State) group: coordinate filling and Days_Since_<N> are computed
+per country. The two values that depend on all locations, the pandemic
+start date and the median population used for unknown countries, are
+computed once in the parent and passed to every shard.
+
+prepare_out_of_core is the bounded-memory variant for tables whose long
+frame does not fit in RAM (e.g. county-level data). A first pass over the
+wide tables computes every global statistic, including the per-country
+coordinate centroids and Days_Since_<N> first dates, so shards may split a
+country. Shards of at most shard_rows long rows are then prepared one at a
+time and written as parts of a Parquet dataset, in the row order and with
+the categories of the in-memory run:
+
+    data/processed/covid19_prepared_data/part-00000.parquet, ...
+"""
+
+import os
+import shutil
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from src.data.prepare_data import (
+    POPULATION_DATA,
+    CATEGORICAL_COLUMNS,
+    DAYS_SINCE_THRESHOLDS,
+    TARGET_HORIZONS,
+    apply_dtype_plan,
+    integrate_tables,
+    prepare_long_format,
+)
+
+LOCATION_KEYS = ['Country/Region', 'Province/State']
+ID_COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long']
+SHARD_ROWS = 2_000_000  # long rows per out-of-core shard
+
+
+def plan_shards(df_confirmed, n_shards):
+    """
+    Assign countries to at most n_shards shards with balanced row counts.
+    Largest countries are placed first, each on the currently smallest
+    shard, so the assignment only depends on the table contents.
+    Returns a list of country name lists.
+    """
+    sizes = df_confirmed['Country/Region'].value_counts()
+    countries = sorted(sizes.index, key=lambda country: (-sizes[country], country))
+    n_shards = max(1, min(n_shards, len(countries)))
+
+    shards = [[] for _ in range(n_shards)]
+    loads = [0] * n_shards
+    for country in countries:
+        target = loads.index(min(loads))
+        shards[target].append(country)
+        loads[target] += sizes[country]
+    return [sorted(shard) for shard in shards]
+
+
+def first_date(df_confirmed, start_date=None):
+    """Day 0 of Days_Since_Start: start_date, or the first date column of the wide table."""
+    if start_date is not None:
+        return pd.Timestamp(start_date)
+    return pd.to_datetime(df_confirmed.columns[4:], format='%m/%d/%y').min()
+
+
+def population_median(tables):
+    """
+    Median population over all prepared rows, matching STEP 4 of the
+    unsharded run: every location contributes the same number of dates,
+    so the row median equals the median over the merged location rows.
+    """
+    locations = pd.concat([t[ID_COLUMNS] for t in tables if t is not None]).drop_duplicates()
+    return locations['Country/Region'].map(POPULATION_DATA).median()
+
+
+def _location_rows(tables):
+    """Distinct location rows over all tables, as the outer merge of STEP 1 sees them."""
+    return pd.concat([t[ID_COLUMNS].astype({'Country/Region': object, 'Province/State': object})
+                      for t in tables if t is not None]).drop_duplicates()
+
+
+def _location_keys(table):
+    """(Country/Region, Province/State) of each row, with STEP 1's 'All' fill."""
+    return pd.MultiIndex.from_arrays([table['Country/Region'].astype(object),
+                                      table['Province/State'].astype(object).fillna('All')])
+
+
+def location_skeleton(tables):
+    """
+    STEP 1 on the first date column only: one row per location in the
+    prepared row order, with the key dtypes (and categories) of the full run.
+    """
+    skeleton = [None if t is None else t.iloc[:, :len(ID_COLUMNS) + 1] for t in tables]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return integrate_tables(*skeleton)
+
+
+def country_statistics(tables, thresholds=DAYS_SINCE_THRESHOLDS):
+    """
+    Per-country values STEP 2-3 otherwise derive from all of a country's
+    rows: the mean Lat/Long used to fill missing coordinates and, per
+    threshold, the first date any of its locations reached N confirmed
+    cases (column Days_Since_<N>, NaT if never). Every location contributes
+    the same number of dates, so the row means equal the location means.
+    Returns a DataFrame indexed by Country/Region (see prepare_long_format).
+    """
+    stats = _location_rows(tables).groupby('Country/Region')[['Lat', 'Long']].mean()
+
+    confirmed = tables[0]
+    dates = pd.to_datetime(confirmed.columns[4:], format='%m/%d/%y')
+    # Cleaning takes a running maximum, so a location first reaches N on
+    # the first raw value >= N
+    values = confirmed.iloc[:, 4:].to_numpy(dtype=np.float64)
+    countries = confirmed['Country/Region'].astype(object).to_numpy()
+    for n in thresholds:
+        reached = values >= n
+        first = pd.Series(np.where(reached.any(axis=1), dates[reached.argmax(axis=1)], pd.NaT),
+                          dtype='datetime64[ns]')
+        stats[f'Days_Since_{n}'] = first.groupby(countries).min().reindex(stats.index)
+    return stats
+
+
+def plan_location_shards(tables, shard_rows=SHARD_ROWS):
+    """
+    Split the locations, in the order of the prepared rows, into
+    consecutive shards of at most shard_rows long rows (at least one
+    location each). Returns a list of (Country/Region, Province/State) key lists.
+    """
+    keys = list(dict.fromkeys(_location_keys(location_skeleton(tables))))
+    n_dates = len(tables[0].columns) - len(ID_COLUMNS)
+    per_shard = max(1, shard_rows // max(1, n_dates))
+    return [keys[i:i + per_shard] for i in range(0, len(keys), per_shard)]
+
+
+def merge_dtype_reports(reports):
+    """One dtype report row per column, with bytes summed over shards."""
+    report = pd.DataFrame([row for shard_report in reports for row in shard_report])
+    summed = report.groupby('Column', sort=False).agg({
+        'Dtype_Before': 'first', 'Bytes_Before': 'sum',
+        'Dtype_After': 'first', 'Bytes_After': 'sum',
+    })
+    return summed.reset_index().to_dict('records')
+
+
+def _prepare_shard(args):
+    """Worker entry point: STEP 1-5 on one shard, progress output discarded."""
+    tables, npi_calendars, start_date, median_population, thresholds, horizons, columns = args
+    report = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = prepare_long_format(*tables, npi_calendars=npi_calendars, dtype_report=report,
+                                 start_date=start_date, median_population=median_population,
+                                 thresholds=thresholds, horizons=horizons, columns=columns)
+    return df, report
+
+
+def prepare_sharded(df_confirmed, df_deaths, df_recovered=None, npi_calendars=None,
+                    workers=None, dtype_report=None, thresholds=DAYS_SINCE_THRESHOLDS,
+                    horizons=TARGET_HORIZONS, columns=None, start_date=None):
+    """
+    Sharded counterpart of prepare_long_format.
+
+    Args:
+        workers: Number of worker processes (default: all cores). With one
+            worker the shards run in this process.
+        dtype_report: Optional list; receives per-column bytes summed over shards
+        thresholds: Case counts N for the Days_Since_<N> columns
+        horizons: Days ahead for the *_future<N>d and target columns
+        columns: Output columns to compute (see required_columns)
+        start_date: Day 0 of Days_Since_Start (default: first date in the tables)
+
+    Returns:
+        The prepared DataFrame, identical to prepare_long_format on all tables
+    """
+    workers = workers or os.cpu_count() or 1
+    tables = (df_confirmed, df_deaths, df_recovered)
+    start_date = first_date(df_confirmed, start_date)
+    median_population = population_median(tables)
+
+    shards = plan_shards(df_confirmed, workers)
+    shard_args = []
+    for countries in shards:
+        shard_tables = tuple(
+            t[t['Country/Region'].isin(countries)].reset_index(drop=True) if t is not None else None
+            for t in tables
+        )
+        shard_args.append((shard_tables, npi_calendars, start_date, median_population,
+                           thresholds, horizons, columns))
+
+    print(f"\n✓ Sharded {len(df_confirmed['Country/Region'].unique())} countries into "
+          f"{len(shards)} shard(s) across {workers} worker process(es)")
+    if workers == 1 or len(shards) == 1:
+        results = [_prepare_shard(args) for args in shard_args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_prepare_shard, shard_args))
+
+    # Shards hold disjoint countries and are sorted within, so a stable
+    # sort restores the unsharded row order
+    df = pd.concat([shard_df for shard_df, _ in results], ignore_index=True)
+    df = df.sort_values(LOCATION_KEYS + ['Date'], kind='stable').reset_index(drop=True)
+    # Per-shard categories differ, so concat falls back to object
+    apply_dtype_plan(df, [col for col in CATEGORICAL_COLUMNS if col in df])
+
+    if dtype_report is not None:
+        dtype_report.extend(merge_dtype_reports(shard_report for _, shard_report in results))
+
+    print(f"✓ Prepared {len(df):,} rows from {len(shards)} shard(s)")
+    return df
+
+
+def prepare_out_of_core(df_confirmed, df_deaths, df_recovered=None, output_dir=None,
+                        shard_rows=SHARD_ROWS, npi_calendars=None, dtype_report=None,
+                        thresholds=DAYS_SINCE_THRESHOLDS, horizons=TARGET_HORIZONS, columns=None,
+                        start_date=None):
+    """
+    Bounded-memory counterpart of prepare_long_format: prepare one shard of
+    locations at a time and write it as a part of a Parquet dataset. Only
+    the wide tables and one shard's long frame are in memory.
+
+    Args:
+        output_dir: Dataset directory, replaced once every part is written
+        shard_rows: Upper bound on a shard's long rows (one location may exceed it)
+        dtype_report: Optional list; receives per-column bytes summed over shards
+        npi_calendars, thresholds, horizons, columns: As in prepare_long_format
+        start_date: Day 0 of Days_Since_Start (default: first date in the tables)
+
+    Returns:
+        (output_dir, rows): reading the directory with pd.read_parquet gives
+        the frame prepare_long_format returns for the full tables
+    """
+    output_dir = Path(output_dir)
+    tables = (df_confirmed, df_deaths, df_recovered)
+
+    # First pass: every statistic that depends on more than one shard
+    start_date = first_date(df_confirmed, start_date)
+    median_population = population_median(tables)
+    country_stats = country_statistics(tables, thresholds)
+    shards = plan_location_shards(tables, shard_rows)
+    # Each shard only sees its own keys; the full run's categories keep the parts consistent
+    key_dtypes = location_skeleton(tables)[LOCATION_KEYS].dtypes
+    shard_of = {key: i for i, keys in enumerate(shards) for key in keys}
+    table_shards = [None if t is None else _location_keys(t).map(shard_of.get).to_numpy()
+                    for t in tables]
+    print(f"\n✓ Out-of-core: {sum(map(len, shards)):,} locations in {len(shards)} shard(s) "
+          f"of at most {shard_rows:,} rows")
+
+    tmp_dir = output_dir.with_name(output_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    reports, rows = [], 0
+    for i in range(len(shards)):
+        shard_tables = [None if t is None else t[shard_ids == i].reset_index(drop=True)
+                        for t, shard_ids in zip(tables, table_shards)]
+        report = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = prepare_long_format(*shard_tables, npi_calendars=npi_calendars, dtype_report=report,
+                                     start_date=start_date, median_population=median_population,
+                                     thresholds=thresholds, horizons=horizons, columns=columns,
+                                     country_stats=country_stats)
+        for col, dtype in key_dtypes.items():
+            df[col] = df[col].astype(dtype)
+        df.to_parquet(tmp_dir / f'part-{i:05d}.parquet', index=False)
+        rows += len(df)
+        reports.append(report)
+        print(f"✓ Shard {i + 1}/{len(shards)}: {len(df):,} rows")
+        del df, shard_tables
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    tmp_dir.rename(output_dir)
+    if dtype_report is not None:
+        dtype_report.extend(merge_dtype_reports(reports))
+    print(f"✓ Prepared {rows:,} rows into {output_dir}")
+    return output_dir, rows
@@ -0,0 +1,261 @@
+"""
+Resumable Stage DAG for the Preparation Pipeline
+================================================
+The long-format STEP 1-5 of prepare_data.py as named stages with declared
+inputs and parameters:
+
+    confirmed, deaths, recovered (raw files)
+        -> integrate -> clean -> features -> normalize -> target
+
+Every computed stage output is checkpointed to disk together with a
+manifest holding:
+- key: SHA-256 of the stage's code (its function and the prepare_data
+  helpers and constants it references), its parameters and the output
+  fingerprints of its inputs
+- output_fingerprint: SHA-256 of the output frame's content and dtypes
+
+A stage whose key matches its manifest is not run; its checkpoint is only
+read if a downstream stage has to run. A downstream stage therefore
+re-runs only when an upstream output actually changed: editing clean_data
+without changing its output leaves features, normalize and target
+untouched. A run that fails resumes from the last completed stage.
+
+Checkpoints: data/processed/checkpoints/<stage>.parquet + <stage>.json
+"""
+
+import json
+import hashlib
+import inspect
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src.data.prepare_data import (
+    DAYS_SINCE_THRESHOLDS,
+    PIPELINE_VERSION,
+    TARGET_HORIZONS,
+    RAW_DATA_FILES,
+    clean_data,
+    create_target,
+    engineer_features,
+    integrate_tables,
+    normalize_population,
+    read_raw_tables,
+    required_columns,
+)
+
+Stage = namedtuple('Stage', ['name', 'func', 'inputs', 'params'])
+
+RAW_SOURCES = ('confirmed', 'deaths', 'recovered')
+# Topologically ordered; inputs are raw sources or earlier stages
+STAGES = (
+    Stage('integrate', integrate_tables, RAW_SOURCES, ()),
+    Stage('clean', clean_data, ('integrate',), ('columns',)),
+    Stage('features', engineer_features, ('clean',), ('npi_calendars', 'start_date', 'thresholds', 'columns')),
+    Stage('normalize', normalize_population, ('features',), ('median_population', 'columns')),
+    Stage('target', create_target, ('normalize',), ('horizons', 'columns')),
+)
+STAGE_NAMES = tuple(stage.name for stage in STAGES)
+
+
+def default_checkpoint_dir():
+    """Default location of the stage checkpoints."""
+    return Path(__file__).parent.parent.parent / 'data' / 'processed' / 'checkpoints'
+
+
+def _digest(payload):
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _referenced_names(code):
+    """Global names used by a code object and the functions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def code_digest(func):
+    """
+    SHA-256 of func's source plus the source of the project functions and
+    the value of the plain-data constants it references, transitively.
+    """
+    sources, constants = {}, {}
+    pending = [func]
+    while pending:
+        f = pending.pop()
+        qualified = f'{f.__module__}.{f.__qualname__}'
+        if qualified in sources:
+            continue
+        sources[qualified] = inspect.getsource(f)
+        for name in _referenced_names(f.__code__):
+            value = f.__globals__.get(name)
+            if inspect.isfunction(value) and value.__module__ in (func.__module__, f.__module__):
+                pending.append(value)
+            elif isinstance(value, (dict, list, tuple, str, int, float, pd.Timestamp)):
+                constants[name] = repr(value)
+    return _digest({'sources': sources, 'constants': constants})
+
+
+def frame_fingerprint(df):
+    """SHA-256 of a frame's columns, dtypes and values."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[col, str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def raw_fingerprints(raw_data_dir, start_date=None, end_date=None):
+    """
+    Fingerprints of the raw sources from the file contents, the date window
+    and the ingestion code. Returns None if confirmed or deaths is missing.
+    """
+    from src.data.cache import file_digest
+    from src.data.ingest import find_raw_file
+
+    raw_files = [find_raw_file(raw_data_dir, name) for name in RAW_DATA_FILES]
+    if raw_files[0] is None or raw_files[1] is None:
+        return None
+    ingest_digest = file_digest(Path(__file__).parent / 'ingest.py')
+    return {
+        source: _digest({'file': file_digest(path) if path else None, 'ingest': ingest_digest,
+                         'start_date': start_date, 'end_date': end_date})
+        for source, path in zip(RAW_SOURCES, raw_files)
+    }
+
+
+def stage_key(stage, input_fingerprints, params):
+    """Key of a stage run: code, parameters and input output-fingerprints."""
+    return _digest({
+        'pipeline_version': PIPELINE_VERSION,
+        'stage': stage.name,
+        'code': code_digest(stage.func),
+        'params': {name: params.get(name) for name in stage.params},
+        'inputs': [input_fingerprints[name] for name in stage.inputs],
+    })
+
+
+def read_manifest(name, checkpoint_dir=None):
+    """The manifest of a stage's checkpoint, or None if there is no complete checkpoint."""
+    checkpoint_dir = Path(checkpoint_dir or default_checkpoint_dir())
+    manifest_file = checkpoint_dir / f'{name}.json'
+    if not manifest_file.exists() or not (checkpoint_dir / f'{name}.parquet').exists():
+        return None
+    return json.loads(manifest_file.read_text())
+
+
+def write_checkpoint(name, df, manifest, checkpoint_dir=None):
+    """
+    Write a stage output and then its manifest, each via a rename, so an
+    interrupted write never leaves a manifest for a partial checkpoint.
+    """
+    checkpoint_dir = Path(checkpoint_dir or default_checkpoint_dir())
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    (checkpoint_dir / f'{name}.json').unlink(missing_ok=True)
+    tmp_file = checkpoint_dir / f'{name}.parquet.tmp'
+    df.to_parquet(tmp_file, index=False)
+    tmp_file.replace(checkpoint_dir / f'{name}.parquet')
+    tmp_file = checkpoint_dir / f'{name}.json.tmp'
+    tmp_file.write_text(json.dumps(manifest, indent=2, default=str))
+    tmp_file.replace(checkpoint_dir / f'{name}.json')
+
+
+def upstream_stages(target):
+    """Names of target and every stage it depends on, in run order."""
+    by_name = {stage.name: stage for stage in STAGES}
+    if target not in by_name:
+        raise ValueError(f"Unknown stage {target!r}; stages are {STAGE_NAMES}")
+    needed, pending = set(), [target]
+    while pending:
+        name = pending.pop()
+        if name in by_name and name not in needed:
+            needed.add(name)
+            pending.extend(by_name[name].inputs)
+    return [stage.name for stage in STAGES if stage.name in needed]
+
+
+def run_stages(raw_data_dir, until='target', force=(), checkpoint_dir=None, start_date=None,
+               end_date=None, npi_calendars=None, thresholds=DAYS_SINCE_THRESHOLDS,
+               median_population=None, horizons=TARGET_HORIZONS, columns=None, dtype_report=None,
+               profiler=None):
+    """
+    Run the stage DAG up to `until`, reusing every checkpoint whose key is
+    unchanged.
+
+    Args:
+        raw_data_dir: Directory of the raw JHU files
+        until: Stage whose output is returned; only its upstream stages run
+        force: Stage names to re-run even if their checkpoint is current
+            (e.g. force=('features',), until='features' re-runs one stage)
+        start_date, end_date: Optional inclusive window of raw date columns
+        npi_calendars, thresholds, median_population, horizons, columns: As
+            in prepare_long_format
+        dtype_report: Optional list; receives the casts of computed stages
+            and the recorded casts of reused ones
+        profiler: Optional StageProfiler for the computed stages
+
+    Returns:
+        The output frame of `until`, or None if raw files are missing
+    """
+    names = upstream_stages(until)
+    unknown = set(force) - set(STAGE_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {sorted(unknown)}; stages are {STAGE_NAMES}")
+
+    fingerprints = raw_fingerprints(raw_data_dir, start_date, end_date)
+    if fingerprints is None:
+        return None
+    checkpoint_dir = Path(checkpoint_dir or default_checkpoint_dir())
+    params = {'npi_calendars': npi_calendars, 'start_date': start_date,
+              'thresholds': tuple(thresholds), 'median_population': median_population,
+              'horizons': tuple(horizons),
+              'columns': None if columns is None else required_columns(columns, thresholds, horizons)}
+    values = {}
+
+    def take(name):
+        # Stages may modify their input frames, so a value is handed out once
+        if name not in values:
+            if name in RAW_SOURCES:
+                values.update(zip(RAW_SOURCES, read_raw_tables(raw_data_dir, start_date, end_date)))
+            else:
+                values[name] = pd.read_parquet(checkpoint_dir / f'{name}.parquet')
+        return values.pop(name)
+
+    stages = [stage for stage in STAGES if stage.name in names]
+    for stage in stages:
+        key = stage_key(stage, fingerprints, params)
+        manifest = read_manifest(stage.name, checkpoint_dir)
+        if stage.name not in force and manifest is not None and manifest['key'] == key:
+            fingerprints[stage.name] = manifest['output_fingerprint']
+            if dtype_report is not None:
+                dtype_report.extend(manifest['dtype_report'])
+            print(f"✓ Stage {stage.name}: checkpoint is current ({key[:12]})")
+            continue
+
+        print(f"\n✓ Stage {stage.name}: running")
+        stage_report = []
+        kwargs = {name: params[name] for name in stage.params}
+        df = stage.func(*[take(name) for name in stage.inputs], **kwargs,
+                        dtype_report=stage_report, profiler=profiler)
+        fingerprints[stage.name] = frame_fingerprint(df)
+        write_checkpoint(stage.name, df, {
+            'stage': stage.name,
+            'key': key,
+            'output_fingerprint': fingerprints[stage.name],
+            'inputs': {name: fingerprints[name] for name in stage.inputs},
+            'computed_at': datetime.now().isoformat(),
+            'rows': len(df),
+            'columns': len(df.columns),
+            'dtype_report': stage_report,
+        }, checkpoint_dir)
+        values[stage.name] = df
+        if dtype_report is not None:
+            dtype_report.extend(stage_report)
+        if fingerprints[stage.name] == (manifest or {}).get('output_fingerprint'):
+            print(f"✓ Stage {stage.name}: output unchanged, downstream checkpoints stay valid")
+
+    return take(until)
@@ -0,0 +1,187 @@
+"""
+Synthetic JHU-Shaped Data
+=========================
+Generates wide confirmed/deaths/recovered tables in the exact JHU CSSE
+global time-series schema (Province/State, Country/Region, Lat, Long, one
+m/d/yy column per day of cumulative counts) at any scale, for benchmarks
+and tests.
+
+Each location's daily cases are a sum of Gaussian epidemic waves with
+Poisson noise and a weekend reporting dip. On top of the true curve:
+- reporting gaps: runs of days without an update (cumulative stays flat)
+  followed by a catch-up jump
+- cumulative corrections: one-day dips and permanent downward revisions,
+  the decreases the cleaning step repairs with a running maximum
+- missing coordinates and locations absent from the recovered table
+
+Deaths follow cases with a lag and a per-location fatality rate; recovered
+follow cases with a longer lag and can stop being reported (as JHU's did).
+The same seed and options always give the same tables.
+
+Usage:
+    write_jhu_csvs('data/synthetic', n_locations=3000, n_days=1100, seed=1)
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from src.data.prepare_data import POPULATION_DATA, RAW_DATA_FILES
+
+ID_COLUMNS = ['Province/State', 'Country/Region', 'Lat', 'Long']
+START_DATE = '2020-01-22'  # first JHU date column
+MAX_GAP_DAYS = 14
+
+
+def _locations(n_locations, n_countries, missing_coordinate_rate, rng):
+    """Location key and coordinate columns; the first location of a country is country-level."""
+    n_countries = min(n_countries or min(n_locations, 200), n_locations)
+    known = list(POPULATION_DATA)
+    countries = known[:n_countries] + [f'Country {k:03d}' for k in range(n_countries - len(known))]
+
+    country_idx = np.arange(n_locations) % n_countries
+    rank = np.arange(n_locations) // n_countries  # 0 = country-level row
+    provinces = np.where(rank == 0, None, [f'Province {r:04d}' for r in rank]).astype(object)
+
+    centroids = np.column_stack([rng.uniform(-50, 65, n_countries), rng.uniform(-160, 175, n_countries)])
+    coords = centroids[country_idx] + rng.normal(0, 2.0, (n_locations, 2)) * (rank > 0)[:, None]
+    coords[rng.random(n_locations) < missing_coordinate_rate] = np.nan
+
+    order = np.lexsort((rank, country_idx))  # grouped by country, like the JHU files
+    return pd.DataFrame({
+        'Province/State': provinces[order],
+        'Country/Region': np.array(countries, dtype=object)[country_idx[order]],
+        'Lat': coords[order, 0].round(5),
+        'Long': coords[order, 1].round(5),
+    })
+
+
+def _shift_days(values, lag):
+    """Shift (location, day) arrays later by lag days, zero-filled."""
+    out = np.zeros_like(values)
+    out[:, lag:] = values[:, :values.shape[1] - lag]
+    return out
+
+
+def _epidemic_curves(n_locations, n_days, waves, weekend_dip, dates, rng):
+    """Expected daily cases (location, day) as a sum of Gaussian waves."""
+    days = np.arange(n_days, dtype=np.float64)
+    size = rng.lognormal(mean=5.0, sigma=1.5, size=n_locations)  # location scale
+    n_waves = rng.integers(waves[0], waves[1] + 1, size=n_locations)
+    expected = np.zeros((n_locations, n_days))
+    for w in range(waves[1]):
+        peak = rng.uniform(0, n_days, n_locations)
+        width = rng.uniform(10, 60, n_locations)
+        height = size * rng.lognormal(0, 0.7, n_locations) * (w < n_waves)
+        expected += height[:, None] * np.exp(-0.5 * ((days[None, :] - peak[:, None]) / width[:, None]) ** 2)
+    # Nothing is reported before each location's first case
+    outbreak_day = rng.integers(0, max(1, min(60, n_days)), n_locations)
+    expected[days[None, :] < outbreak_day[:, None]] = 0
+    weekend = np.isin(dates.dayofweek, [5, 6])
+    expected[:, weekend] *= 1 - weekend_dip
+    return expected
+
+
+def _with_reporting_gaps(cumulative, gap_rate, mean_gap_days, rng):
+    """Hold the last reported value through randomly placed gaps."""
+    n_locations, n_days = cumulative.shape
+    starts = rng.random(cumulative.shape) < gap_rate
+    lengths = np.minimum(rng.geometric(1 / mean_gap_days, cumulative.shape), MAX_GAP_DAYS)
+    missing = np.zeros(cumulative.shape, dtype=bool)
+    for k in range(MAX_GAP_DAYS):
+        missing[:, k:] |= (starts & (lengths > k))[:, :n_days - k]
+    missing[:, 0] = False
+    last_reported = np.where(missing, 0, np.arange(n_days))
+    last_reported = np.maximum.accumulate(last_reported, axis=1)
+    return np.take_along_axis(cumulative, last_reported, axis=1)
+
+
+def _with_corrections(cumulative, correction_rate, rng):
+    """Apply one-day dips and permanent downward revisions to cumulative counts."""
+    cumulative = cumulative.copy()
+    locs, days = np.nonzero((rng.random(cumulative.shape) < correction_rate) & (cumulative > 0))
+    amounts = np.ceil(cumulative[locs, days] * rng.uniform(0.001, 0.05, len(locs))).astype(np.int64)
+    permanent = rng.random(len(locs)) < 0.5
+    for loc, day, amount, is_permanent in zip(locs, days, amounts, permanent):
+        if is_permanent:
+            cumulative[loc, day:] -= amount
+        else:
+            cumulative[loc, day] -= amount
+    return np.maximum(cumulative, 0)
+
+
+def generate_jhu_tables(n_locations=300, n_days=365, seed=0, start_date=START_DATE,
+                        n_countries=None, waves=(1, 4), weekend_dip=0.3, gap_rate=0.01,
+                        mean_gap_days=3, correction_rate=0.001, missing_coordinate_rate=0.01,
+                        recovered_coverage=0.95, recovered_stop_day=None):
+    """
+    Generate wide JHU-shaped confirmed, deaths and recovered tables.
+
+    Args:
+        n_locations: Number of (Province/State, Country/Region) rows
+        n_days: Number of date columns from start_date
+        seed: Seed for numpy's default_rng; equal seeds give equal tables
+        n_countries: Distinct countries (default: min(n_locations, 200));
+            names come from POPULATION_DATA first, then 'Country NNN'
+        waves: (min, max) epidemic waves per location
+        weekend_dip: Fraction of Saturday/Sunday cases not reported
+        gap_rate: Per-day chance that a reporting gap starts
+        mean_gap_days: Mean gap length (capped at MAX_GAP_DAYS)
+        correction_rate: Per-day chance of a downward cumulative correction
+        missing_coordinate_rate: Fraction of locations with NaN Lat/Long
+        recovered_coverage: Fraction of locations present in recovered
+        recovered_stop_day: Day index after which recovered reads 0
+
+    Returns:
+        (confirmed, deaths, recovered) DataFrames
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=n_days, freq='D')
+    locations = _locations(n_locations, n_countries, missing_coordinate_rate, rng)
+
+    expected = _epidemic_curves(n_locations, n_days, waves, weekend_dip, dates, rng)
+    daily_cases = rng.poisson(expected)
+    fatality = rng.uniform(0.005, 0.04, (n_locations, 1))
+    daily_deaths = rng.binomial(_shift_days(daily_cases, 14), fatality)
+
+    cumulative_cases = np.cumsum(daily_cases, axis=1)
+    cumulative_deaths = np.cumsum(daily_deaths, axis=1)
+    cumulative_recovered = np.maximum(_shift_days(cumulative_cases, 21) - cumulative_deaths, 0)
+    if recovered_stop_day is not None:
+        cumulative_recovered[:, recovered_stop_day + 1:] = 0
+
+    columns = dates.strftime('%-m/%-d/%y')
+    tables = []
+    for cumulative in (cumulative_cases, cumulative_deaths, cumulative_recovered):
+        reported = _with_reporting_gaps(cumulative, gap_rate, mean_gap_days, rng)
+        reported = _with_corrections(reported, correction_rate, rng)
+        tables.append(pd.concat([locations, pd.DataFrame(reported, columns=columns)], axis=1))
+
+    confirmed, deaths, recovered = tables
+    keep = rng.random(n_locations) < recovered_coverage
+    recovered = recovered[keep].reset_index(drop=True)
+    return confirmed, deaths, recovered
+
+
+def write_jhu_csvs(output_dir, compression=None, **options):
+    """
+    Write generated tables under the JHU file names (RAW_DATA_FILES), so
+    output_dir can stand in for data/raw.
+
+    Args:
+        output_dir: Directory to write to (created if missing)
+        compression: None, 'gzip' (.csv.gz) or 'zstd' (.csv.zst)
+        **options: Passed to generate_jhu_tables
+
+    Returns:
+        List of written file paths
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = {None: '', 'gzip': '.gz', 'zstd': '.zst'}[compression]
+    written = []
+    for name, table in zip(RAW_DATA_FILES, generate_jhu_tables(**options)):
+        path = output_dir / f'{name}{suffix}'
+        table.to_csv(path, index=False, compression=compression)
+        written.append(path)
+    return written
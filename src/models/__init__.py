@@ -1,4 +1,11 @@
 """Model training module"""
-from .train_model import train_warning_system
 
 __all__ = ['train_warning_system']
+
+
+def __getattr__(name):
+    # Imported on first use, so flat_forest inference loads without scikit-learn
+    if name == 'train_warning_system':
+        from .train_model import train_warning_system
+        return train_warning_system
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
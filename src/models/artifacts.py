@@ -0,0 +1,18 @@
+"""
+Trained Model Artifact Paths
+============================
+Names of the files train_model.py writes to models/trained/, shared with
+inference (predict_model.py, the app) without importing scikit-learn.
+"""
+
+from pathlib import Path
+
+DEFAULT_HORIZON = 7
+
+
+def artifact_file(models_dir, name, horizon=DEFAULT_HORIZON):
+    """Path of a training artifact; non-default horizons get a _<N>d suffix."""
+    path = Path(models_dir) / name
+    if horizon == DEFAULT_HORIZON:
+        return path
+    return path.with_name(f'{path.stem}_{horizon}d{path.suffix}')
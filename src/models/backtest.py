@@ -0,0 +1,174 @@
+"""
+Rolling-Origin Backtesting
+==========================
+Evaluates the warning model the way it is used: trained on everything up
+to a date, scored on the weeks after it. Each fold moves the origin forward
+by test_days; its test window holds the test_days dates after the origin,
+and its training rows are all dates before origin - purge_days. The purge
+gap equals the forecast horizon, so no training label (the warning level
+horizon days ahead) is observed inside the test window.
+
+Folds train in parallel worker processes (joblib). All folds share one
+read-only feature matrix: the memory-mapped feature matrix when one was
+exported (see src/data/feature_matrix.py), otherwise a float32 array that
+joblib memory-maps once for every worker. Each worker only gathers its
+own fold's rows.
+
+Per-fold metrics and timings go to the model metadata under 'backtest'
+and to models/trained/backtest_folds.csv.
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, recall_score
+
+from src.data.prepare_data import HORIZON_DAYS
+
+N_FOLDS = 6
+TEST_DAYS = 28  # four weekly warning cycles per fold
+
+Fold = namedtuple('Fold', ['fold', 'train_end', 'test_start', 'test_end'])
+# features: 2D float32 array, columns: indices of the model's features in it
+# (None = all), labels: class codes with -1 for a missing target
+BacktestInputs = namedtuple('BacktestInputs', ['features', 'columns', 'labels', 'dates', 'classes'])
+
+
+def rolling_origin_folds(dates, n_folds=N_FOLDS, test_days=TEST_DAYS, purge_days=HORIZON_DAYS):
+    """
+    Fold boundaries over the labelled dates, the last fold ending on the
+    last one. train_end is the last training date (inclusive).
+    """
+    days = np.unique(np.asarray(dates, dtype='datetime64[D]'))
+    last = days[-1]
+    step = np.timedelta64(test_days, 'D')
+    folds = []
+    for k in range(n_folds):
+        test_start = last - (n_folds - k) * step + np.timedelta64(1, 'D')
+        train_end = test_start - np.timedelta64(purge_days + 1, 'D')
+        if train_end < days[0]:
+            continue
+        folds.append(Fold(len(folds), train_end, test_start, test_start + step - np.timedelta64(1, 'D')))
+    return folds
+
+
+def matrix_inputs(matrix, feature_names, target_col):
+    """BacktestInputs over the memory-mapped feature matrix (no copies)."""
+    schema = matrix.schema
+    columns = [schema['feature_columns'].index(col) for col in feature_names]
+    labels = matrix.targets[:, schema['target_columns'].index(target_col)]
+    return BacktestInputs(matrix.features, columns, labels, matrix.dates, list(schema['target_classes']))
+
+
+def frame_inputs(df, feature_names, target_col, dates):
+    """BacktestInputs from training columns read into a frame, aligned with dates."""
+    classes = sorted(df[target_col].dropna().unique().tolist())
+    labels = pd.Categorical(df[target_col], categories=classes).codes.astype(np.int8)
+    features = df[feature_names].to_numpy(dtype=np.float32, na_value=np.nan)
+    return BacktestInputs(features, None, labels, np.asarray(dates, dtype='datetime64[D]'), classes)
+
+
+def fold_rows(fold, inputs):
+    """(train rows, test rows) of a fold: labelled rows on either side of the purge gap."""
+    labelled = np.asarray(inputs.labels) >= 0
+    dates = np.asarray(inputs.dates)
+    train_rows = np.flatnonzero(labelled & (dates <= fold.train_end))
+    test_rows = np.flatnonzero(labelled & (dates >= fold.test_start) & (dates <= fold.test_end))
+    return train_rows, test_rows
+
+
+def gather_features(inputs, rows):
+    """Model feature values of some rows, as one contiguous array."""
+    X = inputs.features[rows]
+    return X if inputs.columns is None else X[:, inputs.columns]
+
+
+def fold_metrics(y_test, y_pred, classes):
+    """Accuracy, macro recall and per-class recall (classes present in y_test)."""
+    metrics = {'accuracy': float(accuracy_score(y_test, y_pred)) if len(y_test) else np.nan}
+    present = np.unique(y_test)
+    recalls = recall_score(y_test, y_pred, labels=present, average=None, zero_division=0) if len(present) else []
+    metrics['macro_recall'] = float(np.mean(recalls)) if len(recalls) else np.nan
+    for code, recall in zip(present, recalls):
+        metrics[f'recall_{classes[code]}'] = float(recall)
+    return metrics
+
+
+def _run_fold(fold, inputs, model_params):
+    """Train and score one fold; runs in a worker process."""
+    start = time.perf_counter()
+    train_rows, test_rows = fold_rows(fold, inputs)
+
+    X_train, y_train = gather_features(inputs, train_rows), np.asarray(inputs.labels[train_rows])
+    model = RandomForestClassifier(**model_params)
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - fit_start
+    del X_train
+
+    predict_start = time.perf_counter()
+    y_pred = model.predict(gather_features(inputs, test_rows))
+    predict_s = time.perf_counter() - predict_start
+
+    result = {
+        'fold': fold.fold,
+        'train_end': str(fold.train_end),
+        'test_start': str(fold.test_start),
+        'test_end': str(fold.test_end),
+        'n_train': len(train_rows),
+        'n_test': len(test_rows),
+        **fold_metrics(np.asarray(inputs.labels[test_rows]), y_pred, inputs.classes),
+    }
+    result.update(fit_s=fit_s, predict_s=predict_s, wall_s=time.perf_counter() - start, pid=os.getpid())
+    return result
+
+
+def run_backtest(inputs, model_params, n_folds=N_FOLDS, test_days=TEST_DAYS,
+                 purge_days=HORIZON_DAYS, n_jobs=-1):
+    """
+    Train and evaluate every rolling-origin fold in parallel.
+
+    Args:
+        inputs: BacktestInputs (see matrix_inputs / frame_inputs)
+        model_params: RandomForestClassifier parameters; each fold model
+            uses one core, the folds run side by side
+        n_folds, test_days, purge_days: Fold layout (see rolling_origin_folds)
+        n_jobs: Worker processes (joblib; -1 = all cores)
+
+    Returns:
+        (DataFrame with one row of metrics and timings per fold,
+        summary dict for the model metadata)
+    """
+    labelled = np.asarray(inputs.labels) >= 0
+    folds = rolling_origin_folds(np.asarray(inputs.dates)[labelled], n_folds, test_days, purge_days)
+    if not folds:
+        raise ValueError(f"Not enough dates for {n_folds} folds of {test_days} days "
+                         f"with a {purge_days}-day purge gap")
+    fold_params = {**model_params, 'n_jobs': 1, 'verbose': 0}
+
+    start = time.perf_counter()
+    # Large arrays are memory-mapped once and shared read-only by the workers
+    results = Parallel(n_jobs=n_jobs, mmap_mode='r')(
+        delayed(_run_fold)(fold, inputs, fold_params) for fold in folds
+    )
+    wall_s = time.perf_counter() - start
+
+    folds_df = pd.DataFrame(results)
+    summary = {
+        'n_folds': len(folds),
+        'test_days': test_days,
+        'purge_days': purge_days,
+        'n_jobs': n_jobs,
+        'workers': int(folds_df['pid'].nunique()),
+        'wall_s': wall_s,
+        'fold_fit_s': float(folds_df['fit_s'].sum()),
+        'mean_accuracy': float(folds_df['accuracy'].mean()),
+        'mean_macro_recall': float(folds_df['macro_recall'].mean()),
+        'folds': folds_df.drop(columns='pid').to_dict(orient='records'),
+    }
+    return folds_df, summary
@@ -0,0 +1,189 @@
+"""
+Flat-Array Forest Predictor
+===========================
+Training exports the Random Forest as contiguous NumPy arrays
+(models/trained/flat_forest.npz, next to best_covid_warning_model.pkl),
+and inference evaluates them with NumPy only: no scikit-learn import, no
+unpickling of estimator objects and no per-call input validation.
+
+Arrays (all trees concatenated, node ids are global; within a tree nodes
+are renumbered breadth-first so that the right child is left + 1):
+- feature    int16/int32  split feature; 0 on leaves
+- threshold  float32      split threshold, rounded down from float64 so
+                          that x <= threshold gives the same branch for
+                          the float32 inputs the forest predicts on;
+                          +inf on leaves
+- left       int32        left child; a leaf points to itself
+- missing_left bool       branch of NaN inputs (missing_go_to_left);
+                          True on leaves
+- leaf       int32        row in value of each leaf, -1 on split nodes
+- value      float32      (leaves, classes) class fractions per leaf
+- roots      int32        first node of each tree
+- classes, feature_names  unicode arrays
+
+Prediction walks a batch of rows down all trees at once: per tree level
+one gather each of feature, threshold, input value and child, max_depth
+times (leaves stay put), then averages the leaves' class fractions, as
+RandomForestClassifier.predict_proba does. The NaN rule is only applied
+to batches that hold a NaN.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+FLAT_FOREST_VERSION = 1
+CHUNK_ROWS = 1024  # rows per traversal batch; (rows, trees) node ids stay in cache
+
+
+def _round_down_float32(values):
+    """Largest float32 <= each float64 value."""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _breadth_first(children_left, children_right):
+    """Old node ids in the new order, where each split's children are adjacent."""
+    order = [0]
+    for node in order:  # grows while iterating
+        if children_left[node] != -1:
+            order += [children_left[node], children_right[node]]
+    return np.array(order)
+
+
+def export_flat_forest(model, feature_names, path):
+    """
+    Flatten a fitted RandomForestClassifier into path (.npz).
+
+    Returns:
+        Path of the written file
+    """
+    features, thresholds, lefts, missing_left, leaves, values, roots = [], [], [], [], [], [], []
+    offset, leaf_offset, max_depth = 0, 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        order = _breadth_first(tree.children_left, tree.children_right)
+        new_id = np.empty(len(order), dtype=np.int64)
+        new_id[order] = np.arange(len(order))
+        is_leaf = tree.children_left[order] == -1
+        node_ids = np.arange(offset, offset + len(order))
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        lefts.append(np.where(is_leaf, node_ids, new_id[tree.children_left[order]] + offset))
+        missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool)[order] | is_leaf)
+        leaf_ids = np.full(len(order), -1, dtype=np.int32)
+        leaf_ids[is_leaf] = np.arange(leaf_offset, leaf_offset + is_leaf.sum())
+        leaves.append(leaf_ids)
+        fractions = tree.value[order][is_leaf, 0, :]
+        values.append(fractions / fractions.sum(axis=1, keepdims=True))
+
+        offset += len(order)
+        leaf_offset += int(is_leaf.sum())
+        max_depth = max(max_depth, tree.max_depth)
+
+    feature_dtype = np.int16 if len(feature_names) <= np.iinfo(np.int16).max else np.int32
+    path = Path(path)
+    tmp_file = path.with_name(path.stem + '.tmp.npz')
+    np.savez(
+        tmp_file,
+        version=np.array(FLAT_FOREST_VERSION),
+        feature=np.concatenate(features).astype(feature_dtype),
+        threshold=_round_down_float32(np.concatenate(thresholds)),
+        left=np.concatenate(lefts).astype(np.int32),
+        missing_left=np.concatenate(missing_left),
+        leaf=np.concatenate(leaves),
+        value=np.concatenate(values).astype(np.float32),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=np.array(max_depth),
+        classes=np.array([str(c) for c in model.classes_]),
+        feature_names=np.array(list(feature_names)),
+    )
+    os.replace(tmp_file, path)
+    return path
+
+
+class FlatForestClassifier:
+    """NumPy-only predictor over an exported flat forest (predict / predict_proba / classes_)."""
+
+    def __init__(self, arrays):
+        # Index arrays as intp once, so take() does not convert them on every level
+        self.arrays = {name: values.astype(np.intp) if name in ('feature', 'left', 'leaf', 'roots') else values
+                       for name, values in arrays.items()}
+        self.classes_ = arrays['classes'].astype(object)
+        self.feature_names_in_ = arrays['feature_names'].astype(object)
+        self.n_estimators = len(arrays['roots'])
+        self.max_depth = int(arrays['max_depth'])
+
+    def _features(self, X):
+        """float32 (rows, features) in training column order."""
+        if hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)].to_numpy(dtype=np.float32, na_value=np.nan)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X):
+        """Mean leaf class fractions over all trees, (rows, classes) float64."""
+        X = self._features(X)
+        a = self.arrays
+        proba = np.empty((X.shape[0], len(self.classes_)))
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            has_nan = np.isnan(chunk).any()
+            # Flat offset of each row's first feature, broadcast over trees
+            row_offsets = (np.arange(chunk.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+            flat = chunk.ravel()
+            nodes = np.repeat(a['roots'][None, :], chunk.shape[0], axis=0)
+            for _ in range(self.max_depth):
+                x = flat.take(row_offsets + a['feature'].take(nodes))
+                go_right = ~(x <= a['threshold'].take(nodes))
+                if has_nan:
+                    go_right &= ~(np.isnan(x) & a['missing_left'].take(nodes))
+                nodes = a['left'].take(nodes) + go_right
+            proba[start:start + CHUNK_ROWS] = a['value'][a['leaf'].take(nodes)].mean(axis=1, dtype=np.float64)
+        return proba
+
+    def predict(self, X):
+        """Most probable class of each row."""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_flat_forest(path):
+    """FlatForestClassifier from an exported file, or None if missing or from another version."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays['version']) != FLAT_FOREST_VERSION:
+        return None
+    return FlatForestClassifier(arrays)
+
+
+def load_inference_artifact(model_file, flat_file, metadata_file=None):
+    """
+    The model artifact for inference, shaped like the pickled one ({'model',
+    'feature_names', 'target_classes', 'metadata'}): the flat forest when it
+    is at least as new as model_file, otherwise the pickle. None if neither
+    exists.
+    """
+    import joblib
+
+    model_file, flat_file = Path(model_file), Path(flat_file)
+    if flat_file.exists() and (not model_file.exists()
+                               or flat_file.stat().st_mtime >= model_file.stat().st_mtime):
+        model = load_flat_forest(flat_file)
+        if model is not None:
+            metadata_file = Path(metadata_file) if metadata_file else None
+            return {
+                'model': model,
+                'feature_names': list(model.feature_names_in_),
+                'target_classes': sorted(model.classes_.tolist()),
+                'metadata': joblib.load(metadata_file) if metadata_file and metadata_file.exists() else {},
+            }
+    if model_file.exists():
+        return joblib.load(model_file)
+    return None
@@ -0,0 +1,96 @@
+"""
+COVID-19 Warning System Batch Scoring
+=====================================
+Scores every row of the memory-mapped feature matrix (see
+src/data/feature_matrix.py) with the trained model, reading the matrix in
+row chunks so memory stays bounded by one chunk.
+
+Usage:
+    python src/models/predict_model.py            # 7-day model
+    python src/models/predict_model.py --horizon 14
+
+Uses the flat-array forest (flat_forest.npz) when it is current, otherwise
+the pickled model.
+
+Generates: data/processed/predictions.parquet
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Allow `python src/models/predict_model.py` to import the data modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.data.feature_matrix import matrix_columns, matrix_row_index, open_feature_matrix
+from src.models.artifacts import DEFAULT_HORIZON, artifact_file
+from src.models.flat_forest import load_inference_artifact
+
+CHUNK_ROWS = 65536
+
+
+def score_matrix(model, feature_names, matrix, chunk_rows=CHUNK_ROWS):
+    """
+    Predict warning levels for all matrix rows.
+
+    Returns:
+        (predicted labels, confidence of each prediction or None)
+    """
+    predictions, confidences = [], []
+    for start in range(0, matrix.features.shape[0], chunk_rows):
+        # Columns are gathered per chunk, so only one chunk is ever copied
+        X = matrix_columns(matrix, feature_names, slice(start, start + chunk_rows))
+        chunk = pd.DataFrame(np.asarray(X), columns=feature_names, copy=False)
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(chunk)
+            predictions.append(model.classes_[probabilities.argmax(axis=1)])
+            confidences.append(probabilities.max(axis=1))
+        else:
+            predictions.append(model.predict(chunk))
+    return (np.concatenate(predictions) if predictions else np.array([], dtype=object),
+            np.concatenate(confidences) if confidences else None)
+
+
+def predict_from_matrix(horizon=DEFAULT_HORIZON, matrix_dir=None, output_file=None):
+    """Score the exported feature matrix with the trained model for a horizon."""
+    project_root = Path(__file__).parent.parent.parent
+    model_file = artifact_file(project_root / 'models' / 'trained', 'best_covid_warning_model.pkl', horizon)
+    output_file = Path(output_file or project_root / 'data' / 'processed' / 'predictions.parquet')
+
+    artifact = load_inference_artifact(model_file, artifact_file(model_file.parent, 'flat_forest.npz', horizon))
+    if artifact is None:
+        print(f"❌ ERROR: Model not found at {model_file}")
+        print(f"   Train it first: python src/models/train_model.py")
+        return None
+    matrix = open_feature_matrix(matrix_dir)
+    if matrix is None:
+        print(f"❌ ERROR: Feature matrix not found")
+        print(f"   Export it with load_and_prepare_data(export_matrix=True)")
+        return None
+
+    feature_names = artifact['feature_names']
+    missing = [col for col in feature_names if col not in matrix.schema['feature_columns']]
+    if missing:
+        print(f"❌ ERROR: Feature matrix lacks model features: {', '.join(missing)}")
+        return None
+
+    print(f"✓ Scoring {matrix.schema['rows']:,} rows x {len(feature_names)} features "
+          f"with {type(artifact['model']).__name__}")
+    predictions, confidences = score_matrix(artifact['model'], feature_names, matrix)
+
+    results = matrix_row_index(matrix)
+    results['Predicted_Warning_Level'] = predictions
+    if confidences is not None:
+        results['Confidence'] = confidences
+    results.to_parquet(output_file, index=False)
+    print(f"✓ Saved: {output_file}")
+    print(results['Predicted_Warning_Level'].value_counts())
+    return results
+
+
+if __name__ == '__main__':
+    horizon = DEFAULT_HORIZON
+    if '--horizon' in sys.argv:
+        horizon = int(sys.argv[sys.argv.index('--horizon') + 1])
+    sys.exit(0 if predict_from_matrix(horizon) is not None else 1)
@@ -1,25 +1,259 @@
 """
 COVID-19 Warning System Model Training
 ======================================
-Trains a Random Forest classifier to predict warning levels 7 days in advance.
+Trains a Random Forest classifier to predict warning levels 7 days in advance
+(or N days ahead for any horizon the prepared data holds).
 
 Generates:
 - models/trained/best_covid_warning_model.pkl
 - models/trained/model_metadata.pkl
 - models/trained/per_class_performance.csv
+- models/trained/flat_forest.npz (NumPy-only predictor, see flat_forest.py)
+- models/trained/backtest_folds.csv (with backtest_folds, see backtest.py)
+- models/trained/tuning_log.jsonl (with tune_candidates, see tuning.py)
+(other horizons add a _<N>d suffix, e.g. best_covid_warning_model_14d.pkl)
 """
 
+import re
+import sys
+import time
+from collections import namedtuple
 import pandas as pd
 import numpy as np
 import joblib
 from pathlib import Path
 from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score, recall_score
 
-def train_warning_system():
-    """Train the COVID-19 Warning System model"""
+# Allow `python src/models/train_model.py` to import the data and model modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.models.artifacts import DEFAULT_HORIZON, artifact_file
+
+# Preferred prepared-data files, columnar formats first
+PREPARED_DATA_FILES = [
+    'covid19_prepared_data.parquet',
+    'covid19_prepared_data.feather',
+    'covid19_prepared_data.csv',
+]
+PREPARED_DATASET_DIR = 'covid19_prepared_data'  # out-of-core parts (see src/data/sharded.py)
+TARGET_COLUMNS = ['Warning_Level_7d_Ahead', 'Warning_Level']
+NON_FEATURE_COLUMNS = ['Province/State', 'Country/Region', 'Date',
+                       'Lat', 'Long', 'NPI_Phase', 'Vaccine_Period']
+# *_future<N>d metrics and Warning_Level_<N>d_Ahead targets of one horizon
+HORIZON_COLUMN = re.compile(r'_future(\d+)d$|^Warning_Level_(\d+)d_Ahead$')
+# Random Forest hyperparameters (also used for every backtest fold)
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'class_weight': 'balanced',
+    'random_state': 42,
+}
+CSV_SAMPLE_ROWS = 1000  # rows read to tell numeric CSV columns from text ones
+HOLDOUT_DAYS = 28  # latest days held out for the reported test metrics
+
+# Training columns as the forest consumes them (see load_training_data)
+TrainingData = namedtuple('TrainingData', ['df', 'target_col', 'source', 'load_s', 'bytes_read', 'memory_bytes'])
+
+def target_columns(horizon=DEFAULT_HORIZON):
+    """Target names accepted for a horizon, preferred first (legacy name for the default)."""
+    if horizon == DEFAULT_HORIZON:
+        return TARGET_COLUMNS
+    return [f'Warning_Level_{horizon}d_Ahead']
+
+def other_horizon_columns(columns, horizon=DEFAULT_HORIZON):
+    """Columns that belong to a horizon other than the selected one."""
+    other = []
+    for col in columns:
+        match = HORIZON_COLUMN.search(col)
+        if match and int(match.group(1) or match.group(2)) != horizon:
+            other.append(col)
+    return other
+
+def model_input_columns(model_file=None, horizon=DEFAULT_HORIZON):
+    """
+    Prepared columns a trained model needs: its feature_names plus the
+    target of its horizon. Pass to load_and_prepare_data(columns=...) to
+    compute only these and their inputs.
+    """
+    from src.data.prepare_data import target_column
+    
+    if model_file is None:
+        models_dir = Path(__file__).parent.parent.parent / 'models' / 'trained'
+        model_file = artifact_file(models_dir, 'best_covid_warning_model.pkl', horizon)
+    artifact = joblib.load(model_file)
+    horizon = artifact.get('metadata', {}).get('horizon_days', horizon)
+    return list(artifact['feature_names']) + [target_column(horizon)]
+
+def find_prepared_data(processed_data_dir):
+    """
+    Return the first prepared-data file found (parquet, feather, then csv),
+    or the out-of-core Parquet dataset directory if it was written later.
+    None if there is neither.
+    """
+    data_file = next((Path(processed_data_dir) / name for name in PREPARED_DATA_FILES
+                      if (Path(processed_data_dir) / name).is_file()), None)
+    dataset_dir = Path(processed_data_dir) / PREPARED_DATASET_DIR
+    if dataset_dir.is_dir() and (data_file is None or dataset_dir.stat().st_mtime > data_file.stat().st_mtime):
+        return dataset_dir
+    return data_file
+
+def read_training_columns(data_file, horizon=DEFAULT_HORIZON):
+    """
+    Read only the target and numeric feature columns of the prepared data
+    for one forecast horizon. Future metrics and targets of other horizons
+    are left out, so they never become features.
+    
+    Features come back as float32 (the forest's own input type) and the
+    target as a categorical. Columnar files (and the out-of-core dataset
+    directory) are projected using their schema and cast in Arrow, so
+    unused string and date columns are never loaded and no float64 copy
+    is made; CSV files parse only the projected columns, straight to
+    float32, after a small sample tells numeric columns from text ones.
+    Returns (DataFrame, target column name or None).
+    """
+    data_file = Path(data_file)
+    data_format = 'parquet' if data_file.is_dir() else data_file.suffix[1:]
+    candidates = target_columns(horizon)
+    if data_format == 'csv':
+        sample = pd.read_csv(data_file, nrows=CSV_SAMPLE_ROWS)
+        target_col = next((col for col in candidates if col in sample.columns), None)
+        excluded = NON_FEATURE_COLUMNS + TARGET_COLUMNS + other_horizon_columns(sample.columns, horizon)
+        feature_cols = [col for col in sample.select_dtypes(include=[np.number, 'bool']).columns
+                        if col not in excluded]
+        dtypes = {col: np.float32 for col in feature_cols}
+        if target_col:
+            dtypes[target_col] = 'category'
+        df = pd.read_csv(data_file, usecols=list(dtypes), dtype=dtypes)
+        return df[feature_cols + ([target_col] if target_col else [])], target_col
+    
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    
+    dataset = ds.dataset(data_file, format='parquet' if data_format == 'parquet' else 'feather')
+    schema = dataset.schema
+    target_col = next((col for col in candidates if col in schema.names), None)
+    excluded = NON_FEATURE_COLUMNS + TARGET_COLUMNS + other_horizon_columns(schema.names, horizon)
+    numeric_cols = [
+        field.name for field in schema
+        if field.name not in excluded
+        and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+    ]
+    columns = numeric_cols + ([target_col] if target_col else [])
+    
+    table = dataset.to_table(columns=columns)
+    types = [pa.float32()] * len(numeric_cols)
+    if target_col:
+        target_type = table.schema.field(target_col).type
+        types.append(target_type if pa.types.is_dictionary(target_type)
+                     else pa.dictionary(pa.int8(), target_type))
+    # Unsafe: large counts round exactly as the forest's own float32 conversion does
+    table = table.cast(pa.schema([pa.field(name, t) for name, t in zip(columns, types)]), safe=False)
+    return table.to_pandas(), target_col
+
+def projected_bytes(data_file, columns):
+    """
+    Bytes a projected read takes from disk: the compressed column chunks of
+    the columns for Parquet, the whole file otherwise.
+    """
+    data_file = Path(data_file)
+    files = sorted(data_file.glob('*.parquet')) if data_file.is_dir() else [data_file]
+    if data_file.suffix not in ('', '.parquet'):
+        return sum(f.stat().st_size for f in files)
+    
+    import pyarrow.parquet as pq
+    
+    columns = set(columns)
+    total = 0
+    for f in files:
+        metadata = pq.ParquetFile(f).metadata
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                chunk = row_group.column(j)
+                if chunk.path_in_schema in columns:
+                    total += chunk.total_compressed_size
+    return total
+
+def load_training_data(data_file, horizon=DEFAULT_HORIZON, matrix=None):
+    """
+    Load the training columns for one horizon, timed: from the memory-mapped
+    feature matrix when one is given, otherwise projected from data_file
+    (see read_training_columns).
+    Returns TrainingData(df, target_col, source, load_s, bytes_read, memory_bytes).
+    """
+    start = time.perf_counter()
+    if matrix is not None:
+        df, target_col = read_matrix_columns(matrix, horizon)
+        source = 'feature_matrix (memory-mapped)'
+        bytes_read = int(df.memory_usage(deep=True).sum())  # pages mapped in on use
+    else:
+        df, target_col = read_training_columns(data_file, horizon)
+        source = Path(data_file).name
+        bytes_read = projected_bytes(data_file, df.columns)
+    load_s = time.perf_counter() - start
+    return TrainingData(df, target_col, source, load_s, bytes_read, int(df.memory_usage(deep=True).sum()))
+
+def read_row_dates(data_file):
+    """Date of every prepared row, in the order read_training_columns reads them."""
+    data_file = Path(data_file)
+    if data_file.suffix == '.csv':
+        return pd.read_csv(data_file, usecols=['Date'], parse_dates=['Date'])['Date'].to_numpy()
+    if data_file.suffix == '.feather':
+        return pd.read_feather(data_file, columns=['Date'])['Date'].to_numpy()
+    return pd.read_parquet(data_file, columns=['Date'])['Date'].to_numpy()
+
+def read_matrix_columns(matrix, horizon=DEFAULT_HORIZON):
+    """
+    Counterpart of read_training_columns for the memory-mapped feature
+    matrix (see src/data/feature_matrix.py): same columns, no Parquet parse.
+    Feature columns are (strided) views of the mapped file, so excluding
+    other horizons' columns copies nothing.
+    Returns (DataFrame, target column name or None).
+    """
+    schema = matrix.schema
+    excluded = NON_FEATURE_COLUMNS + TARGET_COLUMNS + other_horizon_columns(schema['feature_columns'], horizon)
+    df = pd.DataFrame({col: matrix.features[:, j] for j, col in enumerate(schema['feature_columns'])
+                       if col not in excluded}, index=pd.RangeIndex(schema['rows']), copy=False)
+    
+    target_col = next((col for col in target_columns(horizon) if col in schema['target_columns']), None)
+    if target_col is not None:
+        codes = np.asarray(matrix.targets[:, schema['target_columns'].index(target_col)])
+        df[target_col] = pd.Categorical.from_codes(codes, categories=schema['target_classes'])
+    return df, target_col
+
+def train_warning_system(horizon=DEFAULT_HORIZON, use_matrix=True, backtest_folds=None, backtest_jobs=-1,
+                         tune_candidates=None, tune_resource='rows', incremental=False, max_trees=None,
+                         compare_full=False):
+    """
+    Train the COVID-19 Warning System model
+    
+    Args:
+        horizon: Days ahead of the target to train on; the prepared data
+            must hold Warning_Level_<horizon>d_Ahead (see the horizons
+            option of load_and_prepare_data)
+        use_matrix: Read features from the memory-mapped feature matrix
+            when one was exported from the current prepared data
+        backtest_folds: If set, also run this many rolling-origin backtest
+            folds (see backtest.py, purge gap = horizon) and store their
+            metrics and timings in the metadata under 'backtest'
+        backtest_jobs: Worker processes for the backtest folds and the
+            hyperparameter search (-1 = all cores)
+        tune_candidates: If set, search hyperparameters first (successive
+            halving over this many sampled configurations, see tuning.py)
+            and train the final model with the best one; the search
+            resumes from models/trained/tuning_log.jsonl
+        tune_resource: Search budget, 'rows' or 'trees'
+        incremental: Refresh the saved model instead of retraining: add
+            trees fitted on the latest rows (see warm_start.py); falls back
+            to a full training when there is no compatible saved model
+        max_trees: With incremental, retire the oldest trees beyond this many
+        compare_full: With incremental, also score the refresh against a
+            full retrain on a holdout of the latest dates
+    """
     
     print("\n" + "="*80)
     print("COVID-19 WARNING SYSTEM - MODEL TRAINING")
@@ -27,43 +261,45 @@ def train_warning_system():
     
     # Define paths
     project_root = Path(__file__).parent.parent.parent
-    data_file = project_root / 'data' / 'processed' / 'covid19_prepared_data.csv'
+    data_file = find_prepared_data(project_root / 'data' / 'processed')
     models_dir = project_root / 'models' / 'trained'
     models_dir.mkdir(parents=True, exist_ok=True)
     
     # Load prepared data
     print(f"\n[1/5] Loading prepared data...")
-    if not data_file.exists():
-        print(f"❌ ERROR: Data file not found: {data_file}")
+    if data_file is None:
+        print(f"❌ ERROR: Prepared data not found in {project_root / 'data' / 'processed'}")
         print(f"   Run data preparation first: python src/data/prepare_data.py")
         return False
     
-    df = pd.read_csv(data_file)
-    print(f"✓ Loaded {len(df):,} samples with {df.shape[1]} columns")
+    # Load the target and numeric feature columns only
+    matrix = None
+    if use_matrix:
+        from src.data.feature_matrix import open_feature_matrix
+        matrix = open_feature_matrix(data_file=data_file)
+    data = load_training_data(data_file, horizon, matrix)
+    df, target_col = data.df, data.target_col
+    print(f"✓ Loaded {len(df):,} samples with {df.shape[1]} columns from {data.source}")
+    print(f"✓ Load: {data.load_s:.2f}s, {data.bytes_read / 1e6:.1f} MB read, "
+          f"{data.memory_bytes / 1e6:.1f} MB in memory")
     
     # Prepare features and target
     print(f"\n[2/5] Preparing features and target...")
     
     # Check for target variable (support both naming conventions)
-    target_col = None
-    if 'Warning_Level_7d_Ahead' in df.columns:
-        target_col = 'Warning_Level_7d_Ahead'
-    elif 'Warning_Level' in df.columns:
-        target_col = 'Warning_Level'
-    else:
-        print(f"❌ ERROR: No target variable found (expecting 'Warning_Level' or 'Warning_Level_7d_Ahead')")
+    if target_col is None:
+        print(f"❌ ERROR: No target variable found (expecting one of {target_columns(horizon)})")
         return False
     
     print(f"✓ Using target variable: {target_col}")
     
     # Select numeric features only and drop unwanted columns
-    non_feature_cols = [target_col, 'Province/State', 'Country/Region', 'Date', 
-                        'Lat', 'Long', 'NPI_Phase', 'Vaccine_Period']
+    non_feature_cols = [target_col] + NON_FEATURE_COLUMNS
     
     feature_cols = [col for col in df.columns if col not in non_feature_cols]
     
     # Drop rows with missing target
-    df_clean = df.dropna(subset=[target_col]).copy()
+    df_clean = df.dropna(subset=[target_col])
     print(f"✓ Removed {len(df) - len(df_clean):,} rows with missing target")
     
     X = df_clean[feature_cols].select_dtypes(include=[np.number])
@@ -75,33 +311,81 @@ def train_warning_system():
     for level, count in y.value_counts().sort_index().items():
         print(f"    • {level}: {count:,} samples ({count/len(y)*100:.1f}%)")
     
-    # Split data
-    print(f"\n[3/5] Splitting data (80% train, 20% test)...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    print(f"✓ Training set: {len(X_train):,} samples")
-    print(f"✓ Test set: {len(X_test):,} samples")
+    # Row dates, for the trees' training date ranges
+    all_dates = np.asarray(matrix.dates) if matrix is not None else read_row_dates(data_file)
+    all_dates = all_dates.astype('datetime64[D]')
+    
+    model_file = artifact_file(models_dir, 'best_covid_warning_model.pkl', horizon)
+    if incremental:
+        if model_file.exists():
+            artifact = joblib.load(model_file)
+            if artifact['feature_names'] == list(X.columns):
+                return refresh_warning_system(artifact, model_file, X, y, all_dates[df_clean.index.to_numpy()],
+                                              horizon, max_trees=max_trees, compare_full=compare_full)
+            print("⚠ Saved model uses other features; training from scratch")
+        else:
+            print("⚠ No trained model to refresh; training from scratch")
+    
+    # Split data by time: the latest HOLDOUT_DAYS are the test set, behind a
+    # purge gap of one horizon (a random split would train on future days)
+    from src.models.backtest import rolling_origin_folds
+    
+    print(f"\n[3/5] Splitting data (last {HOLDOUT_DAYS} days test, {horizon}-day purge gap)...")
+    row_dates = all_dates[df_clean.index.to_numpy()]
+    holdout = next(iter(rolling_origin_folds(row_dates, 1, HOLDOUT_DAYS, horizon)), None)
+    if holdout is None:
+        print(f"❌ ERROR: Not enough dates for a {HOLDOUT_DAYS}-day holdout after a {horizon}-day gap")
+        return False
+    train_mask = row_dates <= holdout.train_end
+    test_mask = row_dates >= holdout.test_start
+    X_train, X_test, y_train, y_test = X[train_mask], X[test_mask], y[train_mask], y[test_mask]
+    evaluation = {
+        'method': 'time_holdout',
+        'train_end': str(holdout.train_end),
+        'test_start': str(holdout.test_start),
+        'test_end': str(holdout.test_end),
+        'purge_days': horizon,
+    }
+    print(f"✓ Training set: {len(X_train):,} samples (to {holdout.train_end})")
+    print(f"✓ Test set: {len(X_test):,} samples ({holdout.test_start} to {holdout.test_end})")
+    
+    # Fold, validation and tuning rows all share one read-only matrix
+    inputs = None
+    if backtest_folds or tune_candidates:
+        from src.models.backtest import frame_inputs, matrix_inputs
+        if matrix is not None:
+            inputs = matrix_inputs(matrix, list(X.columns), target_col)
+        else:
+            inputs = frame_inputs(df, list(X.columns), target_col, read_row_dates(data_file))
+    
+    model_params = MODEL_PARAMS
+    tuning = None
+    if tune_candidates:
+        from src.models.tuning import successive_halving
+        
+        print(f"\n[TUNING] Successive halving over {tune_candidates} configurations "
+              f"({tune_resource} budget, critical recall objective)...")
+        log_file = artifact_file(models_dir, 'tuning_log.jsonl', horizon)
+        result = successive_halving(inputs, MODEL_PARAMS, n_candidates=tune_candidates,
+                                    resource=tune_resource, purge_days=horizon,
+                                    log_file=log_file, n_jobs=backtest_jobs)
+        model_params, tuning = result.best_params, result.summary
+        tuning['log_file'] = log_file.name
+        print(f"✓ Best: {model_params}")
+        print(f"✓ Validation: " + ", ".join(f"{k} {v*100:.1f}%" for k, v in result.best_metrics.items()))
+        print(f"✓ {tuning['evaluations']} evaluations ({tuning['from_log']} from log) "
+              f"in {tuning['wall_s']:.1f}s")
     
     # Train model
     print(f"\n[4/5] Training Random Forest Classifier...")
-    print(f"  - n_estimators: 100")
-    print(f"  - max_depth: 10")
-    print(f"  - min_samples_split: 5")
-    print(f"  - class_weight: balanced")
-    
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        class_weight='balanced',
-        random_state=42,
-        n_jobs=-1,
-        verbose=0
-    )
+    for name in ['n_estimators', 'max_depth', 'min_samples_split', 'min_samples_leaf', 'class_weight']:
+        print(f"  - {name}: {model_params[name]}")
+    
+    model = RandomForestClassifier(**model_params, n_jobs=-1, verbose=0)
     
     model.fit(X_train, y_train)
+    train_dates = all_dates[X_train.index.to_numpy()]
+    train_range = [str(train_dates.min()), str(train_dates.max())]
     print(f"✓ Model training complete!")
     
     # Evaluate model
@@ -146,6 +430,20 @@ def train_warning_system():
     for idx, row in feature_importance.head(5).iterrows():
         print(f"    {row['Feature']}: {row['Importance']*100:.1f}%")
     
+    backtest = None
+    if backtest_folds:
+        from src.models.backtest import run_backtest
+        
+        print(f"\n[BACKTEST] Rolling-origin backtest ({backtest_folds} folds, {horizon}-day purge gap)...")
+        folds_df, backtest = run_backtest(inputs, model_params, n_folds=backtest_folds,
+                                          purge_days=horizon, n_jobs=backtest_jobs)
+        for fold in backtest['folds']:
+            print(f"    Fold {fold['fold']}: train to {fold['train_end']}, test {fold['test_start']}"
+                  f" - {fold['test_end']}  |  Accuracy: {fold['accuracy']*100:.1f}%"
+                  f"  |  Macro recall: {fold['macro_recall']*100:.1f}%  |  Fit: {fold['fit_s']:.1f}s")
+        print(f"✓ Mean accuracy: {backtest['mean_accuracy']*100:.2f}% over {backtest['n_folds']} folds "
+              f"({backtest['wall_s']:.1f}s on {backtest['workers']} worker(s))")
+    
     # Save model
     print(f"\n[SAVING] Saving model artifacts...")
     
@@ -157,35 +455,50 @@ def train_warning_system():
         'metadata': {
             'train_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'accuracy': float(accuracy),
+            'evaluation': evaluation,
             'n_train_samples': len(X_train),
             'n_test_samples': len(X_test),
             'n_features': X.shape[1],
+            'horizon_days': horizon,
+            'target_column': target_col,
+            'load': {'source': data.source, 'load_s': data.load_s, 'bytes_read': data.bytes_read,
+                     'memory_bytes': data.memory_bytes},
             'model_type': 'RandomForestClassifier',
-            'model_params': model.get_params()
+            'model_params': model.get_params(),
+            'backtest': backtest,
+            'tuning': tuning,
+            'tree_date_ranges': [train_range] * len(model.estimators_),
+            'refreshes': []
         }
     }
     
-    model_file = models_dir / 'best_covid_warning_model.pkl'
     joblib.dump(model_artifact, model_file)
     print(f"✓ Model saved: {model_file}")
+    export_predictor(model, model_artifact['feature_names'], model_file, horizon)
     
     # 2. Save metadata separately
-    metadata_file = models_dir / 'model_metadata.pkl'
+    metadata_file = artifact_file(models_dir, 'model_metadata.pkl', horizon)
     joblib.dump(model_artifact['metadata'], metadata_file)
     print(f"✓ Metadata saved: {metadata_file}")
     
     # 3. Save per-class performance
     per_class_df = pd.DataFrame(per_class_data)
-    per_class_file = models_dir / 'per_class_performance.csv'
+    per_class_file = artifact_file(models_dir, 'per_class_performance.csv', horizon)
     per_class_df.to_csv(per_class_file, index=False)
     print(f"✓ Per-class metrics saved: {per_class_file}")
     
+    # 4. Save per-fold backtest metrics
+    if backtest is not None:
+        backtest_file = artifact_file(models_dir, 'backtest_folds.csv', horizon)
+        folds_df.to_csv(backtest_file, index=False)
+        print(f"✓ Backtest folds saved: {backtest_file}")
+    
     # Final summary
     print("\n" + "="*80)
     print("MODEL TRAINING COMPLETE! ✅")
     print("="*80)
     print(f"\nModel Performance Summary:")
-    print(f"  • Overall Accuracy: {accuracy*100:.2f}%")
+    print(f"  • Overall Accuracy: {accuracy*100:.2f}% (last {HOLDOUT_DAYS} days, trained on earlier dates)")
     print(f"  • Training Samples: {len(X_train):,}")
     print(f"  • Test Samples: {len(X_test):,}")
     print(f"  • Features Used: {X.shape[1]}")
@@ -194,5 +507,67 @@ def train_warning_system():
     
     return True
 
+def export_predictor(model, feature_names, model_file, horizon=DEFAULT_HORIZON):
+    """Write the flat-array forest the app and batch scoring load (see flat_forest.py)."""
+    from src.models.flat_forest import export_flat_forest
+    
+    flat_file = export_flat_forest(model, feature_names,
+                                   artifact_file(model_file.parent, 'flat_forest.npz', horizon))
+    print(f"✓ Flat predictor saved: {flat_file} ({flat_file.stat().st_size / 1e6:.1f} MB, "
+          f"pickle {model_file.stat().st_size / 1e6:.1f} MB)")
+
+def refresh_warning_system(artifact, model_file, X, y, dates, horizon=DEFAULT_HORIZON, max_trees=None,
+                           compare_full=False):
+    """
+    Incremental mode of train_warning_system: warm-start new trees on the
+    latest rows, optionally retire old ones, and save the artifacts.
+    """
+    from src.models.warm_start import NEW_TREES, WINDOW_DAYS, add_recent_trees, compare_with_full_retrain
+    
+    model = artifact['model']
+    metadata = dict(artifact['metadata'])
+    # Models trained before per-tree tracking have unknown ranges
+    tree_ranges = metadata.get('tree_date_ranges') or [None] * len(model.estimators_)
+    
+    comparison = None
+    if compare_full:
+        print(f"\n[COMPARE] Incremental refresh vs full retrain on a holdout...")
+        params = {**model.get_params(), 'warm_start': False}
+        comparison = compare_with_full_retrain(model, tree_ranges, X, y, dates, params,
+                                               max_trees=max_trees, purge_days=horizon)
+        for name in ['incremental', 'full']:
+            result = comparison[name]
+            critical = result['recall_CRITICAL_LOCKDOWN']
+            print(f"    {name:>11}: Accuracy {result['accuracy']*100:.1f}%  |  Critical recall "
+                  f"{'-' if critical is None else f'{critical*100:.1f}%'}  |  Fit {result['fit_s']:.1f}s"
+                  f"  |  {result['n_trees']} trees")
+    
+    print(f"\n[REFRESH] Adding {NEW_TREES} trees fitted on the latest {WINDOW_DAYS} days...")
+    model, tree_ranges, info = add_recent_trees(model, tree_ranges, X, y, dates, max_trees=max_trees)
+    info['comparison'] = comparison
+    print(f"✓ Window {info['window'][0]} to {info['window'][1]}: {info['window_rows']:,} rows, "
+          f"{info['fit_s']:.1f}s")
+    print(f"✓ Forest: {info['n_trees']} trees ({info['trees_retired']} retired)")
+    
+    metadata.update({
+        'train_date': info['refresh_date'],
+        'tree_date_ranges': tree_ranges,
+        'refreshes': list(metadata.get('refreshes', [])) + [info],
+    })
+    artifact = {**artifact, 'model': model, 'metadata': metadata}
+    joblib.dump(artifact, model_file)
+    print(f"✓ Model saved: {model_file}")
+    export_predictor(model, artifact['feature_names'], model_file, horizon)
+    metadata_file = artifact_file(model_file.parent, 'model_metadata.pkl', horizon)
+    joblib.dump(metadata, metadata_file)
+    print(f"✓ Metadata saved: {metadata_file}")
+    return True
+
 if __name__ == '__main__':
-    train_warning_system()
+    folds = int(sys.argv[sys.argv.index('--backtest') + 1]) if '--backtest' in sys.argv else None
+    candidates = int(sys.argv[sys.argv.index('--tune') + 1]) if '--tune' in sys.argv else None
+    resource = sys.argv[sys.argv.index('--tune-resource') + 1] if '--tune-resource' in sys.argv else 'rows'
+    max_trees = int(sys.argv[sys.argv.index('--max-trees') + 1]) if '--max-trees' in sys.argv else None
+    train_warning_system(backtest_folds=folds, tune_candidates=candidates, tune_resource=resource,
+                         incremental='--incremental' in sys.argv, max_trees=max_trees,
+                         compare_full='--compare' in sys.argv)
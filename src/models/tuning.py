@@ -0,0 +1,229 @@
+"""
+Hyperparameter Search with Successive Halving
+=============================================
+Samples Random Forest configurations from SEARCH_SPACE and races them on a
+time-based validation window (the last validation_days labelled dates,
+behind a purge gap of one horizon; see backtest.py). Every rung gives the
+survivors factor times more budget and keeps the best 1/factor of them.
+The budget is either:
+- 'rows':  training rows, a fixed random sample that grows each rung
+- 'trees': n_estimators (then removed from the sampled space)
+
+Candidates are ranked by the recall of the critical class (the
+CRITICAL_LOCKDOWN recall the app reports), then macro recall, then
+accuracy. Each rung's candidates run in parallel worker processes that
+share the one read-only feature matrix (see backtest.BacktestInputs).
+
+Every finished evaluation is appended to a JSONL log
+(models/trained/tuning_log.jsonl); a rerun with the same data, space and
+budgets reuses logged results and only trains what is missing, so an
+interrupted search resumes where it stopped. "Same data" is checked by a
+content hash of all labels and dates plus a strided sample of feature rows
+(see data_signature).
+"""
+
+import json
+import hashlib
+import math
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterSampler
+
+from src.data.prepare_data import HORIZON_DAYS, WARNING_LEVELS
+from src.models.backtest import fold_metrics, fold_rows, gather_features, rolling_origin_folds
+
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 300],
+    'max_depth': [6, 10, 14, 20, None],
+    'min_samples_split': [2, 5, 10, 20],
+    'min_samples_leaf': [1, 2, 4, 8],
+    'max_features': ['sqrt', 0.3, 0.5],
+    'class_weight': ['balanced', 'balanced_subsample'],
+}
+N_CANDIDATES = 27
+FACTOR = 3
+RESOURCES = ('rows', 'trees')
+VALIDATION_DAYS = 56
+CRITICAL_CLASS = WARNING_LEVELS[-1]
+MIN_ROWS = 2_000  # smallest row budget worth fitting a forest on
+SIGNATURE_ROWS = 4_096  # feature rows hashed into the data signature
+
+TuningResult = namedtuple('TuningResult', ['best_params', 'best_metrics', 'history', 'summary'])
+
+
+def evaluation_key(params, resource, budget, fold, data_signature):
+    """Stable id of one evaluation, used to find it in the log."""
+    payload = json.dumps([params, resource, budget, str(fold.train_end), str(fold.test_start),
+                          str(fold.test_end), data_signature], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def data_signature(inputs, sample_rows=SIGNATURE_ROWS):
+    """
+    Shape, classes and columns of the inputs plus a SHA-1 of every label and
+    date and of sample_rows evenly strided feature rows, so a re-prepared
+    dataset of the same shape does not reuse logged results.
+    """
+    labels = np.ascontiguousarray(inputs.labels)
+    dates = np.ascontiguousarray(inputs.dates, dtype='datetime64[D]')
+    rows = np.unique(np.linspace(0, len(labels) - 1, min(sample_rows, len(labels)), dtype=np.intp))
+    digest = hashlib.sha1(labels.tobytes())
+    digest.update(dates.tobytes())
+    digest.update(np.ascontiguousarray(gather_features(inputs, rows), dtype=np.float32).tobytes())
+    columns = np.asarray(inputs.features).shape[1] if inputs.columns is None else list(inputs.columns)
+    return [len(labels), int((labels >= 0).sum()), inputs.classes, columns, digest.hexdigest()]
+
+
+def read_log(log_file):
+    """Logged evaluations by key; unreadable (half-written) lines are skipped."""
+    logged = {}
+    if log_file is None or not Path(log_file).exists():
+        return logged
+    for line in Path(log_file).read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        logged[record['key']] = record
+    return logged
+
+
+def objective_score(metrics, objective=CRITICAL_CLASS):
+    """Ranking tuple: objective-class recall, then macro recall, then accuracy (NaN ranks last)."""
+    def value(name):
+        v = metrics.get(name)
+        return -1.0 if v is None or np.isnan(v) else v
+    return (value(f'recall_{objective}'), value('macro_recall'), value('accuracy'))
+
+
+def _evaluate(key, params, resource, budget, fold, inputs, seed):
+    """Fit one configuration at one budget on the validation fold; runs in a worker."""
+    start = time.perf_counter()
+    train_rows, test_rows = fold_rows(fold, inputs)
+    params = {**params, 'n_jobs': 1, 'verbose': 0}
+    if resource == 'rows' and budget < len(train_rows):
+        # Nested samples: each rung's rows contain the previous rung's
+        order = np.random.default_rng(seed).permutation(len(train_rows))
+        train_rows = np.sort(train_rows[order[:budget]])
+    elif resource == 'trees':
+        params['n_estimators'] = budget
+
+    model = RandomForestClassifier(**params)
+    model.fit(gather_features(inputs, train_rows), np.asarray(inputs.labels[train_rows]))
+    fit_s = time.perf_counter() - start
+    y_pred = model.predict(gather_features(inputs, test_rows))
+    return {
+        'key': key,
+        'n_train': len(train_rows),
+        'n_test': len(test_rows),
+        **fold_metrics(np.asarray(inputs.labels[test_rows]), y_pred, inputs.classes),
+        'fit_s': fit_s,
+    }
+
+
+def successive_halving(inputs, base_params, space=SEARCH_SPACE, n_candidates=N_CANDIDATES,
+                       factor=FACTOR, resource='rows', min_budget=None, max_budget=None,
+                       validation_days=VALIDATION_DAYS, purge_days=HORIZON_DAYS,
+                       objective=CRITICAL_CLASS, log_file=None, n_jobs=-1, seed=42):
+    """
+    Search Random Forest hyperparameters.
+
+    Args:
+        inputs: BacktestInputs shared by all evaluations
+        base_params: Parameters the sampled ones override (e.g. MODEL_PARAMS)
+        space: {parameter: list of values} to sample from
+        n_candidates: Configurations in the first rung
+        factor: Budget growth and elimination rate per rung
+        resource: 'rows' or 'trees'
+        min_budget, max_budget: First and last rung budget (default: all
+            training rows or the largest n_estimators, divided by
+            factor per rung)
+        validation_days, purge_days: Validation window and gap before it
+        objective: Class whose recall ranks candidates first
+        log_file: JSONL results log to append to and resume from
+        n_jobs: Worker processes (joblib; -1 = all cores)
+        seed: Seeds candidate sampling and row samples
+
+    Returns:
+        TuningResult(best_params, best_metrics, history DataFrame with one
+        row per evaluation, summary dict for the model metadata)
+    """
+    if resource not in RESOURCES:
+        raise ValueError(f"resource must be one of {RESOURCES}, got {resource!r}")
+    labelled = np.asarray(inputs.labels) >= 0
+    folds = rolling_origin_folds(np.asarray(inputs.dates)[labelled], 1, validation_days, purge_days)
+    if not folds:
+        raise ValueError(f"Not enough dates for a {validation_days}-day validation window")
+    fold = folds[0]
+    n_train = len(fold_rows(fold, inputs)[0])
+
+    space = dict(space)
+    if resource == 'trees':
+        max_budget = max_budget or max(space.pop('n_estimators', [base_params.get('n_estimators', 100)]))
+    else:
+        max_budget = min(max_budget or n_train, n_train)
+    candidates = list(ParameterSampler(space, n_candidates, random_state=seed))
+    n_rungs = 1
+    while factor ** n_rungs <= len(candidates):
+        n_rungs += 1
+    min_budget = min_budget or max(max_budget // factor ** (n_rungs - 1),
+                                   1 if resource == 'trees' else min(MIN_ROWS, max_budget))
+    signature = data_signature(inputs)
+
+    logged = read_log(log_file)
+    start = time.perf_counter()
+    history, survivors, reused = [], list(range(len(candidates))), 0
+    for rung in range(n_rungs):
+        budget = max_budget if rung == n_rungs - 1 else min(min_budget * factor ** rung, max_budget)
+        jobs = {}
+        for c in survivors:
+            params = {**base_params, **candidates[c]}
+            jobs[evaluation_key(params, resource, budget, fold, signature)] = (c, params)
+        pending = [key for key in jobs if key not in logged]
+        reused += len(jobs) - len(pending)
+        print(f"  Rung {rung}: {len(survivors)} candidate(s), {resource} budget {budget:,}"
+              f" ({len(jobs) - len(pending)} from log)")
+
+        # Log each result as it finishes, so an interrupted rung resumes
+        results = Parallel(n_jobs=n_jobs, mmap_mode='r', return_as='generator_unordered')(
+            delayed(_evaluate)(key, jobs[key][1], resource, budget, fold, inputs, seed) for key in pending
+        )
+        for result in results:
+            record = {**result, 'rung': rung, 'resource': resource, 'budget': budget,
+                      'params': jobs[result['key']][1]}
+            logged[result['key']] = record
+            if log_file is not None:
+                with open(log_file, 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+        scored = sorted(jobs, key=lambda key: objective_score(logged[key], objective), reverse=True)
+        for rank, key in enumerate(scored):
+            history.append({**logged[key], 'rung': rung, 'candidate': jobs[key][0], 'rank': rank})
+        survivors = [jobs[key][0] for key in scored[:max(1, math.ceil(len(scored) / factor))]]
+
+    best = history[-len(jobs)]  # rank 0 of the last rung
+    best_params = dict(best['params'])
+    if resource == 'trees':
+        best_params['n_estimators'] = best['budget']
+    history_df = pd.DataFrame(history).drop(columns=['params'])
+    summary = {
+        'resource': resource,
+        'objective': f'recall_{objective}',
+        'n_candidates': len(candidates),
+        'factor': factor,
+        'budgets': sorted(history_df['budget'].unique().tolist()),
+        'validation': [str(fold.test_start), str(fold.test_end)],
+        'evaluations': len(history),
+        'from_log': reused,
+        'wall_s': time.perf_counter() - start,
+        'best_params': best_params,
+        'best_metrics': {k: v for k, v in best.items()
+                         if k in ('accuracy', 'macro_recall') or k.startswith('recall_')},
+    }
+    return TuningResult(best_params, summary['best_metrics'], history_df, summary)
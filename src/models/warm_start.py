@@ -0,0 +1,153 @@
+"""
+Warm-Start Model Refresh
+========================
+Daily refresh of the trained forest without refitting it from scratch:
+the saved best_covid_warning_model.pkl gets new_trees more trees fitted on
+the latest window_days of labelled rows (scikit-learn warm_start), and
+with max_trees set the oldest trees are retired so the forest stays
+bounded.
+
+Warm start only adds trees; the existing ones keep their class order, so
+every new tree must see every class. When the recent window misses a
+class it is widened back by window_days at a time until it holds all of
+them.
+
+The metadata records the date range each tree was trained on
+('tree_date_ranges', aligned with model.estimators_) and one entry per
+refresh under 'refreshes'.
+
+compare_with_full_retrain() checks the refresh on a holdout of the last
+holdout_days: the refreshed model and a full retrain, both fitted only on
+rows before the holdout (minus a horizon purge gap), are scored on it.
+"""
+
+import copy
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.data.prepare_data import HORIZON_DAYS, WARNING_LEVELS
+
+NEW_TREES = 20
+WINDOW_DAYS = 28
+HOLDOUT_DAYS = 28
+CRITICAL_CLASS = WARNING_LEVELS[-1]
+
+
+def _day(date):
+    return str(np.datetime64(date, 'D'))
+
+
+def recent_window(y, dates, end_date, window_days, classes):
+    """Rows of the window_days up to end_date, widened back until every class is present."""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    end_date = np.datetime64(end_date, 'D')
+    classes = set(classes)
+    start = end_date - np.timedelta64(window_days - 1, 'D')
+    while True:
+        rows = np.flatnonzero((dates >= start) & (dates <= end_date))
+        if classes <= set(np.unique(np.asarray(y)[rows])):
+            return rows, start
+        if start <= dates.min():
+            raise ValueError(f"Rows up to {end_date} do not hold every class the model knows: {sorted(classes)}")
+        start -= np.timedelta64(window_days, 'D')
+
+
+def add_recent_trees(model, tree_ranges, X, y, dates, end_date=None, new_trees=NEW_TREES,
+                     window_days=WINDOW_DAYS, max_trees=None):
+    """
+    Warm-start new trees on a recent window and retire the oldest ones.
+
+    Args:
+        model: Fitted RandomForestClassifier (changed in place)
+        tree_ranges: [start, end] training dates per existing tree (None
+            entries when unknown); returned extended, not changed in place
+        X, y, dates: Training rows with their dates
+        end_date: Last date to train on (default: last date in dates)
+        new_trees: Trees to add
+        window_days: Length of the recent window
+        max_trees: Keep at most this many trees, dropping the oldest
+
+    Returns:
+        (model, tree_ranges, info dict for the metadata)
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    end_date = np.datetime64(end_date if end_date is not None else dates.max(), 'D')
+    rows, start = recent_window(y, dates, end_date, window_days, model.classes_)
+
+    start_time = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+    with warnings.catch_warnings():
+        # 'balanced' weights come from the window, which is what a refresh wants
+        warnings.filterwarnings('ignore', message='class_weight presets')
+        model.fit(X.iloc[rows], np.asarray(y)[rows])
+    model.set_params(warm_start=False)
+    fit_s = time.perf_counter() - start_time
+
+    tree_ranges = list(tree_ranges) + [[_day(start), _day(end_date)]] * new_trees
+    retired = 0
+    if max_trees and len(model.estimators_) > max_trees:
+        retired = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[retired:]
+        model.n_estimators = len(model.estimators_)
+        tree_ranges = tree_ranges[retired:]
+
+    info = {
+        'refresh_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'window': [_day(start), _day(end_date)],
+        'window_rows': len(rows),
+        'trees_added': new_trees,
+        'trees_retired': retired,
+        'n_trees': len(model.estimators_),
+        'fit_s': fit_s,
+    }
+    return model, tree_ranges, info
+
+
+def holdout_metrics(model, X, y):
+    """Accuracy and critical-class recall of a model on holdout rows."""
+    y = np.asarray(y)
+    y_pred = model.predict(X)
+    critical = y == CRITICAL_CLASS
+    return {
+        'accuracy': float((y_pred == y).mean()),
+        f'recall_{CRITICAL_CLASS}': float((y_pred[critical] == CRITICAL_CLASS).mean()) if critical.any() else None,
+    }
+
+
+def compare_with_full_retrain(model, tree_ranges, X, y, dates, model_params, new_trees=NEW_TREES,
+                              window_days=WINDOW_DAYS, max_trees=None, holdout_days=HOLDOUT_DAYS,
+                              purge_days=HORIZON_DAYS):
+    """
+    Refresh a copy of model and fit a full retrain on the rows before the
+    holdout, then score both on the last holdout_days.
+
+    Returns:
+        dict with the holdout range and each model's metrics and fit time
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    holdout_start = dates.max() - np.timedelta64(holdout_days - 1, 'D')
+    cutoff = holdout_start - np.timedelta64(purge_days + 1, 'D')
+    holdout = np.flatnonzero(dates >= holdout_start)
+    before = np.flatnonzero(dates <= cutoff)
+
+    comparison = {'holdout': [_day(holdout_start), _day(dates.max())], 'holdout_rows': len(holdout)}
+    seen = [r for r in tree_ranges if r is not None and np.datetime64(r[1], 'D') >= holdout_start]
+    if seen:
+        print(f"⚠ {len(seen)} existing tree(s) were trained on holdout dates; "
+              f"the refreshed model's holdout scores are optimistic")
+    comparison['base_trees_seen_holdout'] = len(seen)
+
+    refreshed, _, info = add_recent_trees(copy.deepcopy(model), tree_ranges, X, y, dates, cutoff,
+                                          new_trees, window_days, max_trees)
+    comparison['incremental'] = {**holdout_metrics(refreshed, X.iloc[holdout], np.asarray(y)[holdout]),
+                                 'fit_s': info['fit_s'], 'n_trees': info['n_trees']}
+
+    start_time = time.perf_counter()
+    full = RandomForestClassifier(**model_params).fit(X.iloc[before], np.asarray(y)[before])
+    comparison['full'] = {**holdout_metrics(full, X.iloc[holdout], np.asarray(y)[holdout]),
+                          'fit_s': time.perf_counter() - start_time, 'n_trees': len(full.estimators_)}
+    return comparison
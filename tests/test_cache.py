@@ -0,0 +1,94 @@
+"""
+Unit Tests for the Prepared-Data Cache
+======================================
+Checks fingerprint sensitivity, the store/load round trip and eviction.
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+import re
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.cache import (
+    SOURCE_FILES,
+    prepared_data_fingerprint,
+    load_cached,
+    store_cached,
+    evict_stale,
+)
+from src.data.prepare_data import WARNING_LEVELS
+
+
+class TestPreparedDataCache(unittest.TestCase):
+    """Test cases for the content-addressed cache"""
+
+    def setUp(self):
+        """Write two small raw files into a temporary directory"""
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_files = [self.tmp_dir / 'confirmed.csv', self.tmp_dir / 'deaths.csv']
+        for i, raw_file in enumerate(self.raw_files):
+            raw_file.write_text(f'Province/State,Country/Region,Lat,Long,1/22/20\n,Italy,41.9,12.6,{i}\n')
+        self.cache_dir = self.tmp_dir / 'cache'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fingerprint_tracks_inputs(self):
+        """Test that the fingerprint changes only when an input changes"""
+        base = prepared_data_fingerprint(self.raw_files, engine='pandas')
+
+        self.assertEqual(prepared_data_fingerprint(self.raw_files, engine='pandas'), base)
+        self.assertNotEqual(prepared_data_fingerprint(self.raw_files, engine='cube'), base)
+
+        self.raw_files[1].write_text('changed\n')
+        self.assertNotEqual(prepared_data_fingerprint(self.raw_files, engine='pandas'), base)
+
+    def test_fingerprint_covers_pipeline_modules(self):
+        """Test that every data module the preparation pipeline uses is fingerprinted"""
+        data_dir = Path(__file__).parent.parent / 'src' / 'data'
+        used = set(re.findall(r'from src\.data\.(\w+) import', (data_dir / 'prepare_data.py').read_text()))
+        # Reporting, caching and exports that do not change the prepared frame
+        used -= {'profiling', 'cache', 'feature_matrix'}
+        self.assertLessEqual({f'{name}.py' for name in used}, set(SOURCE_FILES))
+        for name in SOURCE_FILES:
+            self.assertTrue((data_dir / name).exists(), name)
+
+    def test_round_trip_keeps_dtypes(self):
+        """Test that a cached frame loads back with the same dtypes"""
+        df = pd.DataFrame({
+            'Country/Region': pd.Categorical(['Italy', 'Canada']),
+            'Date': pd.to_datetime(['2020-01-22', '2020-01-23']).astype('datetime64[ns]'),
+            'Lat': np.array([41.9, 50.0], dtype=np.float32),
+            'Warning_Level_7d_Ahead': pd.Categorical(['LOW_MONITORING', np.nan],
+                                                     categories=WARNING_LEVELS),
+        })
+        self.assertIsNone(load_cached('abc', self.cache_dir))
+
+        store_cached(df, 'abc', self.cache_dir)
+        pd.testing.assert_frame_equal(load_cached('abc', self.cache_dir), df)
+
+    def test_evicts_least_recently_used(self):
+        """Test that only the most recently used entries are kept"""
+        df = pd.DataFrame({'x': [1]})
+        for i, name in enumerate(['a', 'b', 'c']):
+            path = store_cached(df, name, self.cache_dir, max_entries=5)
+            os.utime(path, (1000 + i, 1000 + i))
+        os.utime(self.cache_dir / 'a.parquet', (2000, 2000))  # 'a' used last
+
+        removed = evict_stale(self.cache_dir, max_entries=2)
+
+        self.assertEqual([path.name for path in removed], ['b.parquet'])
+        self.assertEqual(sorted(path.name for path in self.cache_dir.glob('*.parquet')),
+                         ['a.parquet', 'c.parquet'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit Tests for the Dense Cube Preparation Engine
+================================================
+Checks that the (location, date, metric) engine reproduces the
+long-format engine on small wide JHU-shaped tables.
+"""
+
+import unittest
+import contextlib
+import io
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import prepare_long_format
+from src.data.cube_engine import build_location_cube, prepare_from_cube, METRICS
+
+
+def make_wide_table(locations, n_days, seed, scale):
+    """Build a wide JHU-shaped table with noisy cumulative counts."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-22', periods=n_days, freq='D').strftime('%-m/%-d/%y')
+    daily = rng.poisson(scale, size=(len(locations), n_days)).astype(float)
+    daily[:, ::9] *= 4  # occasional spikes for outlier capping
+    values = daily.cumsum(axis=1)
+    values[:, 20] -= 3  # a cumulative correction
+    table = pd.DataFrame(values, columns=dates)
+    meta = pd.DataFrame(locations, columns=['Province/State', 'Country/Region', 'Lat', 'Long'])
+    return pd.concat([meta, table], axis=1)
+
+
+class TestCubeEngine(unittest.TestCase):
+    """Test cases for the dense cube engine"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Build small confirmed/deaths/recovered tables"""
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', np.nan, np.nan),
+            (np.nan, 'Atlantis', 10.0, 10.0),
+        ]
+        cls.confirmed = make_wide_table(locations, 60, seed=1, scale=80)
+        cls.deaths = make_wide_table(locations, 60, seed=2, scale=12)
+        cls.recovered = make_wide_table(locations[:3], 60, seed=3, scale=40)
+    
+    def test_cube_alignment(self):
+        """Test cube shape, location order and missing-location fill"""
+        cube, locations, dates = build_location_cube(self.confirmed, self.deaths, self.recovered)
+        
+        self.assertEqual(cube.shape, (4, 60, len(METRICS)))
+        self.assertEqual(list(locations['Country/Region']),
+                         ['Atlantis', 'Canada', 'Canada', 'Italy'])
+        self.assertEqual(len(dates), 60)
+        # Atlantis is missing from the recovered table
+        self.assertTrue((cube[0, :, METRICS.index('Recovered')] == 0).all())
+        np.testing.assert_array_equal(cube[3, :, 0], self.confirmed.iloc[0, 4:].to_numpy(float))
+    
+    def test_matches_long_format_engine(self):
+        """Test that both engines produce the same prepared frame"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered)
+            result = prepare_from_cube(self.confirmed, self.deaths, self.recovered)
+        
+        self.assertEqual(list(result.columns), list(expected.columns))
+        self.assertEqual(len(result), len(expected))
+        for col in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[col]):
+                np.testing.assert_allclose(result[col].to_numpy(float), expected[col].to_numpy(float),
+                                           rtol=1e-9, equal_nan=True, err_msg=col)
+            else:
+                self.assertEqual(list(result[col].astype(object).fillna('NA')),
+                                 list(expected[col].astype(object).fillna('NA')), col)
+    
+    def test_days_since_thresholds_match(self):
+        """Test that both engines produce the same Days_Since_<N> columns"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered,
+                                           thresholds=(50, 100, 2000))
+            result = prepare_from_cube(self.confirmed, self.deaths, self.recovered,
+                                       thresholds=(50, 100, 2000))
+        
+        for col in ['Days_Since_50', 'Days_Since_100', 'Days_Since_2000']:
+            np.testing.assert_array_equal(result[col], expected[col], err_msg=col)
+    
+    def test_horizons_match(self):
+        """Test that both engines produce the same multi-horizon targets"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered,
+                                           horizons=(1, 7, 14))
+            result = prepare_from_cube(self.confirmed, self.deaths, self.recovered,
+                                       horizons=(1, 7, 14))
+        
+        self.assertEqual(list(result.columns), list(expected.columns))
+        for horizon in (1, 7, 14):
+            target = f'Warning_Level_{horizon}d_Ahead'
+            self.assertEqual(list(result[target].astype(object).fillna('NA')),
+                             list(expected[target].astype(object).fillna('NA')), target)
+            np.testing.assert_allclose(result[f'CFR_future{horizon}d'], expected[f'CFR_future{horizon}d'],
+                                       rtol=1e-9, equal_nan=True)
+    
+    def test_column_subset_matches(self):
+        """Test that both engines build the same requested columns"""
+        requested = ['IsWeekend', 'Is_Post_Vaccine', 'Warning_Level_7d_Ahead']
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered, columns=requested)
+            result = prepare_from_cube(self.confirmed, self.deaths, self.recovered, columns=requested)
+        
+        self.assertEqual(list(result.columns), list(expected.columns))
+        self.assertNotIn('Vaccine_Period', result.columns)
+        self.assertEqual(list(result['Warning_Level_7d_Ahead'].astype(object).fillna('NA')),
+                         list(expected['Warning_Level_7d_Ahead'].astype(object).fillna('NA')))
+    
+    def test_without_recovered(self):
+        """Test that the recovered table is optional"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = prepare_from_cube(self.confirmed, self.deaths, None)
+        self.assertTrue((df['Recovered'] == 0).all())
+        self.assertIn('Warning_Level_7d_Ahead', df.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
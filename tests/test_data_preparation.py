@@ -5,17 +5,42 @@ Tests data loading, cleaning, and feature engineering functions.
 """
 
 import unittest
+import contextlib
+import io
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import tempfile
 import shutil
 import sys
+from unittest import mock
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.data.prepare_data import load_and_prepare_data
+from src.data.cube_engine import safe_growth_rate as cube_safe_growth_rate
+from src.data.prepare_data import (
+    load_and_prepare_data,
+    assign_warning_level,
+    cap_group_outliers,
+    cap_grouped_outliers,
+    grouped_rolling_mean,
+    grouped_safe_growth_rate,
+    days_since_thresholds,
+    grouped_future_values,
+    safe_growth_rate,
+    assign_npi_phase,
+    assign_npi_phases,
+    assign_vaccine_periods,
+    load_npi_calendars,
+    VACCINE_START,
+    assign_warning_levels,
+    compute_risk_scores,
+    pipeline_columns,
+    prepare_long_format,
+    required_columns,
+    BASE_COLUMNS
+)
 
 
 class TestDataPreparation(unittest.TestCase):
@@ -25,7 +50,7 @@ class TestDataPreparation(unittest.TestCase):
     def setUpClass(cls):
         """Set up test fixtures that are used by all tests"""
         cls.project_root = Path(__file__).parent.parent
-        cls.processed_file = cls.project_root / 'data' / 'processed' / 'covid19_prepared_data.csv'
+        cls.processed_file = cls.project_root / 'data' / 'processed' / 'covid19_prepared_data.parquet'
     
     def test_data_file_exists(self):
         """Test that prepared data file exists after running preparation"""
@@ -129,7 +154,7 @@ class TestDataPreparation(unittest.TestCase):
     
     def test_data_reproducibility(self):
         """Test that running preparation twice gives same results"""
-        df1 = load_and_prepare_data()
+        df1 = load_and_prepare_data(use_cache=False)
         df2 = load_and_prepare_data()
         
         self.assertEqual(len(df1), len(df2), 
@@ -188,5 +213,252 @@ class TestDataQuality(unittest.TestCase):
                                    f"Percentage column '{col}' should be <= 100")
 
 
+
+class TestWarningLevelEngine(unittest.TestCase):
+    """Test cases for the vectorized warning level engine"""
+    
+    def setUp(self):
+        """Build a grid of indicators around every threshold"""
+        growth = [np.nan, -0.5, 0, 0.01, 0.05, 0.06, 0.10, 0.11, 0.20, 0.21, np.inf]
+        cases = [np.nan, 0, 50, 51, 200, 201, 500, 501, 1000, 1001]
+        doubling = [np.nan, -3, 0, 3, 7, 10, 14, 20, 30, 45]
+        cfr = [np.nan, 0, 3, 3.5, 5, 5.5]
+        grid = np.array(np.meshgrid(growth, cases, doubling, cfr)).reshape(4, -1)
+        self.growth, self.cases, self.doubling, self.cfr = grid
+    
+    def test_matches_scalar_labels(self):
+        """Test that bulk labels equal the row-wise scalar labels"""
+        bulk = assign_warning_levels(self.growth, self.cases, self.doubling, self.cfr)
+        scalar = [
+            assign_warning_level(g, c, d, f)
+            for g, c, d, f in zip(self.growth, self.cases, self.doubling, self.cfr)
+        ]
+        
+        self.assertEqual(len(bulk), len(scalar))
+        for got, expected in zip(bulk, scalar):
+            if pd.isna(expected):
+                self.assertTrue(pd.isna(got), "Missing inputs should give a missing label")
+            else:
+                self.assertEqual(got, expected)
+    
+    def test_risk_scores_missing_inputs(self):
+        """Test that any missing indicator gives a NaN risk score"""
+        scores = compute_risk_scores(self.growth, self.cases, self.doubling, self.cfr)
+        missing = (np.isnan(self.growth) | np.isnan(self.cases) |
+                   np.isnan(self.doubling) | np.isnan(self.cfr))
+        
+        np.testing.assert_array_equal(np.isnan(scores), missing)
+        self.assertLessEqual(np.nanmax(scores), 13)
+        self.assertGreaterEqual(np.nanmin(scores), 0)
+    
+    def test_accepts_series(self):
+        """Test that pandas Series inputs are supported"""
+        levels = assign_warning_levels(
+            pd.Series([0.3, 0.0]), pd.Series([2000.0, 10.0]),
+            pd.Series([3.0, 100.0]), pd.Series([6.0, 1.0])
+        )
+        self.assertEqual(list(levels), ['CRITICAL_LOCKDOWN', 'LOW_MONITORING'])
+
+
+
+class TestInterventionPhases(unittest.TestCase):
+    """Test cases for interval-indexed NPI and vaccine period lookup"""
+    
+    def setUp(self):
+        """Daily dates spanning every NPI period plus an out-of-range tail"""
+        self.dates = pd.Series(pd.date_range('2020-01-01', '2023-06-01', freq='D'))
+    
+    def test_matches_scalar_phases(self):
+        """Test that interval lookup equals the scalar assign_npi_phase"""
+        phases = assign_npi_phases(self.dates)
+        expected = [assign_npi_phase(d) for d in self.dates]
+        
+        self.assertIsInstance(phases, pd.Categorical)
+        self.assertEqual(list(phases.astype(str)), expected)
+    
+    def test_repeated_dates_broadcast(self):
+        """Test that long-format (repeated) dates are broadcast correctly"""
+        long_dates = pd.concat([self.dates] * 3, ignore_index=True)
+        phases = assign_npi_phases(long_dates)
+        self.assertEqual(len(phases), len(long_dates))
+        self.assertEqual(list(phases[:len(self.dates)]),
+                         list(phases[-len(self.dates):]))
+    
+    def test_country_calendar_override(self):
+        """Test that per-country calendars only affect their country"""
+        calendars = {
+            'Sweden': {'Advisory': (pd.Timestamp('2020-03-01'), pd.Timestamp('2020-12-31'))}
+        }
+        dates = pd.to_datetime(['2020-04-01', '2020-04-01', '2021-06-01'])
+        phases = assign_npi_phases(dates, countries=['Sweden', 'Italy', 'Sweden'],
+                                   calendars=calendars)
+        self.assertEqual(list(phases.astype(str)),
+                         ['Advisory', 'Lockdown', 'Post-reopening'])
+    
+    def test_load_npi_calendars(self):
+        """Test loading per-country calendars from CSV"""
+        tmp_dir = Path(tempfile.mkdtemp())
+        try:
+            calendar_file = tmp_dir / 'npi_calendars.csv'
+            calendar_file.write_text(
+                "Country/Region,Phase,Start,End\n"
+                "Sweden,Advisory,2020-03-01,2020-12-31\n"
+                "Sweden,Post-advisory,2021-01-01,2023-03-09\n"
+            )
+            calendars = load_npi_calendars(calendar_file)
+        finally:
+            shutil.rmtree(tmp_dir)
+        
+        self.assertEqual(list(calendars), ['Sweden'])
+        self.assertEqual(calendars['Sweden']['Advisory'],
+                         (pd.Timestamp('2020-03-01'), pd.Timestamp('2020-12-31')))
+    
+    def test_vaccine_periods(self):
+        """Test vaccine period assignment against the start date"""
+        periods = assign_vaccine_periods(self.dates)
+        expected = np.where(self.dates >= VACCINE_START, 'Post-vaccine', 'Pre-vaccine')
+        self.assertEqual(list(periods.astype(str)), list(expected))
+
+
+
+class TestGroupedKernels(unittest.TestCase):
+    """Test that grouped kernels match the per-group lambda transforms"""
+    
+    def setUp(self):
+        """Build a small long-format frame with three location groups"""
+        rng = np.random.default_rng(0)
+        n_days = 40
+        groups = [('A', 'All'), ('B', 'North'), ('B', 'South')]
+        self.group_keys = ['Country/Region', 'Province/State']
+        self.df = pd.DataFrame({
+            'Country/Region': np.repeat([g[0] for g in groups], n_days),
+            'Province/State': np.repeat([g[1] for g in groups], n_days),
+            'Daily_Cases': rng.integers(0, 200, size=len(groups) * n_days).astype(float),
+        })
+        self.df.loc[[5, 47, 90], 'Daily_Cases'] = 5000.0
+    
+    def test_outlier_capping(self):
+        """Test grouped quantile clipping"""
+        expected = self.df.groupby(self.group_keys)['Daily_Cases'].transform(
+            lambda s: cap_group_outliers(s, q=0.99)
+        )
+        result = cap_grouped_outliers(self.df, self.group_keys, 'Daily_Cases', q=0.99)
+        np.testing.assert_allclose(result, expected)
+    
+    def test_rolling_mean(self):
+        """Test grouped 7-day rolling mean"""
+        expected = self.df.groupby(self.group_keys)['Daily_Cases'].transform(
+            lambda s: s.rolling(window=7, min_periods=1).mean()
+        )
+        result = grouped_rolling_mean(self.df, self.group_keys, 'Daily_Cases', window=7)
+        np.testing.assert_allclose(result.sort_index(), expected)
+    
+    def test_safe_growth_rate(self):
+        """Test grouped pct_change with threshold masking"""
+        expected = self.df.groupby(self.group_keys)['Daily_Cases'].transform(
+            lambda s: safe_growth_rate(s, threshold=50)
+        )
+        result = grouped_safe_growth_rate(self.df, self.group_keys, 'Daily_Cases', threshold=50)
+        np.testing.assert_allclose(result, expected, equal_nan=True)
+        self.assertTrue(result.groupby(self.df['Province/State']).head(1).isna().all(),
+                        "First row of each group has no previous value")
+    
+    def test_safe_growth_rate_gaps(self):
+        """Test gaps below the threshold under both pct_change fill semantics"""
+        df = pd.DataFrame({
+            'Province/State': ['A'] * 5 + ['B'] * 3,
+            'Country/Region': ['X'] * 8,
+            'Daily_Cases': [60.0, 20.0, np.nan, 80.0, 100.0, 70.0, 140.0, 10.0],
+        })
+        expected = df.groupby(['Province/State', 'Country/Region'])['Daily_Cases'].transform(
+            lambda s: safe_growth_rate(s, threshold=50)
+        )
+        group_keys = ['Province/State', 'Country/Region']
+        result = grouped_safe_growth_rate(df, group_keys, 'Daily_Cases', threshold=50)
+        np.testing.assert_allclose(result, expected, equal_nan=True)
+        
+        # pandas 2 pct_change pads gaps with the last valid value, pandas 3 does not
+        padded = [np.nan, 0.0, 0.0, 80 / 60 - 1, 0.25, np.nan, 1.0, 0.0]
+        gaps = [np.nan, np.nan, np.nan, np.nan, 0.25, np.nan, 1.0, np.nan]
+        cases = df['Daily_Cases'].to_numpy()
+        cube = np.vstack([cases[:5], np.r_[cases[5:], np.nan, np.nan]])  # (location, date)
+        for pads, values in [(True, padded), (False, gaps)]:
+            with mock.patch('src.data.prepare_data.PCT_CHANGE_PADS', pads), \
+                 mock.patch('src.data.cube_engine.PCT_CHANGE_PADS', pads):
+                np.testing.assert_allclose(grouped_safe_growth_rate(df, group_keys, 'Daily_Cases', threshold=50),
+                                           values, equal_nan=True)
+                growth = cube_safe_growth_rate(cube, threshold=50)
+                np.testing.assert_allclose(np.r_[growth[0], growth[1, :3]], values, equal_nan=True)
+    
+    def test_days_since_thresholds(self):
+        """Test Days_Since_<N> for several thresholds against a per-country loop"""
+        df = self.df.copy()
+        df['Date'] = np.tile(pd.date_range('2020-03-01', periods=40), 3)
+        df['Confirmed'] = df.groupby(self.group_keys)['Daily_Cases'].cumsum()
+        
+        result = days_since_thresholds(df, thresholds=(100, 1000, 10**9))
+        
+        self.assertEqual(list(result.columns), ['Days_Since_100', 'Days_Since_1000',
+                                                'Days_Since_1000000000'])
+        for threshold in (100, 1000):
+            for country, group in df.groupby('Country/Region'):
+                first_date = group.loc[group['Confirmed'] >= threshold, 'Date'].min()
+                expected = (group['Date'] - first_date).dt.days
+                np.testing.assert_array_equal(result.loc[group.index, f'Days_Since_{threshold}'],
+                                              expected)
+        self.assertTrue(result['Days_Since_1000000000'].isna().all(), "Never reached -> NaN")
+    
+    def test_grouped_future_values(self):
+        """Test several horizons from one grouping against per-horizon grouped shifts"""
+        df = self.df.copy()
+        df['Growth'] = df['Daily_Cases'] / 100
+        
+        result = grouped_future_values(df, self.group_keys, ['Daily_Cases', 'Growth'], [1, 7, 40])
+        
+        for horizon in [1, 7, 40]:
+            expected = df.groupby(self.group_keys)[['Daily_Cases', 'Growth']].shift(-horizon)
+            np.testing.assert_array_equal(result[horizon], expected.to_numpy(), err_msg=str(horizon))
+        self.assertTrue(np.isnan(result[40]).all(), "Horizon beyond each group -> NaN")
+        with self.assertRaises(ValueError):
+            grouped_future_values(df, self.group_keys, ['Growth'], [0])
+
+
+class TestFeatureRegistry(unittest.TestCase):
+    """Test that requested columns compute only their declared inputs"""
+    
+    def test_required_columns(self):
+        """Test transitive closure, output order and unknown columns"""
+        self.assertEqual(required_columns(['IsWeekend']), BASE_COLUMNS + ['DayOfWeek', 'IsWeekend'])
+        
+        target = required_columns(['Warning_Level_14d_Ahead'], horizons=(7, 14))
+        for col in ['Daily_Cases', 'Growth_Rate', 'Doubling_Time', 'CFR', 'Population',
+                    'Cases_per_100k', 'CFR_future14d']:
+            self.assertIn(col, target)
+        for col in ['CFR_future7d', 'Warning_Level_7d_Ahead', 'NPI_Phase', 'Deaths_7d_MA']:
+            self.assertNotIn(col, target)
+        self.assertEqual(target, [col for col in pipeline_columns(horizons=(7, 14)) if col in target])
+        
+        with self.assertRaises(ValueError):
+            required_columns(['Days_Since_500'])
+        with self.assertRaises(ValueError):
+            required_columns(['Warning_Level_14d_Ahead'])
+    
+    def test_lazy_run_matches_full_run(self):
+        """Test that a column subset equals the same columns of a full run"""
+        from tests.test_cube_engine import make_wide_table
+        locations = [(np.nan, 'Italy', 41.87, 12.56), ('North', 'Canada', 50.0, np.nan)]
+        tables = [make_wide_table(locations, 50, seed=s, scale=c) for s, c in [(1, 80), (2, 12), (3, 40)]]
+        requested = ['Is_Lockdown', 'Log_Deaths', 'Days_Since_100', 'Warning_Level_7d_Ahead']
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = prepare_long_format(*[t.copy() for t in tables])
+            lazy = prepare_long_format(*tables, columns=requested)
+        
+        self.assertEqual(list(full.columns), pipeline_columns())
+        self.assertEqual(list(lazy.columns), required_columns(requested))
+        self.assertNotIn('NPI_Phase', lazy.columns, "Is_Lockdown does not materialize NPI_Phase")
+        pd.testing.assert_frame_equal(lazy, full[lazy.columns])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit Tests for the Memory-Mapped Feature Matrix
+===============================================
+Checks export/open round trips, staleness detection, training columns and
+chunked scoring against the DataFrame paths.
+"""
+
+import unittest
+import contextlib
+import io
+import os
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sklearn.ensemble import RandomForestClassifier
+from src.data.prepare_data import prepare_long_format
+from src.data.feature_matrix import export_feature_matrix, open_feature_matrix, matrix_row_index
+from src.models.train_model import read_matrix_columns, read_training_columns
+from src.models.predict_model import score_matrix
+from tests.test_cube_engine import make_wide_table
+
+
+class TestFeatureMatrix(unittest.TestCase):
+    """Test cases for the feature matrix export"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Prepare a small frame with 7- and 14-day targets"""
+        locations = [(np.nan, 'Italy', 41.87, 12.56), ('North', 'Canada', 50.0, -100.0)]
+        confirmed = make_wide_table(locations, 60, seed=1, scale=80)
+        deaths = make_wide_table(locations, 60, seed=2, scale=12)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.df = prepare_long_format(confirmed, deaths, horizons=(7, 14))
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.data_file = self.tmp_dir / 'prepared.parquet'
+        self.df.to_parquet(self.data_file, index=False)
+        self.matrix_dir = export_feature_matrix(self.df, self.tmp_dir / 'matrix', self.data_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        """Test that arrays are memory-mapped and match the frame"""
+        matrix = open_feature_matrix(self.matrix_dir)
+        schema = matrix.schema
+
+        self.assertIsInstance(matrix.features, np.memmap)
+        self.assertEqual(matrix.features.dtype, np.float32)
+        self.assertNotIn('Lat', schema['feature_columns'])
+        self.assertEqual(schema['target_columns'], ['Warning_Level_7d_Ahead', 'Warning_Level_14d_Ahead'])
+        np.testing.assert_array_equal(
+            matrix.features, self.df[schema['feature_columns']].to_numpy(dtype=np.float32))
+
+        target = pd.Categorical.from_codes(matrix.targets[:, 1], categories=schema['target_classes'])
+        self.assertEqual(list(pd.Series(target).astype(object).fillna('NA')),
+                         list(self.df['Warning_Level_14d_Ahead'].astype(object).fillna('NA')))
+
+        index = matrix_row_index(matrix)
+        self.assertEqual(list(index['Province/State']), list(self.df['Province/State'].astype(str)))
+        self.assertTrue((index['Date'] == self.df['Date']).all())
+
+    def test_stale_matrix_ignored(self):
+        """Test that a matrix exported from an older prepared file is not used"""
+        self.assertIsNotNone(open_feature_matrix(self.matrix_dir, data_file=self.data_file))
+        stat = self.data_file.stat()
+        os.utime(self.data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNone(open_feature_matrix(self.matrix_dir, data_file=self.data_file))
+        self.assertIsNone(open_feature_matrix(self.tmp_dir / 'missing'))
+
+    def test_training_columns_match(self):
+        """Test that training reads the same columns from the matrix and from Parquet"""
+        matrix = open_feature_matrix(self.matrix_dir)
+        for horizon in (7, 14):
+            expected, expected_target = read_training_columns(self.data_file, horizon)
+            result, target_col = read_matrix_columns(matrix, horizon)
+            self.assertEqual(target_col, expected_target)
+            self.assertEqual(list(result.columns), list(expected.columns))
+            self.assertTrue(np.shares_memory(result.iloc[:, 0].to_numpy(), matrix.features))
+            np.testing.assert_array_equal(result.drop(columns=target_col),
+                                          expected.drop(columns=target_col).to_numpy(dtype=np.float32))
+
+    def test_chunked_scoring(self):
+        """Test that chunked scoring matches predicting on the DataFrame"""
+        matrix = open_feature_matrix(self.matrix_dir)
+        df, target_col = read_training_columns(self.data_file)
+        df = df.dropna(subset=[target_col])
+        features = [col for col in df.columns if col != target_col]
+        model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0)
+        model.fit(df[features].fillna(0), df[target_col])
+
+        predictions, confidences = score_matrix(model, features, matrix, chunk_rows=17)
+        self.assertNotEqual(features, matrix.schema['feature_columns'])  # columns gathered per chunk
+
+        matrix_frame = pd.DataFrame(np.asarray(matrix.features), columns=matrix.schema['feature_columns'])
+        np.testing.assert_array_equal(predictions, model.predict(matrix_frame[features]))
+        self.assertEqual(len(confidences), matrix.schema['rows'])
+
+
+if __name__ == '__main__':
+    unittest.main()
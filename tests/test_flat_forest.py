@@ -0,0 +1,106 @@
+"""
+Unit Tests for the Flat-Array Forest Predictor
+==============================================
+Checks that the exported arrays reproduce scikit-learn's probabilities
+(including threshold ties and missing values), that loading does not
+import scikit-learn, and which artifact inference picks.
+"""
+
+import unittest
+import os
+import subprocess
+import tempfile
+import shutil
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sklearn.ensemble import RandomForestClassifier
+
+from src.models.flat_forest import export_flat_forest, load_flat_forest, load_inference_artifact
+
+
+class TestFlatForest(unittest.TestCase):
+    """Test cases for the flat forest export and predictor"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(600, 5)).astype(np.float32),
+                         columns=['Growth_Rate', 'CFR', 'Cases_per_100k', 'Doubling_Time', 'Noise'])
+        X.iloc[::9, 1] = np.nan
+        score = X['Growth_Rate'] + X['Cases_per_100k'].fillna(0)
+        y = np.select([score > 1, score > 0, score > -1],
+                      ['CRITICAL_LOCKDOWN', 'HIGH_RESTRICTIONS', 'MODERATE_MEASURES'], 'LOW_MONITORING')
+        cls.X, cls.y = X, y
+        cls.model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X, y)
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.flat_file = export_flat_forest(self.model, list(self.X.columns), self.tmp_dir / 'flat_forest.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches_sklearn(self):
+        """Test probabilities and labels on rows with NaNs and on split thresholds"""
+        flat = load_flat_forest(self.flat_file)
+        thresholds = self.model.estimators_[0].tree_.threshold[:5].astype(np.float32)
+        edge = pd.DataFrame(np.tile(thresholds[:, None], (1, 5)), columns=self.X.columns)
+        rows = pd.concat([self.X, edge, self.X.iloc[:3] * np.nan], ignore_index=True)
+
+        np.testing.assert_allclose(flat.predict_proba(rows), self.model.predict_proba(rows), atol=1e-6)
+        np.testing.assert_array_equal(flat.predict(rows), self.model.predict(rows))
+        np.testing.assert_array_equal(flat.classes_, self.model.classes_)
+        shuffled = rows[list(reversed(rows.columns))]
+        np.testing.assert_allclose(flat.predict_proba(shuffled), self.model.predict_proba(rows), atol=1e-6)
+
+    def test_arrays_and_size(self):
+        """Test the flat layout and that it is smaller than the pickle"""
+        flat = load_flat_forest(self.flat_file)
+        arrays = flat.arrays
+        self.assertEqual(arrays['threshold'].dtype, np.float32)
+        self.assertEqual(len(arrays['roots']), 15)
+        n_leaves = sum(int((e.tree_.children_left == -1).sum()) for e in self.model.estimators_)
+        self.assertEqual(arrays['value'].shape, (n_leaves, 4))
+        np.testing.assert_allclose(arrays['value'].sum(axis=1), 1, rtol=1e-6)
+        pickle_file = self.tmp_dir / 'model.pkl'
+        joblib.dump({'model': self.model}, pickle_file)
+        self.assertLess(self.flat_file.stat().st_size, pickle_file.stat().st_size)
+
+    def test_no_sklearn_import(self):
+        """Test that loading, predicting and batch scoring never import scikit-learn"""
+        code = ("import sys; sys.path.insert(0, '.'); import numpy as np; "
+                "from src.models.flat_forest import load_flat_forest; "
+                "import src.models.predict_model; "
+                f"f = load_flat_forest({str(self.flat_file)!r}); f.predict(np.zeros((2, 5))); "
+                "print('sklearn' in sys.modules)")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=Path(__file__).parent.parent)
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+
+    def test_inference_artifact_choice(self):
+        """Test that a current flat forest is preferred and a stale one ignored"""
+        model_file = self.tmp_dir / 'best_covid_warning_model.pkl'
+        joblib.dump({'model': self.model, 'feature_names': list(self.X.columns),
+                     'target_classes': sorted(self.model.classes_.tolist()), 'metadata': {}}, model_file)
+        stale = time.time() - 60
+        os.utime(self.flat_file, (stale, stale))
+        self.assertIsInstance(load_inference_artifact(model_file, self.flat_file)['model'], RandomForestClassifier)
+
+        os.utime(self.flat_file)
+        artifact = load_inference_artifact(model_file, self.flat_file)
+        self.assertEqual(type(artifact['model']).__name__, 'FlatForestClassifier')
+        self.assertEqual(artifact['feature_names'], list(self.X.columns))
+        self.assertEqual(artifact['target_classes'], sorted(self.model.classes_.tolist()))
+        self.assertIsNone(load_inference_artifact(self.tmp_dir / 'missing.pkl', self.tmp_dir / 'missing.npz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
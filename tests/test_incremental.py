@@ -0,0 +1,197 @@
+"""
+Unit Tests for Incremental Daily Preparation
+============================================
+Bootstraps on a prefix of the dates, appends the rest in daily batches and
+checks the reassembled output against a full run with the same caps and
+against the default long-format engine.
+"""
+
+import unittest
+import contextlib
+import io
+import tempfile
+import shutil
+import joblib
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import prepare_long_format
+from src.data.cube_engine import (
+    build_location_cube,
+    fill_location_coordinates,
+    compute_cube_features,
+    cube_to_frame,
+)
+from src.data.incremental import (
+    bootstrap_incremental,
+    update_incremental,
+    read_incremental_output,
+    prepare_incremental,
+    STATE_FILE,
+)
+from src.models.train_model import find_prepared_data
+from tests.test_cube_engine import make_wide_table
+
+
+class TestIncrementalPreparation(unittest.TestCase):
+    """Test cases for the incremental preparation mode"""
+    
+    def setUp(self):
+        """Build wide tables and a temporary output directory"""
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', 45.0, -80.0),
+        ]
+        self.confirmed = make_wide_table(locations, 70, seed=1, scale=80)
+        self.deaths = make_wide_table(locations, 70, seed=2, scale=12)
+        self.recovered = make_wide_table(locations, 70, seed=3, scale=40)
+        self.output_dir = Path(tempfile.mkdtemp())
+    
+    def tearDown(self):
+        """Remove the temporary output directory"""
+        shutil.rmtree(self.output_dir)
+    
+    def first_days(self, n_days):
+        """Wide tables truncated to the first n_days date columns."""
+        return [t.iloc[:, :4 + n_days] for t in (self.confirmed, self.deaths, self.recovered)]
+    
+    def test_matches_full_preparation(self):
+        """Test that bootstrap + daily updates equal a full run with frozen caps"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(*self.first_days(50), output_dir=self.output_dir)
+            for n_days in [51, 52, 60, 70]:
+                update_incremental(*self.first_days(n_days), output_dir=self.output_dir)
+        result = read_incremental_output(self.output_dir)
+        
+        state = joblib.load(self.output_dir / STATE_FILE)
+        cube, locations, dates = build_location_cube(self.confirmed, self.deaths, self.recovered)
+        locations = fill_location_coordinates(locations)
+        features = compute_cube_features(cube, locations, dates, caps=state['caps'])
+        expected = cube_to_frame(features, locations, dates)
+        
+        self.assertEqual(len(result), len(expected))
+        self.assertEqual(list(result.columns), list(expected.columns))
+        for col in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[col]):
+                np.testing.assert_allclose(result[col].to_numpy(float), expected[col].to_numpy(float),
+                                           rtol=1e-9, equal_nan=True, err_msg=col)
+            else:
+                self.assertEqual(list(result[col].astype(str)), list(expected[col].astype(str)), col)
+    
+    def test_matches_default_engine(self):
+        """Test that a bootstrap equals load_and_prepare_data()'s long-format engine"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(self.confirmed, self.deaths, self.recovered, output_dir=self.output_dir)
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered)
+        result = read_incremental_output(self.output_dir)
+        
+        self.assertEqual(list(result.columns), list(expected.columns))
+        self.assertEqual(len(result), len(expected))
+        for col in expected.columns:
+            if pd.api.types.is_numeric_dtype(expected[col]):
+                np.testing.assert_allclose(result[col].to_numpy(float), expected[col].to_numpy(float),
+                                           rtol=1e-9, equal_nan=True, err_msg=col)
+            else:
+                self.assertEqual(list(result[col].astype(str)), list(expected[col].astype(str)), col)
+    
+    def test_coordinate_mismatch_differs_from_default_engine(self):
+        """Test the documented difference: recovered coordinates that disagree"""
+        recovered = self.recovered.copy()
+        recovered.loc[0, 'Lat'] += 0.01  # Italy
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(self.confirmed, self.deaths, recovered, output_dir=self.output_dir)
+            expected = prepare_long_format(self.confirmed, self.deaths, recovered)
+        result = read_incremental_output(self.output_dir)
+        
+        italy = result[result['Country/Region'] == 'Italy']
+        self.assertEqual(len(italy), 70)
+        self.assertTrue(np.allclose(italy['Lat'], 41.87))
+        # The default engine yields two interleaved groups for Italy
+        self.assertEqual((expected['Country/Region'] == 'Italy').sum(), 2 * 70)
+        canada = ['Canada'] * 2 * 70
+        self.assertEqual(list(result.loc[result['Country/Region'] == 'Canada', 'Country/Region']), canada)
+        self.assertEqual(list(expected.loc[expected['Country/Region'] == 'Canada', 'Country/Region']), canada)
+    
+    def test_prepared_data_published(self):
+        """Test that prepare_incremental writes the file training reads"""
+        raw_dir = self.output_dir / 'raw'
+        processed_dir = self.output_dir / 'processed'
+        raw_dir.mkdir()
+        
+        def write_raw(n_days):
+            for name, table in zip(['confirmed', 'deaths', 'recovered'], self.first_days(n_days)):
+                # JHU files hold integer counts
+                table = table.astype({col: 'int64' for col in table.columns[4:]})
+                table.to_csv(raw_dir / f'time_series_covid19_{name}_global.csv', index=False)
+        
+        write_raw(50)
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepare_incremental(raw_dir, self.output_dir / 'incremental', processed_data_dir=processed_dir)
+            write_raw(60)
+            prepare_incremental(raw_dir, self.output_dir / 'incremental', processed_data_dir=processed_dir)
+        
+        data_file = find_prepared_data(processed_dir)
+        self.assertEqual(data_file.name, 'covid19_prepared_data.parquet')
+        published = pd.read_parquet(data_file)
+        expected = read_incremental_output(self.output_dir / 'incremental')
+        self.assertEqual(len(published), 3 * 60)
+        pd.testing.assert_frame_equal(published, expected)
+    
+    def test_other_horizon(self):
+        """Test that a 14-day state writes 14-day columns matching a full run"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(*self.first_days(50), output_dir=self.output_dir, horizon=14)
+            update_incremental(*self.first_days(60), output_dir=self.output_dir, horizon=14)
+        result = read_incremental_output(self.output_dir)
+        
+        state = joblib.load(self.output_dir / STATE_FILE)
+        self.assertEqual(state['horizon_days'], 14)
+        cube, locations, dates = build_location_cube(*self.first_days(60))
+        locations = fill_location_coordinates(locations)
+        features = compute_cube_features(cube, locations, dates, caps=state['caps'], horizons=(14,))
+        expected = cube_to_frame(features, locations, dates, horizons=(14,))
+        
+        self.assertIn('Warning_Level_14d_Ahead', result.columns)
+        self.assertNotIn('CFR_future7d', result.columns)
+        self.assertEqual(list(result.columns), list(expected.columns))
+        np.testing.assert_allclose(result['Cases_per_100k_future14d'].to_numpy(float),
+                                   expected['Cases_per_100k_future14d'].to_numpy(float),
+                                   rtol=1e-9, equal_nan=True)
+        self.assertEqual(list(result['Warning_Level_14d_Ahead'].astype(str)),
+                         list(expected['Warning_Level_14d_Ahead'].astype(str)))
+    
+    def test_only_new_days_processed(self):
+        """Test that an update writes new rows plus back-filled pending rows only"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(*self.first_days(50), output_dir=self.output_dir)
+            rows = update_incremental(*self.first_days(53), output_dir=self.output_dir)
+            unchanged = update_incremental(*self.first_days(53), output_dir=self.output_dir)
+        
+        # 3 locations x (7 pending + 3 new days)
+        self.assertEqual(len(rows), 3 * 10)
+        self.assertEqual(len(unchanged), 0)
+        self.assertEqual(len(list(self.output_dir.glob('part-*.parquet'))), 2)
+        # The previously pending rows now have a 7-day ahead target
+        backfilled = rows[rows['Date'] <= pd.Timestamp('2020-03-11')]
+        self.assertEqual(backfilled['Cases_per_100k_future7d'].isna().sum(), 4 * 3)
+    
+    def test_new_location_triggers_bootstrap(self):
+        """Test that a changed location set falls back to a full bootstrap"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            bootstrap_incremental(*[t.iloc[:2, :54] for t in (self.confirmed, self.deaths, self.recovered)],
+                                  output_dir=self.output_dir)
+            update_incremental(*self.first_days(55), output_dir=self.output_dir)
+        
+        result = read_incremental_output(self.output_dir)
+        self.assertEqual(result.groupby(['Country/Region', 'Province/State']).ngroups, 3)
+        self.assertEqual(len(list(self.output_dir.glob('part-*.parquet'))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit Tests for Raw JHU Ingestion
+================================
+Checks typed, windowed and compressed reads against plain pd.read_csv.
+"""
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.ingest import find_raw_file, read_wide_table, select_date_columns
+from src.data.prepare_data import RAW_DATA_FILES, read_raw_tables
+from tests.test_cube_engine import make_wide_table
+
+
+class TestRawIngestion(unittest.TestCase):
+    """Test cases for the raw ingestion layer"""
+
+    def setUp(self):
+        """Write a small wide table as plain, gzip and zstd CSV"""
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', np.nan, np.nan),
+        ]
+        self.table = make_wide_table(locations, 30, seed=7, scale=50)
+        self.table[self.table.columns[4:]] = self.table[self.table.columns[4:]].astype(int)
+        self.csv_file = self.tmp_dir / 'table.csv'
+        self.table.to_csv(self.csv_file, index=False)
+        self.expected = pd.read_csv(self.csv_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_compressed(self, name, compression):
+        path = self.tmp_dir / name
+        with pa.output_stream(str(path), compression=compression) as stream:
+            stream.write(self.csv_file.read_bytes())
+        return path
+
+    def assert_matches_read_csv(self, result, date_columns):
+        self.assertEqual(list(result.columns), list(self.expected.columns[:4]) + date_columns)
+        for col in ['Province/State', 'Country/Region']:
+            self.assertIsInstance(result[col].dtype, pd.CategoricalDtype)
+            self.assertEqual(list(result[col].astype(object).fillna('NA')),
+                             list(self.expected[col].astype(object).fillna('NA')))
+        np.testing.assert_array_equal(result[['Lat', 'Long']], self.expected[['Lat', 'Long']])
+        self.assertTrue((result[date_columns].dtypes == np.int32).all())
+        np.testing.assert_array_equal(result[date_columns], self.expected[date_columns])
+
+    def test_typed_read(self):
+        """Test that all columns match pd.read_csv with explicit dtypes"""
+        result = read_wide_table(self.csv_file)
+        self.assert_matches_read_csv(result, list(self.expected.columns[4:]))
+
+    def test_date_window(self):
+        """Test that only date columns inside the window are read"""
+        columns = list(self.expected.columns)
+        window = select_date_columns(columns, '2020-01-25', '2020-01-31')
+        self.assertEqual(window, columns[7:14])
+
+        result = read_wide_table(self.csv_file, start_date='2020-01-25', end_date='2020-01-31')
+        self.assert_matches_read_csv(result, window)
+
+    def test_compressed_inputs(self):
+        """Test reading gzip and zstd compressed tables"""
+        for name, compression in [('table.csv.gz', 'gzip'), ('table.csv.zst', 'zstd')]:
+            result = read_wide_table(self.write_compressed(name, compression))
+            self.assert_matches_read_csv(result, list(self.expected.columns[4:]))
+
+    def test_read_raw_tables_finds_compressed_files(self):
+        """Test that read_raw_tables falls back to compressed files"""
+        confirmed, deaths, _ = RAW_DATA_FILES
+        self.write_compressed(f'{confirmed}.gz', 'gzip')
+        self.write_compressed(f'{deaths}.zst', 'zstd')
+
+        self.assertEqual(find_raw_file(self.tmp_dir, deaths).name, f'{deaths}.zst')
+        df_confirmed, df_deaths, df_recovered = read_raw_tables(self.tmp_dir)
+        self.assertIsNone(df_recovered)
+        pd.testing.assert_frame_equal(df_confirmed, df_deaths)
+
+    def test_missing_tables(self):
+        """Test that read_raw_tables returns None without confirmed/deaths"""
+        self.assertIsNone(read_raw_tables(self.tmp_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
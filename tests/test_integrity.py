@@ -0,0 +1,100 @@
+"""
+Unit Tests for the Raw Data Integrity Scanner
+=============================================
+Checks per-location anomaly counts, table-level date issues and the
+warn/abort/quarantine policies on synthetic JHU tables.
+"""
+
+import unittest
+import contextlib
+import io
+import tempfile
+import shutil
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.integrity import apply_integrity_policy, scan_raw_tables
+from src.data.synthetic import generate_jhu_tables
+
+
+def clean_tables(n_locations=20, n_days=30):
+    """Synthetic tables without reporting artefacts."""
+    return generate_jhu_tables(n_locations=n_locations, n_days=n_days, seed=3, gap_rate=0,
+                               correction_rate=0, missing_coordinate_rate=0, recovered_coverage=0.8)
+
+
+class TestIntegrityScanner(unittest.TestCase):
+    """Test cases for scan_raw_tables and apply_integrity_policy"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_clean_tables(self):
+        """Test that clean tables flag nothing and recovered gaps are only reported"""
+        confirmed, deaths, recovered = clean_tables()
+        report = scan_raw_tables(confirmed, deaths, recovered)
+
+        self.assertEqual(len(report.locations), 20)
+        self.assertEqual(report.table_issues, [])
+        self.assertFalse(report.locations['Flagged'].any())
+        self.assertEqual(int((~report.locations['In_Recovered']).sum()), 20 - len(recovered))
+
+    def test_location_anomalies(self):
+        """Test duplicate rows, decreases and negative counts per location"""
+        confirmed, deaths, recovered = clean_tables()
+        confirmed = pd.concat([confirmed, confirmed.iloc[[1]]], ignore_index=True)
+        deaths.iloc[2, 10] = -1
+        confirmed.iloc[3, -1] = confirmed.iloc[3, -2] - 1  # one correction: reported, not flagged
+        confirmed.iloc[4, 4:] = [10, 5] * 15  # decreases on half of the days
+
+        report = scan_raw_tables(confirmed, deaths, recovered).locations
+        keys = confirmed[['Country/Region', 'Province/State']].fillna({'Province/State': 'All'})
+        by_key = report.set_index(['Country/Region', 'Province/State'])
+
+        def row(i):
+            return by_key.loc[tuple(keys.iloc[i])]
+
+        self.assertEqual(row(1)['Duplicate_Rows'], 1)
+        self.assertEqual(row(2)['Negative_Values'], 1)
+        self.assertEqual(row(3)['Confirmed_Decreases'], 1)
+        self.assertEqual(row(4)['Confirmed_Decreases'], 15)
+        self.assertEqual([bool(row(i)['Flagged']) for i in range(5)], [False, True, True, False, True])
+
+    def test_misaligned_dates(self):
+        """Test that dropped or repeated date columns are table issues"""
+        confirmed, deaths, recovered = clean_tables()
+        deaths = deaths.drop(columns=deaths.columns[10])
+        report = scan_raw_tables(confirmed, deaths, recovered)
+
+        self.assertEqual(len(report.table_issues), 2, report.table_issues)
+        self.assertIn('Deaths: date columns differ', report.table_issues[0])
+        self.assertIn('not consecutive', report.table_issues[1])
+
+    def test_policies(self):
+        """Test warn, abort and quarantine outcomes and the written report"""
+        confirmed, deaths, recovered = clean_tables()
+        deaths.iloc[5, 8] = None
+        tables = (confirmed, deaths, recovered)
+        report_file = self.tmp_dir / 'integrity_report.csv'
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            warned = apply_integrity_policy(tables, 'warn', report_file)
+            aborted = apply_integrity_policy(tables, 'abort')
+            quarantined = apply_integrity_policy(tables, 'quarantine')
+        self.assertIs(warned, tables)
+        self.assertIsNone(aborted)
+        self.assertEqual([len(t) for t in quarantined[:2]], [19, 19])
+        self.assertEqual(len(pd.read_csv(report_file)), 20)
+        with self.assertRaises(ValueError):
+            apply_integrity_policy(tables, 'ignore')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,10 @@ Tests model training, evaluation, and saving functions.
 """
 
 import unittest
+import contextlib
+import io
+import tempfile
+import shutil
 import joblib
 import pandas as pd
 import numpy as np
@@ -14,7 +18,7 @@ import sys
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.models.train_model import train_warning_system
+from src.models.train_model import train_warning_system, read_training_columns, artifact_file
 
 
 class TestModelTraining(unittest.TestCase):
@@ -124,6 +128,16 @@ class TestModelTraining(unittest.TestCase):
                 self.assertIn(field, metadata,
                             f"Metadata should contain '{field}'")
     
+    def test_time_holdout_evaluation(self):
+        """Test that the reported metrics come from a purged time holdout"""
+        if self.model_file.exists():
+            evaluation = joblib.load(self.model_file)['metadata'].get('evaluation')
+            if evaluation is None:
+                self.skipTest("Model was trained before time-holdout evaluation")
+            self.assertEqual(evaluation['method'], 'time_holdout')
+            gap = pd.Timestamp(evaluation['test_start']) - pd.Timestamp(evaluation['train_end'])
+            self.assertGreater(gap.days, evaluation['purge_days'])
+
     def test_accuracy_range(self):
         """Test that accuracy is within valid range"""
         if self.model_file.exists():
@@ -231,5 +245,227 @@ class TestModelPerformance(unittest.TestCase):
                                          "Model predictions should be reproducible")
 
 
+class TestHorizonSelection(unittest.TestCase):
+    """Test cases for choosing the forecast horizon to train on"""
+    
+    def setUp(self):
+        """Write prepared data holding 7- and 14-day targets"""
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        levels = pd.Categorical(['LOW_MONITORING', 'HIGH_RESTRICTIONS'])
+        self.df = pd.DataFrame({
+            'Country/Region': ['A', 'B'],
+            'Growth_Rate': [0.1, 0.2],
+            'Growth_Rate_future7d': [0.1, 0.3],
+            'Growth_Rate_future14d': [0.2, 0.4],
+            'Warning_Level_7d_Ahead': levels,
+            'Warning_Level_14d_Ahead': levels,
+        })
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_other_horizons_excluded(self):
+        """Test that only the selected horizon's target and future metrics are read"""
+        for suffix in ['.parquet', '.csv']:
+            data_file = self.tmp_dir / f'prepared{suffix}'
+            if suffix == '.csv':
+                self.df.to_csv(data_file, index=False)
+            else:
+                self.df.to_parquet(data_file, index=False)
+            
+            df, target_col = read_training_columns(data_file, horizon=14)
+            self.assertEqual(target_col, 'Warning_Level_14d_Ahead')
+            self.assertIn('Growth_Rate_future14d', df.columns)
+            self.assertNotIn('Growth_Rate_future7d', df.columns)
+            self.assertNotIn('Warning_Level_7d_Ahead', df.columns)
+            
+            df, target_col = read_training_columns(data_file)
+            self.assertEqual(target_col, 'Warning_Level_7d_Ahead')
+            self.assertNotIn('Growth_Rate_future14d', df.columns)
+            
+            _, target_col = read_training_columns(data_file, horizon=3)
+            self.assertIsNone(target_col)
+    
+    def test_typed_loader(self):
+        """Test float32 features, a categorical target and the load report"""
+        from src.models.train_model import load_training_data
+        self.df['Country/Region'] = self.df['Country/Region'].astype('category')
+        self.df['Confirmed'] = np.array([16_809_146, 3], dtype=np.int32)
+        for suffix in ['.parquet', '.feather', '.csv']:
+            data_file = self.tmp_dir / f'prepared{suffix}'
+            if suffix == '.csv':
+                self.df.to_csv(data_file, index=False)
+            elif suffix == '.feather':
+                self.df.to_feather(data_file)
+            else:
+                self.df.to_parquet(data_file, index=False)
+            
+            data = load_training_data(data_file)
+            self.assertEqual(list(data.df.columns),
+                             ['Growth_Rate', 'Growth_Rate_future7d', 'Confirmed', 'Warning_Level_7d_Ahead'])
+            self.assertTrue((data.df.dtypes.iloc[:-1] == np.float32).all(), suffix)
+            self.assertIsInstance(data.df['Warning_Level_7d_Ahead'].dtype, pd.CategoricalDtype)
+            self.assertEqual(data.source, data_file.name)
+            self.assertGreater(data.bytes_read, 0)
+            self.assertGreater(data.memory_bytes, 0)
+            self.assertGreaterEqual(data.load_s, 0)
+    
+    def test_artifact_names(self):
+        """Test that the default horizon keeps the deployed artifact names"""
+        self.assertEqual(artifact_file(self.tmp_dir, 'model.pkl').name, 'model.pkl')
+        self.assertEqual(artifact_file(self.tmp_dir, 'model.pkl', 14).name, 'model_14d.pkl')
+
+
+
+class TestBacktest(unittest.TestCase):
+    """Test cases for the rolling-origin backtesting engine"""
+    
+    def test_folds_purge_the_horizon(self):
+        """Test that training ends a full horizon before each test window"""
+        from src.models.backtest import rolling_origin_folds
+        dates = pd.date_range('2021-01-01', periods=200).to_numpy()
+        folds = rolling_origin_folds(dates, n_folds=4, test_days=14, purge_days=7)
+        
+        self.assertEqual(len(folds), 4)
+        self.assertEqual(folds[-1].test_end, np.datetime64(dates[-1], 'D'))
+        for fold, following in zip(folds, folds[1:]):
+            self.assertEqual(following.test_start - fold.test_end, np.timedelta64(1, 'D'))
+        for fold in folds:
+            self.assertEqual(fold.test_start - fold.train_end, np.timedelta64(8, 'D'))
+    
+    def test_parallel_folds(self):
+        """Test per-fold metrics and timings from two worker processes"""
+        from src.models.backtest import frame_inputs, run_backtest
+        rng = np.random.default_rng(0)
+        dates = np.repeat(pd.date_range('2021-01-01', periods=120).to_numpy(), 30)
+        growth = rng.normal(size=len(dates))
+        df = pd.DataFrame({
+            'Growth_Rate': growth,
+            'Noise': rng.normal(size=len(dates)),
+            'Warning_Level_7d_Ahead': np.where(growth > 0, 'HIGH_RESTRICTIONS', 'LOW_MONITORING'),
+        })
+        df.loc[len(df) - 210:, 'Warning_Level_7d_Ahead'] = None  # last 7 days unlabelled
+        
+        inputs = frame_inputs(df, ['Growth_Rate', 'Noise'], 'Warning_Level_7d_Ahead', dates)
+        folds_df, summary = run_backtest(inputs, {'n_estimators': 10, 'random_state': 0},
+                                         n_folds=3, test_days=10, n_jobs=2)
+        
+        self.assertEqual(list(folds_df['fold']), [0, 1, 2])
+        self.assertEqual(folds_df['test_end'].iloc[-1], str(np.datetime64(dates[-211], 'D')))
+        self.assertTrue((folds_df['n_test'] == 300).all())
+        self.assertTrue(folds_df['n_train'].is_monotonic_increasing)
+        self.assertGreater(summary['mean_accuracy'], 0.9)
+        self.assertTrue((folds_df['fit_s'] > 0).all())
+        self.assertEqual(len(summary['folds']), 3)
+
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+    """Test cases for successive-halving tuning"""
+    
+    def setUp(self):
+        from src.models.backtest import frame_inputs
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        rng = np.random.default_rng(1)
+        dates = np.repeat(pd.date_range('2021-01-01', periods=100).to_numpy(), 40)
+        growth = rng.normal(size=len(dates))
+        df = pd.DataFrame({
+            'Growth_Rate': growth,
+            'Noise': rng.normal(size=len(dates)),
+            'Warning_Level_7d_Ahead': np.where(growth > 1, 'CRITICAL_LOCKDOWN', 'LOW_MONITORING'),
+        })
+        self.inputs = frame_inputs(df, ['Growth_Rate', 'Noise'], 'Warning_Level_7d_Ahead', dates)
+        self.space = {'max_depth': [2, 4, None], 'min_samples_leaf': [1, 5, 20]}
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_halving_and_resume(self):
+        """Test rung sizes, critical-recall selection and resuming from the log"""
+        from src.models.tuning import successive_halving
+        log_file = self.tmp_dir / 'tuning_log.jsonl'
+        options = dict(space=self.space, n_candidates=9, min_budget=300, validation_days=20,
+                       log_file=log_file, n_jobs=2)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = successive_halving(self.inputs, {'n_estimators': 10, 'random_state': 0}, **options)
+        self.assertEqual(list(first.history.groupby('rung').size()), [9, 3, 1])
+        self.assertEqual(first.summary['budgets'], [300, 900, first.history['n_train'].max()])
+        self.assertIn('recall_CRITICAL_LOCKDOWN', first.best_metrics)
+        top = first.history[first.history['rung'] == 0].iloc[0]
+        self.assertEqual(top['recall_CRITICAL_LOCKDOWN'],
+                         first.history.loc[first.history['rung'] == 0, 'recall_CRITICAL_LOCKDOWN'].max())
+        self.assertEqual(len(log_file.read_text().splitlines()), 13)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            second = successive_halving(self.inputs, {'n_estimators': 10, 'random_state': 0}, **options)
+        self.assertEqual(second.summary['from_log'], 13)
+        self.assertEqual(second.best_params, first.best_params)
+        self.assertEqual(len(log_file.read_text().splitlines()), 13)
+        
+        # Same shape, different values: nothing is reused
+        changed = self.inputs._replace(features=self.inputs.features[::-1].copy())
+        with contextlib.redirect_stdout(io.StringIO()):
+            third = successive_halving(changed, {'n_estimators': 10, 'random_state': 0}, **options)
+        self.assertEqual(third.summary['from_log'], 0)
+    
+    def test_tree_budget(self):
+        """Test that the trees resource grows n_estimators up to the largest value"""
+        from src.models.tuning import successive_halving
+        space = {**self.space, 'n_estimators': [5, 27]}
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = successive_halving(self.inputs, {'random_state': 0}, space=space, n_candidates=9,
+                                        resource='trees', validation_days=20, n_jobs=1)
+        self.assertEqual(result.summary['budgets'], [3, 9, 27])
+        self.assertEqual(result.best_params['n_estimators'], 27)
+
+
+
+class TestWarmStartRefresh(unittest.TestCase):
+    """Test cases for incremental warm-start retraining"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.dates = np.repeat(pd.date_range('2021-01-01', periods=120).to_numpy(), 20)
+        self.X = pd.DataFrame({'Growth_Rate': rng.normal(size=len(self.dates)),
+                               'Noise': rng.normal(size=len(self.dates))})
+        self.y = np.where(self.X['Growth_Rate'] > 0.5, 'CRITICAL_LOCKDOWN', 'LOW_MONITORING')
+        self.y[-200:] = 'LOW_MONITORING'  # the last 10 days hold one class only
+        from sklearn.ensemble import RandomForestClassifier
+        self.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(self.X, self.y)
+        self.ranges = [['2021-01-01', '2021-04-30']] * 10
+    
+    def test_add_and_retire_trees(self):
+        """Test added trees, retired trees, date ranges and a widened window"""
+        from src.models.warm_start import add_recent_trees
+        old_trees = list(self.model.estimators_)
+        model, ranges, info = add_recent_trees(self.model, self.ranges, self.X, self.y, self.dates,
+                                               new_trees=5, window_days=7, max_trees=12)
+        
+        self.assertEqual(len(model.estimators_), 12)
+        self.assertIs(model.estimators_[0], old_trees[3])
+        self.assertEqual(len(ranges), 12)
+        self.assertEqual(ranges[-1], ['2021-04-17', '2021-04-30'], "Window widened to find both classes")
+        self.assertEqual(info['trees_retired'], 3)
+        self.assertEqual(list(model.classes_), ['CRITICAL_LOCKDOWN', 'LOW_MONITORING'])
+        self.assertEqual(len(model.predict(self.X.head())), 5)
+    
+    def test_compare_with_full_retrain(self):
+        """Test the holdout comparison of a refresh against a full retrain"""
+        from src.models.warm_start import compare_with_full_retrain
+        comparison = compare_with_full_retrain(self.model, self.ranges, self.X, self.y, self.dates,
+                                               {'n_estimators': 10, 'random_state': 0},
+                                               new_trees=5, window_days=14, holdout_days=14)
+        
+        self.assertEqual(comparison['holdout'], ['2021-04-17', '2021-04-30'])
+        self.assertEqual(comparison['holdout_rows'], 280)
+        self.assertEqual(comparison['base_trees_seen_holdout'], 10)
+        self.assertEqual(comparison['incremental']['n_trees'], 15)
+        self.assertEqual(comparison['full']['n_trees'], 10)
+        for name in ['incremental', 'full']:
+            self.assertIn('recall_CRITICAL_LOCKDOWN', comparison[name])
+            self.assertTrue(0 <= comparison[name]['accuracy'] <= 1)
+
+
 if __name__ == '__main__':
     unittest.main()
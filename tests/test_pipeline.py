@@ -20,7 +20,7 @@ class TestPipelineIntegration(unittest.TestCase):
         """Set up test fixtures"""
         cls.project_root = Path(__file__).parent.parent
         cls.pipeline_script = cls.project_root / 'scripts' / 'run_pipeline.py'
-        cls.data_file = cls.project_root / 'data' / 'processed' / 'covid19_prepared_data.csv'
+        cls.data_file = cls.project_root / 'data' / 'processed' / 'covid19_prepared_data.parquet'
         cls.model_file = cls.project_root / 'models' / 'trained' / 'best_covid_warning_model.pkl'
     
     def test_pipeline_script_exists(self):
@@ -70,7 +70,7 @@ class TestPipelineIntegration(unittest.TestCase):
         """Test that model is compatible with prepared data"""
         if self.data_file.exists() and self.model_file.exists():
             # Load data
-            df = pd.read_csv(self.data_file)
+            df = pd.read_parquet(self.data_file)
             X = df.drop('Warning_Level', axis=1, errors='ignore')
             
             # Load model
@@ -90,7 +90,7 @@ class TestPipelineIntegration(unittest.TestCase):
         """Test that model can make predictions on prepared data"""
         if self.data_file.exists() and self.model_file.exists():
             # Load data
-            df = pd.read_csv(self.data_file)
+            df = pd.read_parquet(self.data_file)
             X = df.drop('Warning_Level', axis=1, errors='ignore').head(10)
             
             # Load model
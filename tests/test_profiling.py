@@ -0,0 +1,138 @@
+"""
+Unit Tests for Stage Profiling
+==============================
+Checks stage records, nesting, the sampling profiler and the JSON report.
+"""
+
+import unittest
+import contextlib
+import io
+import json
+import time
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.profiling import StageProfiler, prune_reports
+from src.data.prepare_data import prepare_long_format
+from tests.test_cube_engine import make_wide_table
+
+
+def busy_wait(seconds):
+    """Spin in Python so the sampler can interleave."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class TestStageProfiler(unittest.TestCase):
+    """Test cases for the stage profiler"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_nested_stage_records(self):
+        """Test timings, nesting levels, frame shape and peak propagation"""
+        profiler = StageProfiler()
+        df = pd.DataFrame({'x': range(10)})
+        with profiler.stage('outer', lambda: df):
+            with profiler.stage('inner', lambda: df):
+                block = np.ones(4_000_000)  # ~32 MB
+                df['y'] = 1
+            del block
+
+        outer, inner = profiler.stages
+        self.assertEqual((outer['name'], outer['level']), ('outer', 0))
+        self.assertEqual((inner['name'], inner['level']), ('inner', 1))
+        self.assertEqual((inner['rows'], inner['columns']), (10, 2))
+        self.assertGreaterEqual(outer['wall_s'], inner['wall_s'])
+        if profiler.per_stage_peak:
+            self.assertGreater(inner['peak_rss_delta_mb'], 20)
+            self.assertGreaterEqual(outer['peak_rss_mb'], inner['peak_rss_mb'])
+
+    def test_failed_stage_is_timed(self):
+        """Test that a stage raising an error is still recorded"""
+        profiler = StageProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage('fails', lambda: undefined_frame):  # noqa: F821
+                raise ValueError('boom')
+
+        self.assertIn('wall_s', profiler.stages[0])
+        self.assertNotIn('rows', profiler.stages[0])
+
+    def test_sampling_report(self):
+        """Test that samples are attributed to stages and written out"""
+        profiler = StageProfiler(sample=True, interval=0.001)
+        profiler.start()
+        with profiler.stage('spin'):
+            busy_wait(0.2)
+        profiler.stop()
+
+        report_file = profiler.write_report(self.tmp_dir, engine='test')
+        report = json.loads(report_file.read_text())
+        self.assertEqual(report['engine'], 'test')
+        self.assertEqual(report['stages'][0]['name'], 'spin')
+        self.assertGreater(report['sampling_profile']['samples'], 0)
+
+        collapsed = (self.tmp_dir / report['sampling_profile']['collapsed_stacks']).read_text()
+        self.assertIn('[spin];', collapsed)
+        self.assertIn('busy_wait', collapsed)
+
+    def test_report_retention(self):
+        """Test that only the newest runs are kept in the report directory"""
+        for stamp in ['20260101-000000-000001', '20260101-000000-000002', '20260101-000000-000003']:
+            (self.tmp_dir / f'prepare_{stamp}.json').write_text('{}')
+            (self.tmp_dir / f'prepare_{stamp}.collapsed.txt').write_text('')
+        prune_reports(self.tmp_dir, keep=2)
+        self.assertEqual(sorted(path.name for path in self.tmp_dir.iterdir()), [
+            'prepare_20260101-000000-000002.collapsed.txt', 'prepare_20260101-000000-000002.json',
+            'prepare_20260101-000000-000003.collapsed.txt', 'prepare_20260101-000000-000003.json',
+        ])
+
+        StageProfiler().write_report(self.tmp_dir, keep=1)
+        self.assertEqual(len(list(self.tmp_dir.glob('prepare_*.json'))), 1)
+
+    def test_prepare_long_format_stages(self):
+        """Test that every preparation sub-step is recorded"""
+        locations = [(np.nan, 'Italy', 41.87, 12.56), ('North', 'Canada', 50.0, -100.0)]
+        confirmed = make_wide_table(locations, 30, seed=1, scale=80)
+        deaths = make_wide_table(locations, 30, seed=2, scale=12)
+        profiler = StageProfiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepare_long_format(confirmed, deaths, profiler=profiler)
+
+        names = [record['name'].split()[0] for record in profiler.stages]
+        for step in ['2.1', '2.2', '2.3', '2.4', '2.5', '2.6', '2.7',
+                     '3.1', '3.2', '3.3', '3.4', '5.1', '5.2']:
+            self.assertIn(step, names)
+        self.assertEqual(profiler.stages[-1]['columns'], 42)
+
+    def test_unprofiled_steps_keep_outer_peak(self):
+        """Test that steps run without a profiler do not reset an enclosing stage's peak"""
+        locations = [(np.nan, 'Italy', 41.87, 12.56)]
+        confirmed = make_wide_table(locations, 30, seed=1, scale=80)
+        deaths = make_wide_table(locations, 30, seed=2, scale=12)
+        profiler = StageProfiler()
+        with profiler.stage('outer'):
+            block = np.ones(8_000_000)  # ~64 MB
+            block.sum()
+            del block
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepare_long_format(confirmed, deaths)
+
+        self.assertEqual(len(profiler.stages), 1)
+        if profiler.per_stage_peak:
+            self.assertGreater(profiler.stages[0]['peak_rss_delta_mb'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
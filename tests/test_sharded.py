@@ -0,0 +1,159 @@
+"""
+Unit Tests for Sharded Preparation
+==================================
+Checks that running STEP 1-5 on country shards in a process pool
+reproduces the single-process long-format run.
+"""
+
+import unittest
+import contextlib
+import io
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import prepare_long_format
+from src.data.sharded import (
+    country_statistics,
+    plan_location_shards,
+    plan_shards,
+    prepare_out_of_core,
+    prepare_sharded,
+)
+from tests.test_cube_engine import make_wide_table
+
+
+class TestShardedPreparation(unittest.TestCase):
+    """Test cases for the sharded preparation mode"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build tables with several countries, one missing from POPULATION_DATA"""
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', np.nan, np.nan),
+            ('West', 'Canada', 49.0, -120.0),
+            (np.nan, 'Germany', 51.0, 10.0),
+            (np.nan, 'Atlantis', 10.0, 10.0),
+        ]
+        cls.confirmed = make_wide_table(locations, 40, seed=4, scale=90)
+        cls.deaths = make_wide_table(locations, 40, seed=5, scale=10)
+        cls.recovered = make_wide_table(locations[:4], 40, seed=6, scale=50)
+
+    def test_plan_shards(self):
+        """Test that countries are split whole and balanced by rows"""
+        shards = plan_shards(self.confirmed, 2)
+
+        self.assertEqual(shards, [['Canada'], ['Atlantis', 'Germany', 'Italy']])
+        self.assertEqual(len(plan_shards(self.confirmed, 10)), 4)
+
+    def test_matches_single_process(self):
+        """Test that sharded output equals the unsharded run"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(self.confirmed, self.deaths, self.recovered)
+            result = prepare_sharded(self.confirmed, self.deaths, self.recovered, workers=3)
+
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_start_date_on_every_engine(self):
+        """Test that Days_Since_Start counts from start_date on every engine"""
+        from src.data.cube_engine import prepare_from_cube
+        tables = (self.confirmed, self.deaths, self.recovered)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [
+                prepare_long_format(*tables, start_date='2020-01-01'),
+                prepare_sharded(*tables, workers=1, start_date='2020-01-01'),
+                prepare_from_cube(*tables, start_date='2020-01-01'),
+            ]
+        for df in results:
+            first = df.groupby(['Country/Region', 'Province/State'], observed=True)['Days_Since_Start'].min()
+            self.assertTrue((first == 21).all())
+
+    def test_empty_window_raises(self):
+        """Test that tables without date columns raise a clear error"""
+        with self.assertRaisesRegex(ValueError, 'No date columns'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepare_long_format(self.confirmed.iloc[:, :4], self.deaths.iloc[:, :4])
+
+    def test_dtype_report_covers_columns(self):
+        """Test that the shard reports are merged into one row per column"""
+        report = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = prepare_sharded(self.confirmed, self.deaths, workers=2, dtype_report=report)
+
+        self.assertEqual(sorted(row['Column'] for row in report), sorted(result.columns))
+
+
+class TestOutOfCorePreparation(unittest.TestCase):
+    """Test cases for bounded-memory preparation into a Parquet dataset"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Canada's provinces land in different shards; countries appear unsorted"""
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('West', 'Canada', 49.0, -120.0),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', np.nan, np.nan),
+            (np.nan, 'Atlantis', np.nan, np.nan),
+        ]
+        cls.confirmed = make_wide_table(locations, 30, seed=7, scale=60)
+        cls.deaths = make_wide_table(locations, 30, seed=8, scale=8)
+        cls.recovered = make_wide_table(locations[1:], 30, seed=9, scale=30)
+        cls.tables = (cls.confirmed, cls.deaths, cls.recovered)
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_country_statistics(self):
+        """Test centroids over locations and first dates per threshold"""
+        stats = country_statistics(self.tables, thresholds=(100, 10**9))
+
+        self.assertAlmostEqual(stats.loc['Canada', 'Lat'], 49.5)
+        self.assertTrue(np.isnan(stats.loc['Atlantis', 'Long']))
+        canada = self.confirmed[self.confirmed['Country/Region'] == 'Canada'].iloc[:, 4:]
+        first_column = (canada >= 100).any(axis=0).to_numpy().argmax()
+        self.assertEqual(stats.loc['Canada', 'Days_Since_100'],
+                         pd.Timestamp('2020-01-22') + pd.Timedelta(days=int(first_column)))
+        self.assertTrue(stats['Days_Since_1000000000'].isna().all())
+
+    def test_plan_location_shards(self):
+        """Test that shards follow the prepared row order within the row bound"""
+        shards = plan_location_shards(self.tables, shard_rows=60)
+
+        self.assertEqual(shards, [[('Atlantis', 'All'), ('Canada', 'North')],
+                                  [('Canada', 'South'), ('Canada', 'West')],
+                                  [('Italy', 'All')]])
+        self.assertEqual(len(plan_location_shards(self.tables, shard_rows=1)), 5)
+
+    def test_matches_in_memory(self):
+        """Test that the dataset read back equals the in-memory run"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(*self.tables, thresholds=(50, 100), horizons=(3, 7))
+            dataset_dir, rows = prepare_out_of_core(*self.tables, output_dir=self.tmp_dir / 'prepared',
+                                                    shard_rows=60, thresholds=(50, 100), horizons=(3, 7))
+
+        self.assertEqual(len(list(dataset_dir.glob('part-*.parquet'))), 3)
+        self.assertEqual(rows, len(expected))
+        pd.testing.assert_frame_equal(pd.read_parquet(dataset_dir), expected)
+
+    def test_start_date(self):
+        """Test that the dataset counts Days_Since_Start from start_date"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            dataset_dir, _ = prepare_out_of_core(*self.tables, output_dir=self.tmp_dir / 'prepared',
+                                                 shard_rows=60, start_date='2020-01-01')
+        self.assertEqual(pd.read_parquet(dataset_dir, columns=['Days_Since_Start'])['Days_Since_Start'].min(), 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Unit Tests for the Checkpointed Stage DAG
+=========================================
+Checks that staged runs match prepare_long_format and that checkpoints are
+reused, resumed and invalidated by output fingerprint.
+"""
+
+import unittest
+import contextlib
+import io
+import json
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import RAW_DATA_FILES, prepare_long_format, read_raw_tables
+from src.data.stages import STAGE_NAMES, run_stages, upstream_stages
+from tests.test_cube_engine import make_wide_table
+
+
+class TestStageDAG(unittest.TestCase):
+    """Test cases for the stage runner"""
+
+    def setUp(self):
+        """Write small raw tables to a temporary raw directory"""
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.raw_dir = self.tmp_dir / 'raw'
+        self.raw_dir.mkdir()
+        self.checkpoint_dir = self.tmp_dir / 'checkpoints'
+        locations = [
+            (np.nan, 'Italy', 41.87, 12.56),
+            ('North', 'Canada', 50.0, -100.0),
+            ('South', 'Canada', np.nan, np.nan),
+        ]
+        for name, seed, scale in zip(RAW_DATA_FILES, [1, 2, 3], [80, 12, 40]):
+            table = make_wide_table(locations, 40, seed=seed, scale=scale)
+            table[table.columns[4:]] = table[table.columns[4:]].astype(int)
+            table.to_csv(self.raw_dir / name, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_quietly(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_stages(self.raw_dir, checkpoint_dir=self.checkpoint_dir, **kwargs)
+
+    def computed_at(self):
+        return {name: json.loads((self.checkpoint_dir / f'{name}.json').read_text())['computed_at']
+                for name in STAGE_NAMES}
+
+    def test_matches_prepare_long_format(self):
+        """Test that a staged run, fresh and from checkpoints, equals the in-memory run"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = prepare_long_format(*read_raw_tables(self.raw_dir))
+
+        pd.testing.assert_frame_equal(self.run_quietly(), expected)
+        pd.testing.assert_frame_equal(self.run_quietly(), expected)
+
+    def test_downstream_reused_when_output_unchanged(self):
+        """Test that re-running a stage with identical output keeps downstream checkpoints"""
+        self.run_quietly()
+        first = self.computed_at()
+
+        self.run_quietly()
+        self.assertEqual(self.computed_at(), first)
+
+        self.run_quietly(force=('clean',))
+        second = self.computed_at()
+        self.assertNotEqual(second['clean'], first['clean'])
+        for name in ['integrate', 'features', 'normalize', 'target']:
+            self.assertEqual(second[name], first[name])
+
+    def test_parameter_change_reruns_downstream(self):
+        """Test that a stage parameter invalidates that stage and everything after it"""
+        self.run_quietly()
+        first = self.computed_at()
+
+        df = self.run_quietly(thresholds=(100, 1000))
+        second = self.computed_at()
+        self.assertIn('Days_Since_1000', df.columns)
+        for name in ['integrate', 'clean']:
+            self.assertEqual(second[name], first[name])
+        for name in ['features', 'normalize', 'target']:
+            self.assertNotEqual(second[name], first[name])
+
+    def test_resume_after_failure(self):
+        """Test that a run stopped early resumes from the completed stages"""
+        partial = self.run_quietly(until='clean')
+        self.assertEqual(upstream_stages('clean'), ['integrate', 'clean'])
+        self.assertIn('Cases_7d_MA', partial.columns)
+        self.assertFalse((self.checkpoint_dir / 'features.json').exists())
+        first_clean = json.loads((self.checkpoint_dir / 'clean.json').read_text())['computed_at']
+
+        self.run_quietly()
+        self.assertEqual(self.computed_at()['clean'], first_clean)
+        with self.assertRaises(ValueError):
+            self.run_quietly(until='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Unit Tests for the Synthetic JHU Data Generator
+===============================================
+Checks the JHU schema, reproducibility, the injected reporting artefacts
+and that the pipeline runs on generated files.
+"""
+
+import unittest
+import contextlib
+import io
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.prepare_data import RAW_DATA_FILES, prepare_long_format, read_raw_tables
+from src.data.synthetic import generate_jhu_tables, write_jhu_csvs
+
+
+class TestSyntheticData(unittest.TestCase):
+    """Test cases for the synthetic data generator"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_jhu_schema(self):
+        """Test column layout, date labels and integer cumulative counts"""
+        confirmed, deaths, recovered = generate_jhu_tables(n_locations=50, n_days=40, seed=1)
+
+        self.assertEqual(list(confirmed.columns[:4]), ['Province/State', 'Country/Region', 'Lat', 'Long'])
+        self.assertEqual(list(confirmed.columns[4:7]), ['1/22/20', '1/23/20', '1/24/20'])
+        self.assertEqual(confirmed.shape, (50, 44))
+        self.assertEqual(list(deaths.columns), list(confirmed.columns))
+        self.assertLessEqual(len(recovered), 50)
+        self.assertTrue(all(pd.api.types.is_integer_dtype(t) for t in confirmed.dtypes[4:]))
+        self.assertFalse(confirmed.duplicated(['Province/State', 'Country/Region']).any())
+        self.assertTrue(confirmed['Province/State'].isna().any(), "Country-level rows have no province")
+
+    def test_reproducible(self):
+        """Test that a seed fixes the tables and other seeds change them"""
+        first = generate_jhu_tables(n_locations=20, n_days=60, seed=7)
+        second = generate_jhu_tables(n_locations=20, n_days=60, seed=7)
+        for a, b in zip(first, second):
+            pd.testing.assert_frame_equal(a, b)
+        other = generate_jhu_tables(n_locations=20, n_days=60, seed=8)
+        self.assertFalse(first[0].equals(other[0]))
+
+    def test_reporting_artefacts(self):
+        """Test that gaps and corrections show up as flat runs and decreases"""
+        confirmed, _, _ = generate_jhu_tables(n_locations=100, n_days=200, seed=2,
+                                              gap_rate=0.05, correction_rate=0.01)
+        changes = np.diff(confirmed.iloc[:, 4:].to_numpy(), axis=1)
+        self.assertTrue((changes < 0).any(), "Corrections lower cumulative counts")
+
+        clean, _, _ = generate_jhu_tables(n_locations=100, n_days=200, seed=2,
+                                          gap_rate=0, correction_rate=0)
+        clean_changes = np.diff(clean.iloc[:, 4:].to_numpy(), axis=1)
+        self.assertFalse((clean_changes < 0).any())
+        self.assertGreater((changes == 0).sum(), (clean_changes == 0).sum())
+
+    def test_pipeline_runs_on_written_files(self):
+        """Test that written files read through ingestion and prepare cleanly"""
+        files = write_jhu_csvs(self.tmp_dir, compression='gzip', n_locations=30, n_days=60,
+                               seed=4, recovered_stop_day=45)
+        self.assertEqual([f.name for f in files], [f'{name}.gz' for name in RAW_DATA_FILES])
+
+        tables = read_raw_tables(self.tmp_dir)
+        self.assertEqual(tables[0].shape, (30, 64))
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = prepare_long_format(*tables)
+        self.assertEqual(len(df), 30 * 60)
+        self.assertTrue((df.groupby(['Country/Region', 'Province/State'], observed=True)['Confirmed']
+                         .diff().dropna() >= 0).all(), "Cleaning repairs the corrections")
+
+
+if __name__ == '__main__':
+    unittest.main()